@@ -0,0 +1,43 @@
+"""Micro benchmarks. Run from the project root, e.g.
+
+    python -m benchmarks.bench_middleware
+
+Each benchmark runs against a fresh in-memory SQLite database."""
+import os
+import time
+from typing import Callable
+
+
+def setup_django() -> None:
+    """Configure Django with an in-memory database
+    and create tables for all installed models."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "eshop_api.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("DEBUG", "False")
+    os.environ.setdefault("ALLOWED_HOSTS", "*")
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    settings.DATABASES["default"]["NAME"] = ":memory:"
+
+    from django.apps import apps
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model in apps.get_models():
+            editor.create_model(model)
+
+
+def timeit(func: Callable, number: int, repeat: int = 5) -> float:
+    """Return mean duration of `func` call in microseconds,
+    best of `repeat` runs."""
+    func()  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number * 1e6)
+    return min(timings)
@@ -0,0 +1,79 @@
+"""Compare per-request latency of a route that logs (a 404, logged
+by `django.request`) with logging off, written synchronously by a
+`FileHandler` and handed to the `AsyncQueueHandler` writer thread,
+to a page cached file and to one synced on each record (a slow disk,
+or a pipe to a log shipper that is behind)."""
+import logging
+import os
+import tempfile
+
+from benchmarks import setup_django, timeit
+
+setup_django()
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from eshop_api.log import (  # noqa: E402
+    AsyncQueueHandler,
+    JsonFormatter,
+    RequestContextFilter,
+)
+
+NUMBER = 3000
+PATH = "/api/vendors/missing/"
+
+
+class SyncedFileHandler(logging.FileHandler):
+    def flush(self) -> None:
+        super().flush()
+        if self.stream:
+            os.fsync(self.stream.fileno())
+
+
+def use_handler(handler: logging.Handler) -> None:
+    handler.addFilter(RequestContextFilter())
+    for name in ("", "django"):
+        logger = logging.getLogger(name)
+        logger.handlers = [handler]
+    logging.disable(logging.NOTSET)
+
+
+def main():
+    handler = WSGIHandler()
+    environ = RequestFactory()._base_environ(PATH_INFO=PATH)
+
+    def request():
+        response = handler(dict(environ), lambda *args: None)
+        response.close()
+
+    logging.disable(logging.CRITICAL)
+    print(f"{'logging off':<12} {timeit(request, NUMBER):8.1f} us/request")
+    for name, handler_class in (
+        ("file", logging.FileHandler),
+        ("synced file", SyncedFileHandler),
+    ):
+        with tempfile.TemporaryDirectory(dir=os.getcwd()) as tmp:
+            sync = handler_class(os.path.join(tmp, "sync.log"))
+            sync.setFormatter(JsonFormatter())
+            use_handler(sync)
+            sync_us = timeit(request, NUMBER)
+            sync.close()
+
+            queued = AsyncQueueHandler(
+                os.path.join(tmp, "async.log"), maxsize=10 * NUMBER
+            )
+            queued.target = handler_class(os.path.join(tmp, "async.log"))
+            queued.target.setFormatter(JsonFormatter())
+            use_handler(queued)
+            async_us = timeit(request, NUMBER)
+            queued.close()  # waits for the writer, not timed
+
+        print(
+            f"{name:<12} sync: {sync_us:8.1f} us  "
+            f"async: {async_us:8.1f} us/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare per-request latency of an API route served through
+the full middleware stack and through `PathMiddlewareDispatcher`.
+
+Both stacks are pinned here rather than read from `MIDDLEWARE`, which
+holds other middleware (admission, compression, ...) timed by their
+own benchmarks."""
+import logging
+from typing import List
+
+from benchmarks import setup_django, timeit
+
+setup_django()
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+from tests.factories import VendorFactory  # noqa: E402
+
+FULL_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+SITE_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+LEAN_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "eshop_api.middleware.PathMiddlewareDispatcher",
+]
+NUMBER = 3000
+
+
+def build_handler(middleware: List[str]) -> WSGIHandler:
+    with override_settings(
+        MIDDLEWARE=middleware,
+        API_MIDDLEWARE=[],
+        SITE_MIDDLEWARE=SITE_MIDDLEWARE,
+    ):
+        return WSGIHandler()
+
+
+def bench(handler: WSGIHandler, path: str, cookies: str = "") -> float:
+    environ = RequestFactory()._base_environ(
+        PATH_INFO=path, HTTP_COOKIE=cookies
+    )
+
+    def request():
+        response = handler(dict(environ), lambda *args: None)
+        response.close()
+
+    return timeit(request, NUMBER)
+
+
+def main():
+    logging.disable(logging.CRITICAL)  # 401/404 warnings
+    VendorFactory.create()
+    full = build_handler(FULL_MIDDLEWARE)
+    lean = build_handler(LEAN_MIDDLEWARE)
+    # clients that have visited admin send session and csrf cookies
+    cookies = "sessionid=abc; csrftoken=" + "x" * 32
+    for path in ("/api/customers/", "/api/vendors/", "/api/vendors/vendor-1/"):
+        full_us = bench(full, path, cookies)
+        lean_us = bench(lean, path, cookies)
+        print(
+            f"{path:<28} full: {full_us:8.1f} us  lean: {lean_us:8.1f} us  "
+            f"saved: {full_us - lean_us:6.1f} us/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare ninja's default `JSONRenderer` with `FastRenderer`
+on API pages of 100 and 1000 customers."""
+import datetime as dt
+
+from benchmarks import setup_django, timeit
+
+setup_django()
+
+from django.test import RequestFactory  # noqa: E402
+from ninja.renderers import JSONRenderer  # noqa: E402
+
+from customers.models import Customer  # noqa: E402
+from eshop_api.renderers import FastRenderer, msgpack  # noqa: E402
+
+NUMBER = 50
+
+
+def customer_page(size: int) -> dict:
+    now = dt.datetime.now(dt.timezone.utc)
+    return {
+        "items": [
+            {
+                "id": i,
+                "username": f"user_{i}",
+                "email": f"user_{i}@example.com",
+                "first_name": "First",
+                "last_name": "Last",
+                "is_staff": False,
+                "status": Customer.CustomerStatus.ACTIVATED,
+                "phone_number": "+70000000000",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(size)
+        ],
+        "count": size,
+    }
+
+
+def bench(renderer, data: dict, accept: str = "application/json") -> float:
+    request = RequestFactory().get("/", HTTP_ACCEPT=accept)
+    return timeit(
+        lambda: renderer.render(request, data, response_status=200), NUMBER
+    )
+
+
+def main():
+    for size in (100, 1000):
+        data = customer_page(size)
+        results = {
+            "ninja json": bench(JSONRenderer(), data),
+            "fast json": bench(FastRenderer(), data),
+        }
+        if msgpack is not None:
+            results["msgpack"] = bench(
+                FastRenderer(), data, "application/msgpack"
+            )
+        print(
+            f"{size:>5} rows  "
+            + "  ".join(
+                f"{name}: {us:9.1f} us" for name, us in results.items()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
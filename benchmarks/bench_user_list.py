@@ -0,0 +1,59 @@
+"""Peak memory and time of serializing the whole users table
+the old way (`List[UserOut]`) and with the streamed `user_stream`."""
+import tracemalloc
+
+from benchmarks import setup_django, timeit
+
+setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from ninja.renderers import JSONRenderer  # noqa: E402
+
+from x_users.api import user_stream  # noqa: E402
+from x_users.schemas import UserOut  # noqa: E402
+
+User = get_user_model()
+
+
+def old_user_list() -> None:
+    users = [UserOut.from_orm(user).dict() for user in User.objects.all()]
+    JSONRenderer().render(None, users, response_status=200)
+
+
+def streamed_user_list() -> None:
+    response = user_stream(RequestFactory().get("/"))
+    for _ in response.streaming_content:
+        pass
+
+
+def peak_memory(func) -> float:
+    """Peak traced memory of `func` call in MB."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    created = 0
+    for size in (5000, 20000):
+        User.objects.bulk_create(
+            User(username=f"user{i}", email=f"user{i}@example.com")
+            for i in range(created, size)
+        )
+        created = size
+        for name, func in (
+            ("List[UserOut]", old_user_list),
+            ("user_stream", streamed_user_list),
+        ):
+            print(
+                f"{size:>6} users  {name:<14} "
+                f"peak: {peak_memory(func):7.1f} MB  "
+                f"time: {timeit(func, 1, repeat=3) / 1000:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,32 @@
+import datetime as dt
 import logging
 from typing import List
 
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.db.models import Q
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from ninja import Router
-from ninja.pagination import PageNumberPagination, paginate
+from ninja import Query, Router
+from ninja.pagination import paginate
 
+from db.pagination import CachedCountPagination
 from db.schemas import ErrorMessage
+from db.utils import get_many
+from eshop_api.conditional import check_if_match, conditional_get, make_etag
 from utils import trim_attr_name_from_integrity_error
 from x_auth.authentication import StaffOnlyAuthBearer
-
-from .models import Customer
-from .schemas import CustomerCreate, CustomerOut, CustomerUpdate
+from x_users.availability import is_taken
+
+from . import archive, stats
+from .models import ArchivedCustomer, Customer
+from .schemas import (
+    CustomerCreate,
+    CustomerManyOut,
+    CustomerOut,
+    CustomerStatsOut,
+    CustomerUpdate,
+)
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -25,14 +38,74 @@ router = Router(auth=StaffOnlyAuthBearer())
     response=List[CustomerOut],
     url_name="customer_list",
 )
-@paginate(PageNumberPagination)
-def customer_list(request):
-    return Customer.objects.all()
+@paginate(CachedCountPagination)
+def customer_list(
+    request, updated_since: dt.datetime = None, archived: bool = False
+):
+    # the archive is only read when asked for
+    customers = (
+        ArchivedCustomer.objects.all() if archived else Customer.objects.all()
+    )
+    if updated_since is None:
+        return customers
+    # delta sync: uses the `updated_at` index
+    return customers.filter(updated_at__gte=updated_since).order_by(
+        "updated_at", "id"
+    )
+
+
+@router.get("/stats", response=CustomerStatsOut, url_name="customer_stats")
+def customer_stats(request, days: int = Query(30, ge=1, le=366)):
+    return stats.get_customer_stats(days)
+
+
+@router.get(
+    "/many",
+    response={200: CustomerManyOut, 400: ErrorMessage},
+    url_name="customer_many",
+)
+def customer_many(request, ids: str = Query(..., example="1,2,3")):
+    try:
+        items, missing = get_many(
+            Customer.objects.select_related("user"), ids, cast=int
+        )
+    except ValueError as e:
+        return 400, {"error_message": str(e)}
+    return {"items": items, "missing": missing}
 
 
 @router.get("/{id}/", response=CustomerOut, url_name="customer_detail")
-def customer_detail(request, id: int):
-    return get_object_or_404(Customer, id=id)
+def customer_detail(
+    request, id: int, response: HttpResponse, archived: bool = False
+):
+    customer = get_object_or_404(
+        ArchivedCustomer if archived else Customer, id=id
+    )
+    not_modified = conditional_get(
+        request,
+        response,
+        etag=make_etag(customer, customer.user),
+        last_modified=int(customer.updated_at.timestamp()),
+    )
+    return not_modified or customer
+
+
+@router.post(
+    "/{id}/restore",
+    response={200: CustomerOut, 400: ErrorMessage},
+    url_name="customer_restore",
+)
+def customer_restore(request, id: int):
+    """Move a customer back from the archive, status is kept."""
+    customer = get_object_or_404(ArchivedCustomer, id=id)
+    try:
+        return archive.restore_customer(customer)
+    except IntegrityError as e:
+        trouble_attr = trim_attr_name_from_integrity_error(e)
+        logger.warning("Trouble with restoring attribute `%s`", trouble_attr)
+        return 400, {
+            "error_message": f"Restore error! Attribute `{trouble_attr}` is already in use."
+        }
 
 
 @router.post(
@@ -48,6 +121,19 @@ def customer_create(request, payload: CustomerCreate):
     }
     username = user_data.get("username")
     user_email = user_data.get("email")
+    if not is_taken("username", username) and not is_taken(
+        "email", user_email
+    ):
+        # neither is in use, skip looking for a customer or user
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(**user_data)
+                logger.info("Created User instance with id: %s", user.id)
+                return Customer.objects.create(user=user, **customer_data)
+        except IntegrityError:
+            # taken by another process or a bulk insert the filter of
+            # this process hasn't seen, look it up below
+            logger.info("Availability filter missed a taken user")
     if Customer.objects.filter(
         Q(user__username=username) | Q(user__email=user_email)
     ).exists():
@@ -59,10 +145,17 @@ def customer_create(request, payload: CustomerCreate):
     user = User.objects.filter(
         Q(username=username) | Q(email=user_email)
     ).first()
-    if not user:
-        user = User.objects.create_user(**user_data)
-        logger.info(f"Created User instance with id: {user.id}")
-    return Customer.objects.create(user=user, **customer_data)
+    try:
+        with transaction.atomic():
+            if not user:
+                user = User.objects.create_user(**user_data)
+                logger.info("Created User instance with id: %s", user.id)
+            return Customer.objects.create(user=user, **customer_data)
+    except IntegrityError:
+        logger.info("Customer instance duplication attempt")
+        return 400, {
+            "error_message": "Customer instance with such attributes already exists"
+        }
 
 
 @router.put(
@@ -70,37 +163,50 @@ def customer_create(request, payload: CustomerCreate):
     response={200: CustomerOut, 400: ErrorMessage},
     url_name="customer_update",
 )
-def customer_update(request, id: int, payload: CustomerUpdate):
+def customer_update(
+    request, id: int, payload: CustomerUpdate, response: HttpResponse
+):
     customer = get_object_or_404(Customer, id=id)
+    check_if_match(request, make_etag(customer, customer.user))
     valid_data = payload.dict(exclude_unset=True)
     if not valid_data:
         return 400, {"error_message": "Empty request body not allowed"}
 
     for attr, value in valid_data.items():
         setattr(customer, attr, value)
+    changed = customer.get_dirty_fields() + customer.user.get_dirty_fields()
+    response["ETag"] = make_etag(customer, customer.user)
+    if not changed:
+        return customer
     try:
-        customer.save(update_fields=valid_data.keys())
+        # user fields may be the only ones changed, bump `updated_at` anyway
+        customer.save(update_fields=(*changed, "updated_at"))
     except IntegrityError as e:
         trouble_attr = trim_attr_name_from_integrity_error(e)
-        logger.warning(f"Trouble with updating attribute `{trouble_attr}`")
+        logger.warning("Trouble with updating attribute `%s`", trouble_attr)
         return 400, {
             "error_message": f"Update error! Attribute `{trouble_attr}` may already be in use."
         }
+    response["ETag"] = make_etag(customer, customer.user)
     return customer
 
 
 @router.delete("/{id}/delete")
 def customer_delete(request, id: int):
     customer = get_object_or_404(Customer, id=id)
+    check_if_match(request, make_etag(customer, customer.user))
     if customer.status == Customer.CustomerStatus.ARCHIVED:
         return {
             "warning": f"Customer with id {id} is already in archive;"
             "nothing to change."
         }
     customer.status = "archived"
-    # or just customer.user.is_active = False
-    User.objects.filter(customer=customer).update(is_active=False)
-    customer.save(update_fields=("status",))
+    with transaction.atomic():
+        # or just customer.user.is_active = False
+        User.objects.filter(customer=customer).update(is_active=False)
+        # bulk update bypasses signals, so keep the stats in sync by hand
+        stats.bump_user_activity(customer.user.is_active, False)
+        customer.save(update_fields=("status", "updated_at"))
     return {
         "success": f"Customer with id {customer.id} was archived,"
         "`is_active` set to False"
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CustomersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "customers"
+
+    def ready(self):
+        from db import scheduler
+
+        from . import signals  # noqa: F401
+        from .archive import archive_customers
+        from .stats import recompute_customer_stats
+
+        scheduler.register("archive_customers", "0 2 * * *", archive_customers)
+        # fixes counter drift, e.g. after raw SQL
+        scheduler.register(
+            "recompute_customer_stats", "0 4 * * 0", recompute_customer_stats
+        )
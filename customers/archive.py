@@ -0,0 +1,108 @@
+import logging
+from typing import Iterable, List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+
+from db.pagination import invalidate_counts
+from x_users.models import ArchivedUser
+
+from .models import ArchivedCustomer, Customer
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def copy_rows(
+    source: Type[models.Model],
+    target: Type[models.Model],
+    ids: Iterable[int],
+) -> List[int]:
+    """Copy rows with `ids` from `source` to `target` table,
+    columns missing in `target` are skipped. Return copied ids."""
+    target_columns = {field.attname for field in target._meta.concrete_fields}
+    columns = [
+        field.attname
+        for field in source._meta.concrete_fields
+        if field.attname in target_columns
+    ]
+    rows = list(source._base_manager.filter(pk__in=ids).values(*columns))
+    target._base_manager.bulk_create(target(**row) for row in rows)
+    return [row["id"] for row in rows]
+
+
+def delete_rows(model: Type[models.Model], ids: Iterable[int]) -> None:
+    """Delete without signals: rows are moved, not deleted,
+    so stats and the change log must not see a delete."""
+    queryset = model._base_manager.filter(pk__in=ids)
+    queryset._raw_delete(queryset.db)
+
+
+def archivable_user_ids(customer_ids: Iterable[int]) -> List[int]:
+    """Inactive users of `customer_ids` that are safe to move:
+    no staff, no permissions or groups, no admin log entries."""
+    return list(
+        User._base_manager.filter(
+            customer__id__in=customer_ids,
+            is_active=False,
+            is_staff=False,
+            is_superuser=False,
+            groups=None,
+            user_permissions=None,
+            logentry=None,
+        ).values_list("id", flat=True)
+    )
+
+
+def archive_customers(
+    chunk_size: Optional[int] = None, include_users: bool = False
+) -> Tuple[int, int]:
+    """Move customers in `ARCHIVED` status to the archive table,
+    `chunk_size` of them per transaction. With `include_users`
+    their inactive users are moved to the users archive as well.
+
+    Return the number of moved customers and users."""
+    chunk_size = chunk_size or settings.CUSTOMER_ARCHIVE_CHUNK_SIZE
+    moved_customers = moved_users = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Customer._base_manager.select_for_update()
+                .filter(status=Customer.CustomerStatus.ARCHIVED)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            user_ids = archivable_user_ids(ids) if include_users else []
+            copy_rows(Customer, ArchivedCustomer, ids)
+            delete_rows(Customer, ids)
+            copy_rows(User, ArchivedUser, user_ids)
+            delete_rows(User, user_ids)
+        moved_customers += len(ids)
+        moved_users += len(user_ids)
+        logger.info(
+            "Archived %s customers and %s users", len(ids), len(user_ids)
+        )
+
+    for model in (Customer, ArchivedCustomer, User, ArchivedUser):
+        invalidate_counts(model)
+    return moved_customers, moved_users
+
+
+def restore_customer(customer: ArchivedCustomer) -> Customer:
+    """Move an archived customer, and its user if it was archived
+    too, back to the hot tables. Status is kept as is.
+    Raise `IntegrityError` if the username or email was taken
+    in the meantime."""
+    with transaction.atomic():
+        user_ids = copy_rows(ArchivedUser, User, [customer.user_id])
+        delete_rows(ArchivedUser, user_ids)
+        copy_rows(ArchivedCustomer, Customer, [customer.id])
+        delete_rows(ArchivedCustomer, [customer.id])
+
+    for model in (Customer, ArchivedCustomer, User, ArchivedUser):
+        invalidate_counts(model)
+    logger.info("Restored customer %s from the archive", customer.id)
+    return Customer.objects.get(id=customer.id)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from ...archive import archive_customers
+
+
+class Command(BaseCommand):
+    help = "Move customers in archived status to the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="customers moved per transaction, "
+            "default: CUSTOMER_ARCHIVE_CHUNK_SIZE",
+        )
+        parser.add_argument(
+            "--include-users",
+            action="store_true",
+            help="move their inactive users to the users archive too",
+        )
+
+    def handle(self, *args, **options):
+        customers, users = archive_customers(
+            options["chunk_size"], options["include_users"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {customers} customers and {users} users"
+            )
+        )
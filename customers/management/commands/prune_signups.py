@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from ...signups import prune_inactive_signups
+
+
+class Command(BaseCommand):
+    help = "Delete or archive users who never activated their account."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age-days",
+            type=int,
+            help="default: SIGNUP_PRUNE_MAX_AGE_DAYS",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=("delete", "archive"),
+            help="default: SIGNUP_PRUNE_MODE",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only count the users that would be pruned",
+        )
+
+    def handle(self, *args, **options):
+        pruned = prune_inactive_signups(
+            options["max_age_days"], options["mode"], options["dry_run"]
+        )
+        action = "Would prune" if options["dry_run"] else "Pruned"
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} {pruned} inactive signups")
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ...stats import recompute_customer_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild customer statistics counters from scratch."
+
+    def handle(self, *args, **options):
+        recompute_customer_stats()
+        self.stdout.write(self.style.SUCCESS("Customer stats recomputed"))
@@ -1,11 +1,26 @@
+from typing import List, Optional, Union
+
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from db.models import AbstractUserRole, TimeStampModel
+from db.models import (
+    AbstractUserRole,
+    ChangeLogModel,
+    DirtyFieldsMixin,
+    TimeStampModel,
+    VersionedModel,
+)
+from x_users.models import ArchivedUser
 
 
-class Customer(AbstractUserRole, TimeStampModel):
+class Customer(
+    DirtyFieldsMixin,
+    VersionedModel,
+    ChangeLogModel,
+    AbstractUserRole,
+    TimeStampModel,
+):
     class CustomerStatus(models.TextChoices):
         CREATED = "created"
         ACTIVATED = "activated"
@@ -31,3 +46,94 @@ class Customer(AbstractUserRole, TimeStampModel):
         blank=True,
         null=True,
     )
+
+
+class CustomerStatsCounter(models.Model):
+    """Incrementally maintained customer statistics.
+
+    One row per (`kind`, `key`) pair, e.g. (`status`, `frozen`),
+    (`signups`, `2023-01-15`) or (`users`, `active`)."""
+
+    class Kind(models.TextChoices):
+        STATUS = "status"
+        SIGNUPS = "signups"
+        USERS = "users"
+
+    kind = models.CharField(
+        _("statistics kind"),
+        max_length=20,
+        choices=Kind.choices,
+    )
+    key = models.CharField(
+        _("counted value"),
+        max_length=20,
+        help_text=_("customer status, signup date or user activity"),
+    )
+    value = models.BigIntegerField(_("counter value"), default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("kind", "key"), name="unique_customer_stats_counter"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{self.key}={self.value}"
+
+
+class ArchivedCustomerQuerySet(models.QuerySet):
+    """Attach users, hot or archived, to fetched customers
+    with one query per table."""
+
+    def _fetch_all(self) -> None:
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if (
+            fetched
+            and self._result_cache
+            and self._iterable_class is (models.query.ModelIterable)
+        ):
+            self._attach_users(self._result_cache)
+
+    @staticmethod
+    def _attach_users(customers: List["ArchivedCustomer"]) -> None:
+        user_ids = {customer.user_id for customer in customers}
+        users = get_user_model()._base_manager.in_bulk(user_ids)
+        users.update(ArchivedUser.objects.in_bulk(user_ids - set(users)))
+        for customer in customers:
+            customer._user = users.get(customer.user_id)
+
+
+class ArchivedCustomer(models.Model):
+    """Customer in `ARCHIVED` status moved out of the hot customers
+    table, see `customers.archive`. Same columns as `Customer`,
+    `id` is kept for restore. `user` is looked up in both user tables."""
+
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.BigIntegerField(_("user id"), unique=True)
+    status = models.CharField(
+        _("Customer status"),
+        max_length=20,
+        choices=Customer.CustomerStatus.choices,
+    )
+    phone_number = models.CharField(
+        _("Customer phone number"), max_length=15, blank=True, null=True
+    )
+    created_at = models.DateTimeField(_("object creation time"))
+    updated_at = models.DateTimeField(
+        _("object last update time"), db_index=True
+    )
+    version = models.PositiveIntegerField(_("row version"), default=1)
+    archived_at = models.DateTimeField(_("archiving time"), auto_now_add=True)
+
+    objects = ArchivedCustomerQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f"archived customer {self.id}"
+
+    @property
+    def user(self) -> Optional[Union[models.Model, ArchivedUser]]:
+        if "_user" not in self.__dict__:
+            ArchivedCustomerQuerySet._attach_users([self])
+        return self._user
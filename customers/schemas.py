@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Dict, List, Optional
 
 from django.contrib.auth import get_user_model
 from ninja import Field, ModelSchema, Schema
@@ -17,6 +18,7 @@ class CustomerOut(ModelSchema):
     first_name: str = Field("", alias="user.first_name")
     last_name: str = Field("", alias="user.last_name")
     is_staff: bool = Field(False, alias="user.is_staff")
+    last_seen: Optional[datetime] = Field(None, alias="user.last_seen")
 
     class Config:
         model = Customer
@@ -46,6 +48,18 @@ class CustomerUpdate(Schema, extra=Extra.forbid):
     phone_number: str = Field("", min_length=10, max_length=11)
 
 
+class CustomerStatsOut(Schema):
+    total: int
+    statuses: Dict[Customer.CustomerStatus, int]
+    signups: Dict[str, int] = Field(..., description="signups per day")
+    users: Dict[str, int] = Field(..., description="active/inactive users")
+
+
+class CustomerManyOut(Schema):
+    items: List[CustomerOut]
+    missing: List[int]
+
+
 """
 EMAIL_REGEX = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"
 LONG_ENOUGH_REGEX = r"[A-Za-z0-9._%+-]{4}"
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from db.purge import purge_finished
+from x_users.models import ArchivedUser
+
+from . import stats
+from .models import ArchivedCustomer, Customer
+
+User = get_user_model()
+
+
+def is_saved(field_name: str, update_fields) -> bool:
+    return update_fields is None or field_name in update_fields
+
+
+@receiver(post_save, sender=Customer)
+def count_customer(
+    sender, instance: Customer, created: bool, update_fields, **kwargs
+) -> None:
+    if created:
+        stats.bump(stats.Kind.SIGNUPS, stats.signup_day(instance))
+        stats.bump(stats.Kind.STATUS, instance.status)
+        return
+    # receivers run before `DirtyFieldsMixin` takes the new snapshot
+    loaded_status = instance.get_loaded_value("status")
+    if not is_saved("status", update_fields):
+        return
+    if loaded_status not in (None, instance.status):
+        stats.bump(stats.Kind.STATUS, loaded_status, -1)
+        stats.bump(stats.Kind.STATUS, instance.status)
+
+
+@receiver(post_delete, sender=Customer)
+def uncount_customer(sender, instance: Customer, **kwargs) -> None:
+    stats.bump(stats.Kind.SIGNUPS, stats.signup_day(instance), -1)
+    stats.bump(stats.Kind.STATUS, instance.status, -1)
+
+
+@receiver(post_save, sender=User)
+def count_user(
+    sender, instance: User, created: bool, update_fields, **kwargs
+) -> None:
+    if created:
+        stats.bump_user_activity(None, instance.is_active)
+        return
+    loaded_is_active = instance.get_loaded_value("is_active")
+    if is_saved("is_active", update_fields) and loaded_is_active is not None:
+        stats.bump_user_activity(loaded_is_active, instance.is_active)
+
+
+@receiver(post_delete, sender=User)
+def uncount_user(sender, instance: User, **kwargs) -> None:
+    stats.bump_user_activity(instance.get_loaded_value("is_active"), None)
+
+
+@receiver(purge_finished, sender=User)
+def purge_archived_users(sender, job, using: str, **kwargs) -> None:
+    """Purged users may have archived customers, or be archived
+    themselves. Counters are rebuilt, the purge bypasses signals."""
+    ArchivedCustomer.objects.using(using).filter(
+        user_id__in=job.object_ids
+    ).delete()
+    ArchivedUser.objects.using(using).filter(id__in=job.object_ids).delete()
+    stats.recompute_customer_stats()
@@ -0,0 +1,124 @@
+import datetime as dt
+import logging
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from db.models import PurgeJob
+from db.pagination import invalidate_counts
+from db.purge import run_purge_job
+from eshop_api.metrics import metrics
+from x_users.models import ArchivedUser
+
+from .archive import copy_rows, delete_rows
+from .models import ArchivedCustomer, Customer
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def inactive_signups(max_age: dt.timedelta) -> models.QuerySet:
+    """Users that never activated their account, logged in or made a
+    request, and joined more than `max_age` ago. Archived customers are
+    inactive as well, but they were active once: only customers still
+    in `created` status count.
+    Ordered to scan the `(is_active, date_joined)` index."""
+    return (
+        User._base_manager.filter(
+            is_active=False,
+            date_joined__lt=timezone.now() - max_age,
+            last_login=None,
+            last_seen=None,
+            is_staff=False,
+            is_superuser=False,
+        )
+        .filter(
+            Q(customer=None)
+            | Q(customer__status=Customer.CustomerStatus.CREATED)
+        )
+        .order_by("date_joined", "id")
+    )
+
+
+def archive_signups(signups: models.QuerySet, chunk_size: int) -> int:
+    """Move signups and their customers to the archive tables,
+    `chunk_size` users per transaction."""
+    signups = signups.filter(groups=None, user_permissions=None, logentry=None)
+    archived = 0
+    while True:
+        with transaction.atomic():
+            user_ids = list(signups.values_list("id", flat=True)[:chunk_size])
+            if not user_ids:
+                break
+            customer_ids = list(
+                Customer._base_manager.filter(
+                    user_id__in=user_ids
+                ).values_list("id", flat=True)
+            )
+            copy_rows(Customer, ArchivedCustomer, customer_ids)
+            delete_rows(Customer, customer_ids)
+            copy_rows(User, ArchivedUser, user_ids)
+            delete_rows(User, user_ids)
+        archived += len(user_ids)
+    for model in (Customer, ArchivedCustomer, User, ArchivedUser):
+        invalidate_counts(model)
+    return archived
+
+
+def delete_signups(signups: models.QuerySet, chunk_size: int) -> int:
+    """Delete signups with everything cascading from them through
+    purge jobs of `chunk_size` users, each chunk selected right before
+    its job runs so that users active in the meantime are kept."""
+    chunk_size = min(chunk_size, settings.PURGE_MAX_IDS)
+    deleted = 0
+    while True:
+        user_ids = list(signups.values_list("id", flat=True)[:chunk_size])
+        if not user_ids:
+            return deleted
+        job = PurgeJob.objects.create(
+            model=User._meta.label_lower, object_ids=user_ids
+        )
+        run_purge_job(job)
+        if job.status != PurgeJob.Status.DONE:
+            raise RuntimeError(f"Purge job {job.pk} failed: {job.error}")
+        deleted += len(user_ids)
+
+
+def prune_inactive_signups(
+    max_age_days: Optional[int] = None,
+    mode: Optional[str] = None,
+    dry_run: bool = False,
+) -> int:
+    """Delete or archive (`mode`) users still inactive
+    `max_age_days` after signing up. Return the number of users
+    pruned, or that would be pruned with `dry_run`."""
+    if max_age_days is None:
+        max_age_days = settings.SIGNUP_PRUNE_MAX_AGE_DAYS
+    max_age = dt.timedelta(days=max_age_days)
+    mode = mode or settings.SIGNUP_PRUNE_MODE
+    if mode not in ("delete", "archive"):
+        raise ValueError(f"unknown prune mode: {mode}")
+    started = time.perf_counter()
+    signups = inactive_signups(max_age)
+    if dry_run:
+        pruned = signups.count()
+        metrics.incr("signups.prune.candidates", pruned)
+    elif mode == "archive":
+        pruned = archive_signups(signups, settings.SIGNUP_PRUNE_CHUNK_SIZE)
+        metrics.incr("signups.prune.archived", pruned)
+    else:
+        pruned = delete_signups(signups, settings.SIGNUP_PRUNE_CHUNK_SIZE)
+        metrics.incr("signups.prune.deleted", pruned)
+    metrics.observe("signups.prune.duration", time.perf_counter() - started)
+    logger.info(
+        "%s %s inactive signups older than %s days",
+        "Found" if dry_run else f"Pruned ({mode})",
+        pruned,
+        max_age.days,
+    )
+    return pruned
@@ -0,0 +1,108 @@
+import datetime as dt
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from x_users.models import ArchivedUser
+
+from .models import ArchivedCustomer, Customer, CustomerStatsCounter
+
+User = get_user_model()
+Kind = CustomerStatsCounter.Kind
+logger = logging.getLogger(__name__)
+
+
+def bump(kind: str, key: str, delta: int = 1) -> None:
+    """Atomically add `delta` to a counter, creating it if needed."""
+    counters = CustomerStatsCounter.objects.filter(kind=kind, key=key)
+    if counters.update(value=F("value") + delta):
+        return
+    try:
+        with transaction.atomic():
+            CustomerStatsCounter.objects.create(
+                kind=kind, key=key, value=delta
+            )
+    except IntegrityError:
+        # created concurrently by another writer
+        counters.update(value=F("value") + delta)
+
+
+def signup_day(customer: Customer) -> str:
+    return timezone.localdate(customer.created_at).isoformat()
+
+
+def activity_key(is_active: bool) -> str:
+    return "active" if is_active else "inactive"
+
+
+def bump_user_activity(
+    old_is_active: Optional[bool], new_is_active: Optional[bool]
+) -> None:
+    """Move a user between `active` and `inactive` counters.
+    `None` means the user did not exist before or does not exist anymore."""
+    if old_is_active == new_is_active:
+        return
+    if old_is_active is not None:
+        bump(Kind.USERS, activity_key(old_is_active), -1)
+    if new_is_active is not None:
+        bump(Kind.USERS, activity_key(new_is_active), 1)
+
+
+def recompute_customer_stats() -> None:
+    """Rebuild all counters from the customer and user tables,
+    archived customers and users included."""
+    values = defaultdict(int)
+    for model in (Customer, ArchivedCustomer):
+        for row in model.objects.values("status").annotate(n=Count("id")):
+            values[Kind.STATUS, row["status"]] += row["n"]
+        signups = (
+            model.objects.annotate(day=TruncDate("created_at"))
+            .values("day")
+            .annotate(n=Count("id"))
+        )
+        for row in signups:
+            values[Kind.SIGNUPS, row["day"].isoformat()] += row["n"]
+    for model in (User, ArchivedUser):
+        for row in model.objects.values("is_active").annotate(n=Count("id")):
+            values[Kind.USERS, activity_key(row["is_active"])] += row["n"]
+    counters = [
+        CustomerStatsCounter(kind=kind, key=key, value=value)
+        for (kind, key), value in values.items()
+    ]
+    with transaction.atomic():
+        CustomerStatsCounter.objects.all().delete()
+        CustomerStatsCounter.objects.bulk_create(counters)
+    logger.info("Recomputed %s customer stats counters", len(counters))
+
+
+def get_customer_stats(days: int = 30) -> Dict[str, Any]:
+    """Read statistics from the counters table.
+    Counters are rebuilt first if they have never been computed."""
+    since = (timezone.localdate() - dt.timedelta(days=days)).isoformat()
+    counters = CustomerStatsCounter.objects.exclude(
+        kind=Kind.SIGNUPS, key__lt=since
+    )
+    if not counters.exists() and User.objects.exists():
+        recompute_customer_stats()
+
+    stats = {
+        "statuses": dict.fromkeys(Customer.CustomerStatus.values, 0),
+        "signups": {},
+        "users": {"active": 0, "inactive": 0},
+    }
+    for counter in counters:
+        if counter.kind == Kind.STATUS:
+            stats["statuses"][counter.key] = counter.value
+        elif counter.kind == Kind.USERS:
+            stats["users"][counter.key] = counter.value
+        elif counter.value:
+            stats["signups"][counter.key] = counter.value
+    stats["signups"] = dict(sorted(stats["signups"].items()))
+    stats["total"] = sum(stats["statuses"].values())
+    return stats
@@ -0,0 +1,44 @@
+from typing import List
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from ninja import Query, Router
+
+from x_auth.authentication import StaffOnlyAuthBearer
+
+from .changes import stream_changes, wait_for_changes
+from .schemas import ChangeFeedOut
+
+router = Router(auth=StaffOnlyAuthBearer())
+
+
+@router.get("/", response=ChangeFeedOut, url_name="change_list")
+def change_list(
+    request,
+    since: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    models: List[str] = Query(None, description="e.g. customers.customer"),
+    wait: float = Query(0, ge=0, description="long-poll timeout, seconds"),
+):
+    timeout = min(wait, settings.CHANGE_FEED_MAX_WAIT)
+    entries = wait_for_changes(since, limit, models, timeout)
+    return {
+        "items": entries,
+        "next_cursor": entries[-1].id if entries else since,
+    }
+
+
+@router.get("/stream", url_name="change_stream")
+def change_stream(
+    request,
+    since: int = Query(0, ge=0),
+    models: List[str] = Query(None),
+):
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    if last_event_id.isdigit():
+        since = max(since, int(last_event_id))
+    response = StreamingHttpResponse(
+        stream_changes(since, models), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    return response
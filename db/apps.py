@@ -4,3 +4,36 @@ from django.apps import AppConfig
 class DbConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "db"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import checks  # noqa: F401, registers the system checks
+        from . import invalidation, scheduler, slow_queries
+        from .maintenance import optimize_databases
+        from .purge import run_pending_purge_jobs
+        from .signals import (
+            connect_change_log_signals,
+            connect_count_cache_signals,
+            connect_invalidation_signals,
+        )
+
+        connect_change_log_signals()
+        connect_count_cache_signals()
+        connect_invalidation_signals()
+        connection_created.connect(
+            slow_queries.install, dispatch_uid="slow_queries"
+        )
+        scheduler.register(
+            "optimize_databases", "30 3 * * *", optimize_databases
+        )
+        # jobs of crashed processes once their `PURGE_LEASE` expires,
+        # or all jobs without PURGE_IN_PROCESS
+        scheduler.register(
+            "run_purge_jobs", "*/5 * * * *", run_pending_purge_jobs
+        )
+        scheduler.register(
+            "prune_invalidation_events",
+            "*/10 * * * *",
+            invalidation.prune_events,
+        )
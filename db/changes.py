@@ -0,0 +1,70 @@
+import datetime as dt
+import time
+from typing import Iterator, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ChangeLogEntry
+from .schemas import ChangeOut
+
+
+def fetch_changes(
+    since: int, limit: int, models: Optional[List[str]] = None
+) -> List[ChangeLogEntry]:
+    """Return up to `limit` entries following the `since` cursor.
+    Uses the primary key (or the `model`, `id` index) only.
+
+    Ids are allocated before commit, so an entry may become visible
+    after entries with higher ids, and a cursor moved past those would
+    skip it for good. Only entries at least `CHANGE_FEED_SETTLE` secs
+    old are returned, up to the first younger one, like
+    `db.invalidation.DatabaseTransport`."""
+    settled = timezone.now() - dt.timedelta(
+        seconds=settings.CHANGE_FEED_SETTLE
+    )
+    entries = ChangeLogEntry.objects.filter(id__gt=since)
+    if models:
+        entries = entries.filter(model__in=models)
+    result = []
+    for entry in entries.order_by("id")[:limit]:
+        if entry.created_at > settled:
+            break
+        result.append(entry)
+    return result
+
+
+def wait_for_changes(
+    since: int,
+    limit: int,
+    models: Optional[List[str]] = None,
+    timeout: float = 0,
+) -> List[ChangeLogEntry]:
+    """Long-poll the change log until new entries appear
+    or `timeout` seconds pass."""
+    deadline = time.monotonic() + timeout
+    while True:
+        entries = fetch_changes(since, limit, models)
+        if entries or time.monotonic() >= deadline:
+            return entries
+        time.sleep(settings.CHANGE_FEED_POLL_INTERVAL)
+
+
+def stream_changes(
+    since: int, models: Optional[List[str]] = None
+) -> Iterator[str]:
+    """Yield server-sent events for new change log entries.
+
+    The stream ends after `CHANGE_FEED_STREAM_TIMEOUT` seconds;
+    clients reconnect sending the last seen id in `Last-Event-ID`."""
+    deadline = time.monotonic() + settings.CHANGE_FEED_STREAM_TIMEOUT
+    while time.monotonic() < deadline:
+        entries = fetch_changes(since, settings.CHANGE_FEED_PAGE_SIZE, models)
+        for entry in entries:
+            data = ChangeOut.from_orm(entry).json()
+            yield f"id: {entry.id}\nevent: change\ndata: {data}\n\n"
+            since = entry.id
+        if not entries:
+            # keep intermediaries from closing an idle connection
+            yield ": keepalive\n\n"
+            time.sleep(settings.CHANGE_FEED_POLL_INTERVAL)
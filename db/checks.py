@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core import checks
+
+from .utils import cache_is_shared
+
+
+@checks.register(checks.Tags.caches)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """Read-your-writes pins (`ReplicaStickinessMiddleware`) are kept in
+    the default cache, a per-process one doesn't pin other workers."""
+    if settings.REPLICA_DATABASES and not cache_is_shared():
+        return [
+            checks.Warning(
+                "REPLICA_DATABASES are set but the default cache is "
+                "per process, clients aren't pinned to the primary "
+                "across workers after a write.",
+                hint="Configure a shared CACHES backend, e.g. Redis.",
+                id="db.W001",
+            )
+        ]
+    return []
@@ -0,0 +1,280 @@
+import abc
+import datetime as dt
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from eshop_api.metrics import metrics
+
+from .models import InvalidationEvent
+from .scheduler import node_name
+
+logger = logging.getLogger(__name__)
+
+# (topic, key), key `None` invalidates everything under the topic
+Message = Tuple[str, Optional[str]]
+Callback = Callable[[Optional[str]], None]
+
+_subscribers: Dict[str, List[Callback]] = defaultdict(list)
+_transport: Optional["Transport"] = None
+_transport_pid: Optional[int] = None
+_poll_lock = threading.Lock()
+_last_poll = 0.0
+
+
+class Transport(abc.ABC):
+    """Carries messages published by one process to all the others.
+    Subclasses missing a method fail when created, not later in an
+    `on_commit` callback."""
+
+    def __init__(self, node: str) -> None:
+        self.node = node
+
+    @abc.abstractmethod
+    def publish(self, messages: List[Message]) -> None:
+        """Send `messages` to the other processes."""
+
+    @abc.abstractmethod
+    def poll(self) -> Optional[List[Message]]:
+        """Messages of other processes since the last poll,
+        `None` if some of them may have been lost."""
+
+
+class FileTransport(Transport):
+    """Single host transport: an append-only file of JSON lines shared
+    by all processes. Each process keeps its own read offset. The
+    file is rotated after `INVALIDATION_FILE_MAX_BYTES`, readers
+    noticing the rotation may have lost messages."""
+
+    def __init__(
+        self,
+        node: str,
+        path: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        super().__init__(node)
+        self.path = str(path or settings.INVALIDATION_FILE)
+        self.max_bytes = max_bytes or settings.INVALIDATION_FILE_MAX_BYTES
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._offset: Optional[int] = None
+
+    def publish(self, messages: List[Message]) -> None:
+        data = "".join(
+            json.dumps([self.node, topic, key]) + "\n"
+            for topic, key in messages
+        ).encode()
+        # a single O_APPEND write, lines of concurrent writers don't mix
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > self.max_bytes:
+            try:
+                os.replace(self.path, f"{self.path}.1")
+            except FileNotFoundError:  # rotated by another process
+                pass
+
+    def poll(self) -> Optional[List[Message]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            file_id, size = None, 0
+        else:
+            file_id, size = (stat.st_dev, stat.st_ino), stat.st_size
+
+        if self._offset is None:  # first poll, start from the end
+            if file_id is None:
+                # so that a rotation before the next poll is noticed
+                self.publish([])
+                return self.poll()
+            self._file_id, self._offset = file_id, size
+            return []
+        if file_id != self._file_id:
+            rotated = self._file_id is not None
+            self._file_id, self._offset = file_id, 0
+            if rotated:
+                self._offset = size
+                return None
+        if size < self._offset:  # truncated
+            self._offset = size
+            return None
+        if size == self._offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        data = data[: data.rfind(b"\n") + 1]  # a line may be half written
+        self._offset += len(data)
+        messages = []
+        for line in data.splitlines():
+            node, topic, key = json.loads(line)
+            if node != self.node:
+                messages.append((topic, key))
+        return messages
+
+
+class DatabaseTransport(Transport):
+    """Multi-host transport: `InvalidationEvent` rows polled by id.
+
+    Ids are allocated before commit, so an event may become visible
+    after events with higher ids. Events are therefore read again
+    until they are `INVALIDATION_DB_GRACE` seconds old, already seen
+    ones are skipped. Rows are pruned by the `prune_invalidation_events`
+    job, a process that didn't poll for `INVALIDATION_RETENTION`
+    seconds reports lost messages."""
+
+    def __init__(self, node: str) -> None:
+        super().__init__(node)
+        self._low_id: Optional[int] = None
+        self._seen: Set[int] = set()
+        self._last_poll: Optional[dt.datetime] = None
+
+    def publish(self, messages: List[Message]) -> None:
+        InvalidationEvent.objects.bulk_create(
+            InvalidationEvent(node=self.node, topic=topic, key=key)
+            for topic, key in messages
+        )
+
+    def poll(self) -> Optional[List[Message]]:
+        now = timezone.now()
+        last_poll, self._last_poll = self._last_poll, now
+        if self._low_id is None or now - last_poll > dt.timedelta(
+            seconds=settings.INVALIDATION_RETENTION
+        ):
+            lost = self._low_id is not None
+            self._low_id = (
+                InvalidationEvent.objects.aggregate(Max("id"))["id__max"] or 0
+            )
+            self._seen.clear()
+            return None if lost else []
+
+        settled = now - dt.timedelta(seconds=settings.INVALIDATION_DB_GRACE)
+        messages = []
+        events = InvalidationEvent.objects.filter(id__gt=self._low_id)
+        for pk, node, topic, key, created_at in events.order_by(
+            "id"
+        ).values_list("id", "node", "topic", "key", "created_at"):
+            if created_at < settled:
+                self._low_id = pk
+            if pk in self._seen:
+                continue
+            self._seen.add(pk)
+            if node != self.node:
+                messages.append((topic, key))
+        self._seen = {pk for pk in self._seen if pk > self._low_id}
+        return messages
+
+
+def get_transport() -> Optional[Transport]:
+    """Transport of this process, per pid so that workers forked
+    after the transport was created get their own node name."""
+    global _transport, _transport_pid
+    if not settings.INVALIDATION_TRANSPORT:
+        return None
+    if _transport is None or _transport_pid != os.getpid():
+        transport_class = import_string(settings.INVALIDATION_TRANSPORT)
+        _transport, _transport_pid = transport_class(node_name()), os.getpid()
+    return _transport
+
+
+@receiver(setting_changed)
+def reset_transport(setting: str, **kwargs) -> None:
+    global _transport
+    if setting.startswith("INVALIDATION_"):
+        _transport = None
+
+
+def subscribe(topic: str, callback: Callback) -> None:
+    """Call `callback(key)` when `key` of `topic` is invalidated in
+    any process, `callback(None)` when the whole topic is."""
+    if callback not in _subscribers[topic]:
+        _subscribers[topic].append(callback)
+
+
+def dispatch(topic: str, key: Optional[str]) -> None:
+    for callback in _subscribers.get(topic, ()):
+        try:
+            callback(key)
+        except Exception:
+            logger.exception("Invalidation of %s:%s failed", topic, key)
+
+
+def publish(topic: str, key: Optional[str] = None) -> None:
+    """Invalidate `key` of `topic`: subscribers of this process
+    right away, the other processes once the transaction commits."""
+    dispatch(topic, key)
+    transport = get_transport()
+    if transport is None:
+        return
+
+    def send():
+        try:
+            transport.publish([(topic, key)])
+        except Exception:
+            # others catch up at the latest when their caches expire
+            logger.exception(
+                "Publishing invalidation of %s:%s failed", topic, key
+            )
+            metrics.incr("invalidation.publish_failed")
+        else:
+            metrics.incr("invalidation.published")
+
+    transaction.on_commit(send)
+
+
+def poll(force: bool = False) -> int:
+    """Apply invalidations published by other processes, at most
+    once per `INVALIDATION_POLL_INTERVAL` secs unless `force`d.
+    Return the number of messages applied."""
+    global _last_poll
+    transport = get_transport()
+    if transport is None:
+        return 0
+    now = time.monotonic()
+    if not force and now - _last_poll < settings.INVALIDATION_POLL_INTERVAL:
+        return 0
+    if not _poll_lock.acquire(blocking=False):
+        return 0  # being polled by another thread
+    try:
+        _last_poll = now
+        messages = transport.poll()
+    except Exception:
+        logger.exception("Polling invalidations failed")
+        return 0
+    finally:
+        _poll_lock.release()
+
+    if messages is None:
+        logger.warning("Invalidations may have been lost, flushing caches")
+        metrics.incr("invalidation.flushes")
+        messages = [(topic, None) for topic in list(_subscribers)]
+    for topic, key in messages:
+        dispatch(topic, key)
+    metrics.incr("invalidation.received", len(messages))
+    return len(messages)
+
+
+def prune_events() -> int:
+    """Delete `InvalidationEvent` rows older than `INVALIDATION_RETENTION`."""
+    cutoff = timezone.now() - dt.timedelta(
+        seconds=settings.INVALIDATION_RETENTION
+    )
+    deleted, _ = InvalidationEvent.objects.filter(
+        created_at__lt=cutoff
+    ).delete()
+    return deleted
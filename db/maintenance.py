@@ -0,0 +1,28 @@
+import logging
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# rows sampled per index by SQLite `ANALYZE`, keeps it fast on big tables
+SQLITE_ANALYSIS_LIMIT = 1000
+
+
+def optimize_databases() -> None:
+    """Refresh planner statistics (also used for count estimates, see
+    `db.pagination`) and give free pages back to the file system."""
+    for alias in connections:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(
+                    f"PRAGMA analysis_limit={SQLITE_ANALYSIS_LIMIT}"
+                )
+                cursor.execute("ANALYZE")
+                cursor.execute("PRAGMA optimize")
+                # a no-op unless the file uses `auto_vacuum=INCREMENTAL`
+                cursor.execute("PRAGMA incremental_vacuum")
+                cursor.fetchall()
+            elif connection.vendor == "postgresql":
+                cursor.execute("ANALYZE")
+        logger.info("Optimized database %s", alias)
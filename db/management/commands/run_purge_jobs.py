@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ...purge import run_pending_purge_jobs
+
+
+class Command(BaseCommand):
+    help = "Run pending purge (erasure) jobs."
+
+    def handle(self, *args, **options):
+        jobs = run_pending_purge_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Ran {jobs} purge jobs"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from ... import scheduler
+
+
+class Command(BaseCommand):
+    help = "Run periodic maintenance jobs registered by the apps."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="run the jobs that are due and exit",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            ran = scheduler.run_pending()
+            self.stdout.write(
+                self.style.SUCCESS(f"Ran jobs: {', '.join(ran) or 'none'}")
+            )
+            return
+        scheduler.run_forever()
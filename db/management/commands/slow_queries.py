@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...slow_queries import ORDERINGS, summarize
+
+
+class Command(BaseCommand):
+    help = "Summarize slow queries of a JSON lines log by fingerprint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="default: LOG_FILE")
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--order-by", choices=ORDERINGS, default="total")
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.LOG_FILE
+        if not path:
+            raise CommandError("No path given and LOG_FILE isn't set")
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = summarize(f).top(
+                    options["limit"], options["order_by"]
+                )
+        except OSError as e:
+            raise CommandError(f"Can't read {path}: {e}")
+        if not entries:
+            self.stdout.write("No slow queries")
+        for entry in entries:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{entry['fingerprint']}  count: {entry['count']}  "
+                    f"total: {entry['total']:.3f}s  "
+                    f"mean: {entry['mean'] * 1000:.1f}ms  "
+                    f"max: {entry['max'] * 1000:.1f}ms"
+                )
+            )
+            self.stdout.write(f"  {entry['sql']}")
+            for site, count in entry["call_sites"].items():
+                self.stdout.write(f"  {count:>6} x {site}")
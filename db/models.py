@@ -1,11 +1,371 @@
 import datetime as dt
-from typing import Any, Dict, Literal, Mapping, Tuple
-
-from django.db import models
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from django.conf import settings
+from django.db import DatabaseError, models, router, transaction
+from django.db.models import F
 from django.db.models.query import QuerySet
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
+from . import utils
+
+
+class DirtyFieldsMixin(models.Model):
+    """Django model remembering field values loaded from the database.
+
+    `save()` without `update_fields` writes only the fields changed since
+    load or last save, together with `auto_now` fields. Nothing is written
+    if no field changed. Explicit `update_fields` are respected as is.
+    Values are compared with `==`, in-place changes of mutable values
+    (e.g. JSON) are not detected.
+
+    Put the mixin first in model bases, so that other `save()`
+    overrides see the computed `update_fields`."""
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values) -> "DirtyFieldsMixin":
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self, fields: Optional[Iterable[str]] = None) -> None:
+        """Remember current values of loaded (not deferred) fields."""
+        loaded = self.__dict__.setdefault("_loaded_values", {})
+        for field in self._meta.concrete_fields:
+            if fields is not None and not {field.name, field.attname} & set(
+                fields
+            ):
+                continue
+            if field.attname in self.__dict__:
+                loaded[field.attname] = self.__dict__[field.attname]
+
+    def get_loaded_value(self, field_name: str, default: Any = None) -> Any:
+        """Value of the field as loaded from (or last saved to) the db."""
+        attname = self._meta.get_field(field_name).attname
+        return self.__dict__.get("_loaded_values", {}).get(attname, default)
+
+    def get_dirty_fields(self) -> List[str]:
+        """Names of fields changed since load or last save.
+        All loaded fields for instances not saved yet."""
+        loaded = self.__dict__.get("_loaded_values", {})
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in self.__dict__
+            and (
+                field.attname not in loaded
+                or loaded[field.attname] != self.__dict__[field.attname]
+            )
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        if (
+            not self._state.adding
+            and "_loaded_values" in self.__dict__
+            and kwargs.get("update_fields") is None
+            and not args
+            and not kwargs.get("force_insert")
+        ):
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return
+            kwargs["update_fields"] = dirty + [
+                field.name
+                for field in self._meta.concrete_fields
+                if getattr(field, "auto_now", False)
+                and field.name not in dirty
+            ]
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None) -> None:
+        super().refresh_from_db(using, fields)
+        self._snapshot(fields)
+
+
+class StaleObjectError(DatabaseError):
+    """The row was changed by someone else since it was loaded."""
+
+
+class VersionedModel(models.Model):
+    """Django model with optimistic concurrency control.
+
+    Every update is a conditional `UPDATE ... WHERE version = n` that
+    also increments `version`, check and write in one query. If the row
+    was changed since the instance was loaded, `StaleObjectError` is
+    raised and nothing is written. Deletes are conditional as well."""
+
+    version = models.PositiveIntegerField(
+        _("row version"),
+        default=1,
+        editable=False,
+        help_text=_("incremented on every update"),
+    )
+
+    class Meta:
+        abstract = True
+
+    def _do_update(
+        self, base_qs, using, pk_val, values, update_fields, forced_update
+    ) -> bool:
+        values = [value for value in values if value[0].name != "version"]
+        version_field = self._meta.get_field("version")
+        values.append((version_field, None, F("version") + 1))
+        current = base_qs.filter(version=self.version)
+        updated = super()._do_update(
+            current, using, pk_val, values, update_fields, forced_update
+        )
+        if not updated:
+            if base_qs.filter(pk=pk_val).exists():
+                raise StaleObjectError(
+                    f"{self._meta.label} {pk_val} was changed since "
+                    f"version {self.version}"
+                )
+            return False
+        self.version += 1
+        if hasattr(self, "_snapshot"):  # see `DirtyFieldsMixin`
+            self._snapshot(["version"])
+        return True
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using):
+            # claim the row: fails if it changed, locks it until commit
+            claimed = (
+                type(self)
+                ._base_manager.using(using)
+                .filter(pk=self.pk, version=self.version)
+                .update(version=F("version") + 1)
+            )
+            if not claimed:
+                raise StaleObjectError(
+                    f"{self._meta.label} {self.pk} was changed since "
+                    f"version {self.version}"
+                )
+            return super().delete(*args, **kwargs)
+
+
+class ChangeLogEntry(models.Model):
+    """Append-only log of changes made to `ChangeLogModel` instances.
+
+    Entry `id` is used as a cursor by change feed consumers."""
+
+    class Action(models.TextChoices):
+        CREATE = "create"
+        UPDATE = "update"
+        DELETE = "delete"
+
+    model = models.CharField(
+        _("changed model label"),
+        max_length=100,
+        help_text=_("format: app_label.model_name"),
+    )
+    object_id = models.CharField(
+        _("changed object primary key"), max_length=64
+    )
+    action = models.CharField(
+        _("change type"), max_length=10, choices=Action.choices
+    )
+    changed_fields = models.JSONField(
+        _("changed fields"),
+        default=list,
+        help_text=_("empty if all fields were written"),
+    )
+    created_at = models.DateTimeField(_("change time"), auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=("model", "id"))]
+
+    def __str__(self) -> str:
+        return f"{self.action} {self.model}:{self.object_id}"
+
+    @classmethod
+    def entry_for(
+        cls,
+        instance: models.Model,
+        action: str,
+        changed_fields: Optional[Iterable[str]] = None,
+    ) -> "ChangeLogEntry":
+        return cls(
+            model=instance._meta.label_lower,
+            object_id=str(instance.pk),
+            action=action,
+            changed_fields=sorted(changed_fields or ()),
+        )
+
+
+class ChangeLogQuerySet(QuerySet):
+    """Record bulk updates in the change log.
+    Bump `updated_at` and `version` of updated rows
+    if the model has them."""
+
+    def update(self, **kwargs) -> int:
+        """Update rows `CHANGE_LOG_UPDATE_CHUNK_SIZE` at a time, in
+        primary key order, each chunk with its log entries in its own
+        transaction, so bound variables and write locks stay bounded."""
+        field_names = {field.name for field in self.model._meta.fields}
+        if "updated_at" not in kwargs and "updated_at" in field_names:
+            kwargs.update(utils.updated_at())
+        changed_fields = sorted(kwargs)
+        if issubclass(self.model, VersionedModel):
+            kwargs["version"] = F("version") + 1
+        rows = 0
+        last_pk = None
+        while True:
+            chunk = self.order_by("pk")
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            with transaction.atomic(using=self.db, savepoint=False):
+                pks = list(
+                    chunk.values_list("pk", flat=True)[
+                        : settings.CHANGE_LOG_UPDATE_CHUNK_SIZE
+                    ]
+                )
+                if not pks:
+                    return rows
+                # restrict the update to logged rows only
+                rows += super(
+                    ChangeLogQuerySet, self.filter(pk__in=pks)
+                ).update(**kwargs)
+                ChangeLogEntry.objects.using(self.db).bulk_create(
+                    ChangeLogEntry(
+                        model=self.model._meta.label_lower,
+                        object_id=str(pk),
+                        action=ChangeLogEntry.Action.UPDATE,
+                        changed_fields=changed_fields,
+                    )
+                    for pk in pks
+                )
+            last_pk = pks[-1]
+
+
+ChangeLogManager = models.Manager.from_queryset(ChangeLogQuerySet)
+
+
+class ChangeLogModel(models.Model):
+    """Django model writing to the change log on every save.
+    Deletes are logged by `db.signals.log_delete`.
+    Subclasses should use a manager built on `ChangeLogQuerySet`."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs) -> None:
+        action = (
+            ChangeLogEntry.Action.CREATE
+            if self._state.adding
+            else ChangeLogEntry.Action.UPDATE
+        )
+        update_fields = kwargs.get("update_fields")
+        using = kwargs.get("using") or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            ChangeLogEntry.entry_for(self, action, update_fields).save(
+                using=using
+            )
+
+
+class PurgeJob(models.Model):
+    """Erasure of a set of rows together with everything cascading
+    from them, run in the background by `db.purge.run_purge_job`."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    model = models.CharField(
+        _("purged model label"),
+        max_length=100,
+        help_text=_("format: app_label.model_name"),
+    )
+    object_ids = models.JSONField(_("primary keys of purged rows"))
+    status = models.CharField(
+        _("job status"),
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+    )
+    progress = models.JSONField(
+        _("deleted or unlinked rows"),
+        default=dict,
+        help_text=_("per model label, updated after every chunk"),
+    )
+    error = models.TextField(_("failure reason"), blank=True)
+    created_at = models.DateTimeField(
+        _("job creation time"), auto_now_add=True
+    )
+    started_at = models.DateTimeField(_("job start time"), null=True)
+    finished_at = models.DateTimeField(_("job end time"), null=True)
+
+    def __str__(self) -> str:
+        return f"purge {self.model} ({self.status})"
+
+
+class ScheduledJobState(models.Model):
+    """Schedule and lease of a `db.scheduler` job, shared by all nodes.
+    A node runs the job only after taking the lease with a conditional
+    update, so each run happens on one node."""
+
+    name = models.CharField(_("job name"), max_length=100, primary_key=True)
+    next_run_at = models.DateTimeField(_("next run time"))
+    lease_owner = models.CharField(
+        _("node running the job"), max_length=255, blank=True
+    )
+    lease_expires_at = models.DateTimeField(
+        _("lease expiration time"),
+        null=True,
+        help_text=_("another node may take over after it"),
+    )
+    last_run_at = models.DateTimeField(_("last run start time"), null=True)
+    last_duration = models.FloatField(_("last run duration, secs"), null=True)
+    last_error = models.TextField(_("last run failure"), blank=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class InvalidationEvent(models.Model):
+    """Cache invalidation message of `db.invalidation.DatabaseTransport`,
+    polled by the processes of all hosts and pruned after
+    `INVALIDATION_RETENTION` seconds."""
+
+    node = models.CharField(_("publishing process"), max_length=255)
+    topic = models.CharField(_("invalidated topic"), max_length=100)
+    key = models.CharField(
+        _("invalidated key"),
+        max_length=255,
+        null=True,
+        help_text=_("empty to invalidate the whole topic"),
+    )
+    created_at = models.DateTimeField(_("publish time"), auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=("created_at",))]
+
+    def __str__(self) -> str:
+        return f"{self.topic}:{self.key}"
+
 
 class AutoGeneratedSlugModel(models.Model):
     """Django model with auto generated slug field."""
@@ -41,13 +401,14 @@ class TimeStampModel(models.Model):
         _("object last update time"),
         help_text=_("format: Y-m-d H:M:S"),
         auto_now=True,
+        db_index=True,
     )
 
     class Meta:
         abstract = True
 
 
-class UserRoleManager(models.Manager):
+class UserRoleManager(ChangeLogManager):
     def get_queryset(self) -> "QuerySet[AbstractUserRole]":
         """Fetch user data when querying for Role object."""
         return super().get_queryset().select_related("user")
@@ -112,6 +473,10 @@ class AbstractUserRole(models.Model):
     def last_login(self) -> dt.datetime or None:
         return self.user.last_login
 
+    @property
+    def last_seen(self) -> dt.datetime or None:
+        return self.user.last_seen
+
     @property
     def date_joined(self) -> dt.datetime:
         return self.user.date_joined
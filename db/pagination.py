@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+from typing import Any, List, Optional, Tuple, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, models
+from ninja import Schema
+from ninja.pagination import PageNumberPagination
+from ninja.types import DictStrAny
+
+from . import invalidation
+
+logger = logging.getLogger(__name__)
+
+
+def _generation_key(table: str) -> str:
+    return f"count-generation:{table}"
+
+
+def bump_count_generation(table: Optional[str]) -> None:
+    """Drop cached counts of `table` in this process' cache,
+    of all `PAGINATION_COUNT_CACHE_MODELS` for `None`."""
+    if table is None:
+        for label in settings.PAGINATION_COUNT_CACHE_MODELS:
+            bump_count_generation(apps.get_model(label)._meta.db_table)
+        return
+    key = _generation_key(table)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_counts(model: Type[models.Model]) -> None:
+    """Drop cached counts of `model` querysets, in all processes.
+    Called on inserts and deletes, call it after raw SQL or
+    `bulk_create` as well."""
+    invalidation.publish("counts", model._meta.db_table)
+
+
+def estimate_count(queryset: models.QuerySet) -> Optional[int]:
+    """Row count of `queryset` estimated by the query planner,
+    `None` if the database has no estimate for it.
+
+    PostgreSQL: `pg_class.reltuples` for whole tables, `EXPLAIN`
+    rows otherwise. SQLite: `sqlite_stat1` (kept by `ANALYZE`)
+    for whole tables only."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    filtered = bool(queryset.query.where)
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql" and filtered:
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]["Plan"]["Plan Rows"])
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [table],
+                )
+                row = cursor.fetchone()
+                # -1 (or 0 before PostgreSQL 14): never analyzed
+                return int(row[0]) if row and row[0] > 0 else None
+            if connection.vendor == "sqlite" and not filtered:
+                cursor.execute(
+                    "SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table]
+                )
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else None
+    except DatabaseError:
+        # e.g. no sqlite_stat1 table before the first ANALYZE
+        logger.debug("No count estimate for %s", table, exc_info=True)
+    return None
+
+
+def count_queryset(
+    queryset: models.QuerySet, refresh: bool = False
+) -> Tuple[int, bool]:
+    """Return `(count, exact)` for `queryset`.
+
+    Counts are cached per query (whichever replica runs it, so that
+    replicas share entries) for `PAGINATION_COUNT_TTL` seconds
+    until a row of the model is inserted or deleted, `refresh`
+    recounts and caches anew. Above `PAGINATION_COUNT_ESTIMATE_THRESHOLD`
+    rows the planner's estimate is used instead of running `COUNT(*)`."""
+    queryset = queryset.order_by()
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.blake2b(
+        f"{sql}\n{params!r}".encode(), digest_size=16
+    ).hexdigest()
+    generation = cache.get(_generation_key(queryset.model._meta.db_table), 0)
+    cache_key = f"count:{queryset.model._meta.db_table}:{generation}:{digest}"
+    cached = None if refresh else cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    estimate = estimate_count(queryset)
+    if (
+        estimate is not None
+        and estimate >= settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+    ):
+        result = (estimate, False)
+    else:
+        result = (queryset.count(), True)
+    cache.set(cache_key, result, settings.PAGINATION_COUNT_TTL)
+    return result
+
+
+class CachedCountPagination(PageNumberPagination):
+    """`PageNumberPagination` with cached, and for large tables
+    estimated, total counts. `count_exact` is false for estimates."""
+
+    class Output(Schema):
+        items: List[Any]
+        count: int
+        count_exact: bool
+
+    def paginate_queryset(
+        self,
+        queryset: models.QuerySet,
+        pagination: PageNumberPagination.Input,
+        **params: DictStrAny,
+    ) -> Any:
+        offset = (pagination.page - 1) * self.page_size
+        if isinstance(queryset, models.QuerySet):
+            count, exact = count_queryset(queryset)
+        else:
+            count, exact = len(queryset), True
+        return {
+            "items": queryset[offset : offset + self.page_size],
+            "count": count,
+            "count_exact": exact,
+        }
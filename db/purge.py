@@ -0,0 +1,189 @@
+import datetime as dt
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, models, router, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from eshop_api.metrics import metrics
+
+from .models import ChangeLogEntry, ChangeLogModel, PurgeJob
+from .pagination import invalidate_counts
+
+logger = logging.getLogger(__name__)
+
+# sent after a job is done, with `job` (`PurgeJob`) and `using`;
+# receivers clean up what the cascade doesn't cover, e.g. counters
+purge_finished = Signal()
+
+# (model, lookup of purged primary keys, field to null or `None` to delete)
+Step = Tuple[Type[models.Model], str, Optional[str]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def cascade_steps(
+    model: Type[models.Model],
+    lookup: str = "pk",
+    path: Tuple[Type[models.Model], ...] = (),
+) -> List[Step]:
+    """Steps purging rows of `model` in cascade order: rows referencing
+    them first, deepest first, then the rows themselves.
+
+    `CASCADE` relations are followed, `SET_NULL` ones are unlinked,
+    `DO_NOTHING` ones are skipped. Raise `ValueError` for relations
+    that would block the purge (`PROTECT`, `RESTRICT`, ...)."""
+    if model in path:
+        raise ValueError(f"Cyclic cascade through {model._meta.label}")
+    steps = []
+    for related in apps.get_models(include_auto_created=True):
+        for field in related._meta.concrete_fields:
+            if not field.is_relation or field.related_model is not model:
+                continue
+            on_delete = field.remote_field.on_delete
+            related_lookup = f"{field.name}__{lookup}"
+            if on_delete is models.CASCADE:
+                steps += cascade_steps(related, related_lookup, (*path, model))
+            elif on_delete is models.SET_NULL:
+                steps.append((related, related_lookup, field.name))
+            elif on_delete is not models.DO_NOTHING:
+                raise ValueError(
+                    f"{related._meta.label}.{field.name} prevents purging "
+                    f"{model._meta.label}"
+                )
+    steps.append((model, lookup, None))
+    return steps
+
+
+def run_step(
+    job: PurgeJob, step: Step, object_ids: Sequence, using: str
+) -> None:
+    """Delete (or unlink) rows of one step, at most `PURGE_CHUNK_SIZE`
+    rows per transaction, so locks are held briefly."""
+    model, lookup, null_field = step
+    label = model._meta.label_lower
+    if null_field is not None:
+        label = f"{label}.{null_field}"
+    rows = model._base_manager.using(using).filter(
+        **{f"{lookup}__in": object_ids}
+    )
+    while True:
+        with transaction.atomic(using=using):
+            pks = list(
+                rows.values_list("pk", flat=True)[: settings.PURGE_CHUNK_SIZE]
+            )
+            if not pks:
+                return
+            chunk = model._base_manager.using(using).filter(pk__in=pks)
+            if null_field is not None:
+                chunk.update(**{null_field: None})
+            else:
+                if issubclass(model, ChangeLogModel):
+                    ChangeLogEntry.objects.using(using).bulk_create(
+                        ChangeLogEntry(
+                            model=model._meta.label_lower,
+                            object_id=str(pk),
+                            action=ChangeLogEntry.Action.DELETE,
+                        )
+                        for pk in pks
+                    )
+                # plain DELETE, no collector and no signals
+                chunk._raw_delete(using)
+            job.progress[label] = job.progress.get(label, 0) + len(pks)
+            job.save(update_fields=["progress"])
+
+
+def runnable_jobs() -> models.QuerySet:
+    """Pending jobs, and running ones started more than `PURGE_LEASE`
+    secs ago: their process most likely died mid-purge."""
+    expired = timezone.now() - dt.timedelta(seconds=settings.PURGE_LEASE)
+    return PurgeJob.objects.filter(
+        models.Q(status=PurgeJob.Status.PENDING)
+        | models.Q(status=PurgeJob.Status.RUNNING, started_at__lt=expired)
+    )
+
+
+def run_purge_job(job: PurgeJob) -> bool:
+    """Run a pending (or abandoned) job. Return false if it was taken
+    by another worker.
+
+    Purged primary keys are processed `PURGE_CHUNK_SIZE` at a time,
+    each chunk step by step in cascade order. A failed or abandoned
+    job can be rerun, already deleted rows are skipped."""
+    claimed = runnable_jobs().filter(pk=job.pk)
+    if not claimed.update(
+        status=PurgeJob.Status.RUNNING, started_at=timezone.now()
+    ):
+        return False
+    if job.status == PurgeJob.Status.RUNNING:
+        logger.warning("Purge job %s was abandoned, resuming it", job.pk)
+        metrics.incr("purge.reclaimed")
+    job.refresh_from_db()
+
+    model = apps.get_model(job.model)
+    using = router.db_for_write(model)
+    steps = []
+    try:
+        steps = cascade_steps(model)
+        size = settings.PURGE_CHUNK_SIZE
+        for start in range(0, len(job.object_ids), size):
+            object_ids = job.object_ids[start : start + size]
+            for step in steps:
+                run_step(job, step, object_ids, using)
+    except Exception as e:
+        logger.exception("Purge job %s failed", job.pk)
+        job.status, job.error = PurgeJob.Status.FAILED, str(e)
+    else:
+        job.status = PurgeJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+
+    for step_model, *_ in steps:
+        invalidate_counts(step_model)
+    if job.status == PurgeJob.Status.DONE:
+        purge_finished.send(sender=model, job=job, using=using)
+    logger.info("Purge job %s: %s %s", job.pk, job.status, job.progress)
+    return True
+
+
+def run_pending_purge_jobs() -> int:
+    """Run pending and abandoned jobs, oldest first. Return the number
+    of jobs run."""
+    return sum(run_purge_job(job) for job in runnable_jobs().order_by("id"))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="purge"
+            )
+        return _executor
+
+
+def run_in_background(job: PurgeJob) -> None:
+    try:
+        run_purge_job(job)
+    finally:
+        close_old_connections()
+
+
+def submit_purge_job(model: Type[models.Model], object_ids: List) -> PurgeJob:
+    """Create a job for rows of `model`. With `PURGE_IN_PROCESS` it
+    is started in a background thread once the transaction commits,
+    otherwise it waits for the `run_purge_jobs` command."""
+    job = PurgeJob.objects.create(
+        model=model._meta.label_lower, object_ids=object_ids
+    )
+    if settings.PURGE_IN_PROCESS:
+        transaction.on_commit(
+            lambda: get_executor().submit(run_in_background, job)
+        )
+    return job
@@ -0,0 +1,54 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from eshop_api.metrics import metrics
+
+# Set for the duration of a request that has to read its own writes.
+_use_primary: ContextVar[bool] = ContextVar("use_primary", default=False)
+
+
+def is_pinned_to_primary() -> bool:
+    return _use_primary.get()
+
+
+@contextmanager
+def pin_to_primary(pinned: bool = True) -> Iterator[None]:
+    """Send every read inside the block to the primary database."""
+    token = _use_primary.set(pinned)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Route writes to `default` and reads to one of `REPLICA_DATABASES`.
+
+    Reads go to the primary when no replicas are configured or
+    when the current request is pinned (see `pin_to_primary`)."""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        replicas = getattr(settings, "REPLICA_DATABASES", [])
+        if not replicas:
+            return None
+        if is_pinned_to_primary():
+            metrics.incr("db.replica.fallback.primary")
+            return DEFAULT_DB_ALIAS
+        alias = random.choice(replicas)
+        metrics.incr(f"db.replica.selected.{alias}")
+        return alias
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        """Primary and replicas hold the same data."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
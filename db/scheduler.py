@@ -0,0 +1,200 @@
+import datetime as dt
+import logging
+import os
+import random
+import socket
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from eshop_api.metrics import metrics
+
+from .models import ScheduledJobState
+
+logger = logging.getLogger(__name__)
+
+
+class CronSpec:
+    """Five field cron expression: minute, hour, day of month, month,
+    day of week (0 or 7 is Sunday). Fields take `*`, numbers, ranges
+    `a-b`, steps `*/n` and `a-b/n`, and comma separated lists of those.
+    Like cron, if both days are restricted either of them matches."""
+
+    bounds = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, spec: str) -> None:
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron spec needs 5 fields: {spec!r}")
+        self.spec = spec
+        (self.minutes, self.hours, self.days, self.months, weekdays,) = (
+            self._parse(field, low, high)
+            for field, (low, high) in zip(fields, self.bounds)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def __repr__(self) -> str:
+        return f"CronSpec({self.spec!r})"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(","):
+            range_, _, step = part.partition("/")
+            if range_ == "*":
+                start, end = low, high
+            elif "-" in range_:
+                start, end = map(int, range_.split("-"))
+            else:
+                start = end = int(range_)
+            if step and range_ != "*" and "-" not in range_:
+                end = high  # `5/15` means from 5 on
+            if not low <= start <= end <= high:
+                raise ValueError(f"cron field out of range: {field!r}")
+            values.update(range(start, end + 1, int(step or 1)))
+        return values
+
+    def _day_matches(self, day: dt.date) -> bool:
+        in_month = day.day in self.days
+        in_week = day.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment: dt.datetime) -> dt.datetime:
+        """First matching minute after `moment`, in local time."""
+        if timezone.is_aware(moment):
+            moment = timezone.localtime(moment)
+        moment = moment.replace(second=0, microsecond=0)
+        moment += dt.timedelta(minutes=1)
+        for _ in range(366 * 5):  # e.g. Feb 29 on a Monday
+            if moment.month in self.months and self._day_matches(moment):
+                for hour in sorted(h for h in self.hours if h >= moment.hour):
+                    first_minute = moment.minute if hour == moment.hour else 0
+                    minutes = [m for m in self.minutes if m >= first_minute]
+                    if minutes:
+                        return moment.replace(hour=hour, minute=min(minutes))
+            moment = (moment + dt.timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError(f"{self.spec!r} never matches")
+
+
+class ScheduledJob:
+    def __init__(
+        self,
+        name: str,
+        spec: str,
+        func: Callable[[], object],
+        jitter: Optional[int] = None,
+        lease: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.cron = CronSpec(spec)
+        self.func = func
+        self.jitter = settings.SCHEDULER_JITTER if jitter is None else jitter
+        self.lease = settings.SCHEDULER_LEASE if lease is None else lease
+
+    def next_run_after(self, moment: dt.datetime) -> dt.datetime:
+        """Next cron time plus a random delay of up to `jitter` secs,
+        so jobs of all nodes and apps don't start at the same second."""
+        delay = random.uniform(0, self.jitter)
+        return self.cron.next_after(moment) + dt.timedelta(seconds=delay)
+
+
+jobs: Dict[str, ScheduledJob] = {}
+
+
+def register(
+    name: str,
+    spec: str,
+    func: Callable[[], object],
+    jitter: Optional[int] = None,
+    lease: Optional[int] = None,
+) -> None:
+    """Register `func` to run on the cron `spec`, called from
+    `AppConfig.ready()`. `SCHEDULER_SCHEDULES` may override the spec
+    of a job by name, `None` disables the job.
+
+    `jitter` (secs) is added to every run time, `lease` (secs) is how
+    long a run may take before another node may start the job again."""
+    spec = settings.SCHEDULER_SCHEDULES.get(name, spec)
+    if spec is None:
+        jobs.pop(name, None)
+        return
+    jobs[name] = ScheduledJob(name, spec, func, jitter, lease)
+
+
+def node_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(job: ScheduledJob, now: dt.datetime, owner: str) -> bool:
+    """Take the lease of a due job with a single conditional update."""
+    ScheduledJobState.objects.get_or_create(
+        name=job.name,
+        defaults={"next_run_at": job.next_run_after(now)},
+    )
+    return bool(
+        ScheduledJobState.objects.filter(
+            Q(lease_expires_at=None) | Q(lease_expires_at__lte=now),
+            name=job.name,
+            next_run_at__lte=now,
+        ).update(
+            lease_owner=owner,
+            lease_expires_at=now + dt.timedelta(seconds=job.lease),
+            last_run_at=now,
+        )
+    )
+
+
+def run_job(job: ScheduledJob, now: dt.datetime, owner: str) -> None:
+    started = time.perf_counter()
+    error = ""
+    try:
+        job.func()
+    except Exception as e:
+        logger.exception("Scheduled job %s failed", job.name)
+        error = f"{type(e).__name__}: {e}"
+        metrics.incr(f"scheduler.{job.name}.failures")
+    duration = time.perf_counter() - started
+    metrics.incr(f"scheduler.{job.name}.runs")
+    metrics.observe(f"scheduler.{job.name}.duration", duration)
+    ScheduledJobState.objects.filter(name=job.name, lease_owner=owner).update(
+        next_run_at=job.next_run_after(max(now, timezone.now())),
+        lease_owner="",
+        lease_expires_at=None,
+        last_duration=duration,
+        last_error=error,
+    )
+    logger.info("Scheduled job %s ran in %.3fs", job.name, duration)
+
+
+def run_pending(
+    now: Optional[dt.datetime] = None, owner: Optional[str] = None
+) -> List[str]:
+    """Run registered jobs that are due and not running on another
+    node, one after another. Return names of the jobs run."""
+    owner = owner or node_name()
+    ran = []
+    for job in list(jobs.values()):
+        moment = now or timezone.now()
+        if claim(job, moment, owner):
+            run_job(job, moment, owner)
+            ran.append(job.name)
+    return ran
+
+
+def run_forever() -> None:  # pragma: no cover
+    """Run due jobs every `SCHEDULER_POLL_INTERVAL` secs."""
+    owner = node_name()
+    logger.info("Scheduler %s started with jobs: %s", owner, sorted(jobs))
+    while True:
+        close_old_connections()
+        run_pending(owner=owner)
+        close_old_connections()
+        time.sleep(settings.SCHEDULER_POLL_INTERVAL)
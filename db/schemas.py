@@ -1,5 +1,54 @@
-from ninja import Schema
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ninja import Field, Schema
 
 
 class ErrorMessage(Schema):
     error_message: str
+
+
+class ChangeOut(Schema):
+    id: int
+    model: str
+    object_id: str
+    action: str
+    changed_fields: List[str]
+    created_at: datetime
+
+
+class ChangeFeedOut(Schema):
+    items: List[ChangeOut]
+    next_cursor: int
+
+
+class SlowQueryOut(Schema):
+    fingerprint: str
+    sql: str = Field(..., description="normalized, literals as `?`")
+    count: int
+    total: float = Field(..., description="secs")
+    mean: float
+    max: float
+    call_sites: Dict[str, int]
+
+
+class PurgeIn(Schema):
+    ids: List[int] = Field(..., min_items=1)
+
+
+class PurgeJobOut(Schema):
+    id: int
+    model: str
+    status: str
+    object_count: int
+    progress: Dict[str, int] = Field(
+        ..., description="deleted or unlinked rows per model"
+    )
+    error: str
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    @staticmethod
+    def resolve_object_count(obj) -> int:
+        return len(obj.object_ids)
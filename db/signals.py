@@ -0,0 +1,63 @@
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from . import invalidation
+from .models import ChangeLogEntry, ChangeLogModel
+from .pagination import bump_count_generation, invalidate_counts
+
+
+def log_delete(sender, instance: ChangeLogModel, using: str, **kwargs) -> None:
+    """Runs inside the deletion transaction, cascaded deletes included."""
+    ChangeLogEntry.entry_for(instance, ChangeLogEntry.Action.DELETE).save(
+        using=using
+    )
+
+
+def connect_change_log_signals() -> None:
+    # connected per model so that other models keep their fast deletes
+    for model in apps.get_models():
+        if issubclass(model, ChangeLogModel):
+            post_delete.connect(
+                log_delete, sender=model, dispatch_uid=f"log_delete_{model}"
+            )
+
+
+def invalidate_counts_on_insert(sender, created: bool, **kwargs) -> None:
+    if created:
+        invalidate_counts(sender)
+
+
+def invalidate_counts_on_delete(sender, **kwargs) -> None:
+    invalidate_counts(sender)
+
+
+def connect_count_cache_signals() -> None:
+    for label in settings.PAGINATION_COUNT_CACHE_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(
+            invalidate_counts_on_insert,
+            sender=model,
+            dispatch_uid=f"invalidate_counts_on_insert_{label}",
+        )
+        post_delete.connect(
+            invalidate_counts_on_delete,
+            sender=model,
+            dispatch_uid=f"invalidate_counts_on_delete_{label}",
+        )
+
+
+def publish_invalidation(sender, instance, **kwargs) -> None:
+    invalidation.publish(sender._meta.label_lower, str(instance.pk))
+
+
+def connect_invalidation_signals() -> None:
+    for label in settings.INVALIDATION_MODELS:
+        model = apps.get_model(label)
+        for signal in (post_save, post_delete):
+            signal.connect(
+                publish_invalidation,
+                sender=model,
+                dispatch_uid=f"publish_invalidation_{signal}_{label}",
+            )
+    invalidation.subscribe("counts", bump_count_generation)
@@ -0,0 +1,217 @@
+"""Opt-in slow query log: with `SLOW_QUERY_THRESHOLD` set, every
+connection runs its queries through `SlowQueryRecorder`, an
+`execute_wrapper`. Queries over the threshold are logged with the
+project code that ran them and aggregated by fingerprint, see
+the `/api/slow-queries` endpoint and the `slow_queries` command."""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from eshop_api.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ORDERINGS = ("total", "count", "max")
+
+_literal_re = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_placeholder_list_re = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_space_re = re.compile(r"\s+")
+# transaction control, not worth a fingerprint
+_transaction_re = re.compile(
+    r"\s*(?:SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b", re.IGNORECASE
+)
+
+
+def fingerprint(sql: str) -> str:
+    """`sql` with literals and placeholders as `?`, `IN` lists of any
+    length as `(...)` and whitespace collapsed."""
+    sql = _literal_re.sub("?", sql.replace("%s", "?"))
+    sql = _placeholder_list_re.sub("(...)", sql)
+    return _space_re.sub(" ", sql).strip()
+
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+
+def params_shape(params, many: bool = False) -> str:
+    """Types of `params`, never their values, e.g. `(int, str)`."""
+    if many:
+        params = list(params or ())
+        shape = params_shape(params[0]) if params else "()"
+        return f"{len(params)} x {shape}"
+    if isinstance(params, dict):
+        items = (
+            f"{key}: {type(value).__name__}" for key, value in params.items()
+        )
+        return "{" + ", ".join(items) + "}"
+    return (
+        "(" + ", ".join(type(value).__name__ for value in params or ()) + ")"
+    )
+
+
+def call_site() -> Optional[str]:
+    """The project code that ran the current query, outermost (the
+    view or job) first, skipping `SLOW_QUERY_IGNORED_FILES` (middleware,
+    model and scheduler plumbing), e.g.
+    `customers/api.py:customer_create > customers/stats.py:bump`.
+    Falls back to the innermost ignored frame."""
+    base = f"{settings.BASE_DIR}{os.sep}"
+    ignored = settings.SLOW_QUERY_IGNORED_FILES
+    sites: List[str] = []
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and "site-packages" not in filename:
+            relative = filename[len(base) :].replace(os.sep, "/")
+            site = f"{relative}:{frame.f_code.co_name}"
+            if relative not in ignored and (not sites or sites[-1] != site):
+                sites.append(site)
+            elif fallback is None and filename != __file__:
+                fallback = site
+        frame = frame.f_back
+    return " > ".join(reversed(sites)) or fallback
+
+
+class SlowQueryStats:
+    """Count, total and max duration (secs) and call sites of slow
+    queries per fingerprint, for up to `max_fingerprints` of them."""
+
+    def __init__(self, max_fingerprints: int = 1000) -> None:
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+
+    def add(
+        self, sql: str, duration: float, site: Optional[str] = None
+    ) -> str:
+        """Record a query, return its fingerprint id."""
+        normalized = fingerprint(sql)
+        key = fingerprint_id(normalized)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    metrics.incr("db.slow_queries.untracked")
+                    return key
+                entry = self._entries[key] = {
+                    "fingerprint": key,
+                    "sql": normalized,
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "call_sites": Counter(),
+                }
+            entry["count"] += 1
+            entry["total"] += duration
+            entry["max"] = max(entry["max"], duration)
+            if site:
+                entry["call_sites"][site] += 1
+        return key
+
+    def top(self, limit: int = 10, order_by: str = "total") -> List[dict]:
+        """Worst `limit` fingerprints by `order_by`, one of `ORDERINGS`."""
+        with self._lock:
+            entries = sorted(
+                self._entries.values(), key=lambda e: e[order_by], reverse=True
+            )[:limit]
+            return [
+                {
+                    **entry,
+                    "mean": entry["total"] / entry["count"],
+                    "call_sites": dict(entry["call_sites"].most_common()),
+                }
+                for entry in entries
+            ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+stats = SlowQueryStats(settings.SLOW_QUERY_MAX_FINGERPRINTS)
+
+
+class SlowQueryRecorder:
+    """`connection.execute_wrapper` logging queries that take at least
+    `threshold` secs and adding them to `stats`. Parameters are logged
+    by shape only, they may hold personal data."""
+
+    def __init__(
+        self, threshold: float, stats: SlowQueryStats = stats
+    ) -> None:
+        self.threshold = threshold
+        self.stats = stats
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.threshold and not _transaction_re.match(sql):
+                self.record(sql, params, many, duration, context)
+
+    def record(self, sql, params, many, duration, context) -> None:
+        site = call_site()
+        key = self.stats.add(sql, duration, site)
+        metrics.observe("db.slow_queries", duration)
+        logger.warning(
+            "Slow query %s took %.1f ms at %s",
+            key,
+            duration * 1000,
+            site,
+            extra={
+                "fingerprint": key,
+                "sql": sql,
+                "params_shape": params_shape(params, many),
+                "duration": duration,
+                "call_site": site,
+                "database": context["connection"].alias,
+            },
+        )
+
+
+def install(sender, connection, **kwargs) -> None:
+    """`connection_created` receiver, adds the recorder to new
+    connections while `SLOW_QUERY_THRESHOLD` is set."""
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if threshold is None:
+        return
+    if not any(
+        isinstance(wrapper, SlowQueryRecorder)
+        for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(SlowQueryRecorder(threshold))
+
+
+def summarize(lines: Iterable[str]) -> SlowQueryStats:
+    """Aggregate slow queries of a JSON lines log, see `eshop_api.log`.
+    Other records and lines that aren't JSON are skipped."""
+    summary = SlowQueryStats(max_fingerprints=sys.maxsize)
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if (
+            isinstance(record, dict)
+            and record.get("logger") == __name__
+            and "sql" in record
+        ):
+            summary.add(
+                record["sql"],
+                record.get("duration", 0.0),
+                record.get("call_site"),
+            )
+    return summary
@@ -1,13 +1,57 @@
 import datetime as dt
-from typing import Dict
+from typing import Callable, Dict, List, Tuple
 
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from utils import split_csv
+
+# cache backends that keep entries in the process (or nowhere)
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def cache_is_shared(alias: str = "default") -> bool:
+    """Whether entries of cache `alias` are seen by other processes."""
+    return settings.CACHES[alias]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
 
 def updated_at() -> Dict[str, dt.datetime]:
     """Return current time in current timezone.
     Used in update queries.
     """
     return {"updated_at": dt.datetime.now(timezone.get_current_timezone())}
+
+
+def get_many(
+    queryset: models.QuerySet,
+    values: str,
+    field: str = "pk",
+    cast: Callable = str,
+) -> Tuple[List[models.Model], List]:
+    """Fetch objects by comma separated `values` of `field`
+    with a single `IN` query.
+
+    Return objects in the order of `values` and the values not found.
+    Raise `ValueError` for invalid values or if there are more than
+    `MULTI_GET_MAX_SIZE` of them."""
+    values = split_csv(values, cast)
+    if not values:
+        raise ValueError(f"no {field} values given")
+    if len(values) > settings.MULTI_GET_MAX_SIZE:
+        raise ValueError(
+            f"max {settings.MULTI_GET_MAX_SIZE} values allowed, "
+            f"got {len(values)}"
+        )
+    found = {
+        getattr(obj, field): obj
+        for obj in queryset.filter(**{f"{field}__in": values})
+    }
+    return (
+        [found[value] for value in values if value in found],
+        [value for value in values if value not in found],
+    )
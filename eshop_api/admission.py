@@ -0,0 +1,99 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .metrics import metrics
+
+# lower is admitted first
+HIGH_PRIORITY = 0
+LOW_PRIORITY = 1
+
+
+class AdmissionPool:
+    """Bounded number of requests in progress with a priority queue.
+
+    A request waits at most `timeout` seconds for a free slot and
+    at most `max_queue` requests wait at once, the rest are rejected
+    right away. Waiting requests are admitted by priority, then in
+    arrival order."""
+
+    def __init__(
+        self, name: str, limit: int, max_queue: int, timeout: float
+    ) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiters: List[Tuple[int, int]] = []
+        self._arrivals = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self, priority: int = LOW_PRIORITY) -> bool:
+        with self._cond:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                metrics.incr(f"admission.{self.name}.admitted")
+                return True
+            if len(self._waiters) >= self.max_queue:
+                metrics.incr(f"admission.{self.name}.rejected")
+                return False
+
+            metrics.incr(f"admission.{self.name}.queued")
+            started = time.monotonic()
+            entry = (priority, next(self._arrivals))
+            heapq.heappush(self._waiters, entry)
+            while self._active >= self.limit or self._waiters[0] != entry:
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                    metrics.incr(f"admission.{self.name}.rejected")
+                    return False
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiters)
+            self._active += 1
+            self._cond.notify_all()  # the next waiter may fit as well
+            metrics.observe(
+                f"admission.{self.name}.wait", time.monotonic() - started
+            )
+            metrics.incr(f"admission.{self.name}.admitted")
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+
+def build_pools() -> Dict[str, AdmissionPool]:
+    return {
+        name: AdmissionPool(name, **options)
+        for name, options in settings.ADMISSION_POOLS.items()
+    }
+
+
+def pool_name_for(path: str) -> Optional[str]:
+    """Pool of the longest matching `ADMISSION_ROUTES` prefix,
+    `None` for paths that are not limited."""
+    matching = [
+        prefix
+        for prefix in settings.ADMISSION_ROUTES
+        if path.startswith(prefix)
+    ]
+    if not matching:
+        return None
+    return settings.ADMISSION_ROUTES[max(matching, key=len)]
@@ -1,15 +1,74 @@
+from typing import List
+
+from django.conf import settings
 from django.http import HttpResponse
-from ninja import NinjaAPI
-from ninja.errors import ValidationError
+from ninja import NinjaAPI, Query
+from ninja.errors import HttpError, ValidationError
 
 from customers.api import router as custmers_router
+from db import slow_queries
+from db.api import router as changes_router
+from db.models import StaleObjectError
+from db.schemas import SlowQueryOut
 from vendors.api import router as vendors_router
 from x_auth.api import router as auth_router
+from x_auth.authentication import (
+    AuthenticatedOnlyAuthBearer,
+    StaffOnlyAuthBearer,
+)
 from x_users.api import router as users_router
 
-api = NinjaAPI()
+from .batch import execute_batch
+from .metrics import metrics
+from .renderers import FastParser, FastRenderer, NegotiatingNinjaAPI
+from .schemas import BatchIn, BatchItemOut
+
+api = NegotiatingNinjaAPI(renderer=FastRenderer(), parser=FastParser())
 
 api.add_router("/users/", users_router)
 api.add_router("/customers/", custmers_router)
 api.add_router("/auth/", auth_router)
 api.add_router("/vendors", vendors_router)
+api.add_router("/changes/", changes_router)
+
+
+@api.exception_handler(StaleObjectError)
+def stale_object(request, exc):
+    return api.create_response(request, {"detail": str(exc)}, status=412)
+
+
+@api.get("/metrics", auth=StaffOnlyAuthBearer(), url_name="metrics")
+def metrics_snapshot(request):
+    return metrics.snapshot()
+
+
+@api.get(
+    "/slow-queries",
+    auth=StaffOnlyAuthBearer(),
+    response=List[SlowQueryOut],
+    url_name="slow_queries",
+)
+def slow_query_list(
+    request,
+    limit: int = Query(10, ge=1, le=100),
+    order_by: str = Query("total", regex="^(total|count|max)$"),
+):
+    """Worst queries over `SLOW_QUERY_THRESHOLD` seen by this process."""
+    return slow_queries.stats.top(limit, order_by)
+
+
+@api.post(
+    "/batch",
+    auth=AuthenticatedOnlyAuthBearer(),
+    response=List[BatchItemOut],
+    url_name="batch",
+)
+def batch(request, payload: BatchIn):
+    """Execute up to `BATCH_MAX_SIZE` API requests in one call.
+    Results are returned in order with their own status codes."""
+    if len(payload.requests) > settings.BATCH_MAX_SIZE:
+        raise HttpError(
+            400,
+            {"batch too large": f"max {settings.BATCH_MAX_SIZE} requests"},
+        )
+    return execute_batch(request, payload.requests)
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "eshop_api.settings")
 
 application = get_asgi_application()
+
+from x_users import availability  # noqa: E402, needs the app registry
+
+availability.warm()
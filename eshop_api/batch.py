@@ -0,0 +1,166 @@
+import contextvars
+import io
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.http import HttpRequest, HttpResponse
+from django.urls import Resolver404, resolve
+
+from .metrics import metrics
+from .renderers import JSON_MEDIA_TYPE, dumps
+from .schemas import BatchItemIn
+
+logger = logging.getLogger(__name__)
+
+# request META passed on to sub-requests
+INHERITED_META = (
+    "SERVER_NAME",
+    "SERVER_PORT",
+    "SERVER_PROTOCOL",
+    "REMOTE_ADDR",
+    "HTTP_HOST",
+    "HTTP_AUTHORIZATION",
+    "wsgi.url_scheme",
+)
+# sub-request response headers returned to the client
+EXPOSED_HEADERS = ("ETag", "Last-Modified", "Location")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BATCH_MAX_WORKERS,
+                thread_name_prefix="batch",
+            )
+        return _executor
+
+
+def error(status: int, detail: str) -> Dict[str, Any]:
+    return {"status": status, "headers": {}, "body": {"detail": detail}}
+
+
+def build_subrequest(request: HttpRequest, item: BatchItemIn) -> WSGIRequest:
+    """Sub-request with the credentials of the batch `request`.
+    The user authenticated for the batch is reused, not looked up again."""
+    path, _, query_string = item.path.partition("?")
+    body = b"" if item.body is None else dumps(item.body)
+    environ = {
+        key: request.META[key] for key in INHERITED_META if key in request.META
+    }
+    environ.update(
+        {
+            "REQUEST_METHOD": item.method,
+            "PATH_INFO": path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": query_string,
+            "CONTENT_TYPE": JSON_MEDIA_TYPE,
+            "CONTENT_LENGTH": str(len(body)),
+            "HTTP_ACCEPT": JSON_MEDIA_TYPE,
+            "wsgi.input": io.BytesIO(body),
+        }
+    )
+    subrequest = WSGIRequest(environ)
+    if hasattr(request, "_token_user"):
+        subrequest._token_user = request._token_user
+    return subrequest
+
+
+def render(response: HttpResponse) -> Dict[str, Any]:
+    if response.streaming:
+        return error(400, "Streaming responses can't be batched")
+    body = response.content.decode() if response.content else None
+    if body and response.get("Content-Type", "").startswith(JSON_MEDIA_TYPE):
+        body = json.loads(body)
+    return {
+        "status": response.status_code,
+        "headers": {
+            header: response[header]
+            for header in EXPOSED_HEADERS
+            if response.has_header(header)
+        },
+        "body": body,
+    }
+
+
+def execute(request: HttpRequest, item: BatchItemIn) -> Dict[str, Any]:
+    """Run one sub-request through the API view, skipping middleware."""
+    if not item.path.startswith(settings.API_PATH_PREFIX):
+        return error(400, f"Path must start with {settings.API_PATH_PREFIX}")
+    subrequest = build_subrequest(request, item)
+    try:
+        match = resolve(subrequest.path_info)
+    except Resolver404:
+        return error(404, "Not Found")
+    if match.url_name == "batch":
+        return error(400, "Batches can't be nested")
+    subrequest.resolver_match = match
+    try:
+        response = match.func(subrequest, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("Batch item %s %s failed", item.method, item.path)
+        return error(500, "Internal Server Error")
+    return render(response)
+
+
+def execute_in_thread(
+    context: contextvars.Context, request: HttpRequest, item: BatchItemIn
+) -> Dict[str, Any]:
+    try:
+        return context.run(execute, request, item)
+    finally:
+        close_old_connections()
+
+
+def execute_batch(
+    request: HttpRequest, items: List[BatchItemIn]
+) -> List[Dict[str, Any]]:
+    """Execute `items` in order. Consecutive GETs run in parallel,
+    other methods are barriers, so later reads see earlier writes.
+    Within a transaction (e.g. `ATOMIC_REQUESTS`) everything runs
+    sequentially on the request's connection."""
+    started = time.perf_counter()
+    parallel = (
+        settings.BATCH_MAX_WORKERS > 1 and not connection.in_atomic_block
+    )
+    results: List[Dict[str, Any]] = []
+    reads: List[BatchItemIn] = []
+
+    def run_reads():
+        if parallel and len(reads) > 1:
+            futures = [
+                get_executor().submit(
+                    execute_in_thread,
+                    contextvars.copy_context(),
+                    request,
+                    item,
+                )
+                for item in reads
+            ]
+            results.extend(future.result() for future in futures)
+        else:
+            results.extend(execute(request, item) for item in reads)
+        reads.clear()
+
+    for item in items:
+        if item.method == "GET":
+            reads.append(item)
+            continue
+        run_reads()
+        results.append(execute(request, item))
+    run_reads()
+
+    metrics.incr("batch.items", len(items))
+    metrics.observe("batch.duration", time.perf_counter() - started)
+    return results
@@ -0,0 +1,116 @@
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+
+from .renderers import quality_values
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything compressed so far, keep the stream open."""
+        return self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings() -> Dict[str, Callable]:
+    """Content codings supported by installed libraries,
+    in `COMPRESSION_ENCODINGS` (server preference) order."""
+    compressors = {"gzip": GzipCompressor}
+    if brotli is not None:
+        compressors["br"] = BrotliCompressor
+    if zstandard is not None:
+        compressors["zstd"] = ZstdCompressor
+    return {
+        encoding: compressors[encoding]
+        for encoding in settings.COMPRESSION_ENCODINGS
+        if encoding in compressors
+    }
+
+
+def negotiate_encoding(
+    accept_encoding: str, encodings: Iterable[str]
+) -> Optional[str]:
+    """Pick the coding with the highest quality in `Accept-Encoding`,
+    ties are resolved by the order of `encodings`."""
+    qualities = dict(quality_values(accept_encoding))
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compression_level(path: str, encoding: str) -> int:
+    """Level for `encoding` from the longest matching
+    `COMPRESSION_ROUTE_LEVELS` prefix, else `COMPRESSION_LEVELS`."""
+    levels = dict(settings.COMPRESSION_LEVELS)
+    matching = [
+        prefix
+        for prefix in settings.COMPRESSION_ROUTE_LEVELS
+        if path.startswith(prefix)
+    ]
+    if matching:
+        levels.update(
+            settings.COMPRESSION_ROUTE_LEVELS[max(matching, key=len)]
+        )
+    return levels[encoding]
+
+
+def compress_sequence(
+    sequence: Iterable[bytes], compressor
+) -> Iterator[bytes]:
+    """Compress a streamed body chunk by chunk. Each chunk is flushed
+    right away, so events of a slow stream are not held back."""
+    for chunk in sequence:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from ninja.errors import HttpError
+
+from db.models import VersionedModel
+
+
+def make_etag(*instances: VersionedModel) -> str:
+    """Strong ETag built from row versions of `instances`,
+    e.g. a customer and its user."""
+    return quote_etag(".".join(str(obj.version) for obj in instances))
+
+
+def check_if_match(request: HttpRequest, etag: str) -> None:
+    """Respond 412 if `If-Match` doesn't match `etag`.
+
+    `W/` prefixes are ignored: `CompressionMiddleware` weakens
+    the ETags of compressed responses, clients send those back."""
+    header = request.headers.get("If-Match")
+    if header is None:
+        return
+    etags = [etag.removeprefix("W/") for etag in parse_etags(header)]
+    if etags != ["*"] and etag not in etags:
+        raise HttpError(412, "If-Match precondition failed")
+
+
+def conditional_get(
+    request: HttpRequest,
+    response: HttpResponse,
+    etag: str,
+    last_modified: Optional[int] = None,
+) -> Optional[HttpResponse]:
+    """Set validators on `response` (the temporal response of a view).
+    Return 304 response if the client's copy is up to date."""
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response
+    )
+    return None if conditional is response else conditional
@@ -0,0 +1,165 @@
+"""Logging off the request path: records are put on a bounded queue
+by `AsyncQueueHandler` and written as JSON lines by a background
+thread. Configured in `settings.LOGGING`."""
+import atexit
+import contextvars
+import datetime as dt
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from eshop_api.metrics import metrics
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "request_id", default=None
+)
+trace_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "trace_id", default=None
+)
+
+# `LogRecord` attributes, everything else on a record came with `extra=`
+RECORD_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None))
+) | {"message", "asctime", "request_id", "trace_id"}
+# `args` of these types can be formatted later, in the writer thread
+LAZY_ARG_TYPES = (str, int, float, bool, type(None), bytes, dt.datetime)
+
+
+def clear_request_context(**kwargs) -> None:
+    """`request_finished` receiver, see `RequestIdMiddleware`."""
+    request_id_var.set(None)
+    trace_id_var.set(None)
+
+
+class RequestContextFilter(logging.Filter):
+    """Add `request_id` and `trace_id` of the current request, see
+    `RequestIdMiddleware`. Runs in the thread that logs, put it on
+    `AsyncQueueHandler` rather than on the writer's handler."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Let through `rate` of DEBUG records. Sampled per request id,
+    so a sampled request keeps all of its debug records."""
+
+    def __init__(self, rate: float = 1.0) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id is None:
+            return random.random() < self.rate
+        return zlib.crc32(request_id.encode()) / 2**32 < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, `extra=` fields included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": dt.datetime.fromtimestamp(
+                record.created, dt.timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "trace_id": getattr(record, "trace_id", None),
+        }
+        data.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in RECORD_ATTRS and not key.startswith("_")
+        )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+        return json.dumps(data, default=str)
+
+
+class _QueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # waits for room in a full queue rather than raising, so that
+        # `stop` always ends and joins the thread
+        self.queue.put(self._sentinel)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """Put records on a queue of `maxsize`, written to `filename` (or
+    stderr) by a `QueueListener` thread. When the queue is full records
+    are dropped rather than blocking the request. At exit the thread
+    writes out what is queued and is joined, see `close`.
+
+    Messages are formatted in the writer thread when their `args` are
+    plain values, otherwise right away: objects like model instances
+    may change or query the database when formatted later."""
+
+    def __init__(
+        self, filename: Optional[str] = None, maxsize: int = 10_000
+    ) -> None:
+        super().__init__(queue.Queue(maxsize))
+        if filename:
+            self.target = logging.FileHandler(filename, encoding="utf-8")
+        else:
+            self.target = logging.StreamHandler(sys.stderr)
+        self.target.setFormatter(JsonFormatter())
+        self.listener: Optional[QueueListener] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            # threads don't survive a fork, e.g. gunicorn `--preload`
+            if self._pid != os.getpid():
+                self.listener = _QueueListener(self.queue, self.target)
+                self.listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # tracebacks keep frames alive, format them now
+            record.exc_text = self.target.formatter.formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        args = record.args
+        if isinstance(args, dict):
+            args = args.values()
+        if args and not all(isinstance(arg, LAZY_ARG_TYPES) for arg in args):
+            record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.incr("logging.dropped")
+
+    def close(self) -> None:
+        """Write out queued records and stop the thread."""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self._pid = None
+        self.target.close()
+        super().close()
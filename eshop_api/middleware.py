@@ -0,0 +1,511 @@
+import hashlib
+import re
+import time
+import uuid
+from typing import Callable, List, Optional, Tuple
+from wsgiref.util import is_hop_by_hop
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.signals import request_finished
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+
+from db import invalidation
+from db.routers import pin_to_primary
+from eshop_api import admission, compression, log
+from eshop_api.metrics import metrics
+from eshop_api.singleflight import SingleFlight
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def get_client_key(request: HttpRequest) -> Optional[str]:
+    """Identify the client by its bearer token or session cookie."""
+    credential = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not credential:
+        return None
+    return hashlib.sha1(credential.encode()).hexdigest()
+
+
+class RequestIdMiddleware:
+    """Tag log records of a request with its id and trace id,
+    see `eshop_api.log`. The id comes from a valid `X-Request-ID`
+    header or is generated, and is sent back in the response. The
+    trace id is taken from a W3C `traceparent` header, if any.
+
+    Both are cleared on `request_finished` rather than on the way out,
+    so that `django.request` records logged after the middleware
+    (4xx/5xx responses) are tagged too."""
+
+    header = "HTTP_X_REQUEST_ID"
+    request_id_re = re.compile(r"[\w.:-]{1,128}")
+    traceparent_re = re.compile(
+        r"[\da-f]{2}-([\da-f]{32})-[\da-f]{16}-[\da-f]{2}"
+    )
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        request_finished.connect(
+            log.clear_request_context, dispatch_uid="clear_request_context"
+        )
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        request_id = request.META.get(self.header, "")
+        if not self.request_id_re.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        trace = self.traceparent_re.fullmatch(
+            request.META.get("HTTP_TRACEPARENT", "")
+        )
+        log.request_id_var.set(request_id)
+        log.trace_id_var.set(trace and trace.group(1))
+        response = self.get_response(request)
+        response["X-Request-ID"] = request_id
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """Provide read-your-writes consistency on top of `PrimaryReplicaRouter`.
+
+    Unsafe requests are served entirely by the primary. After a successful
+    write the client is pinned to the primary for `REPLICA_STICKY_SECONDS`,
+    so its next reads don't hit a replica that hasn't caught up yet."""
+
+    cache_key_prefix = "replica-pin"
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not getattr(settings, "REPLICA_DATABASES", []):
+            return self.get_response(request)
+
+        client_key = get_client_key(request)
+        is_write = request.method not in SAFE_METHODS
+        pinned = is_write or self._recently_wrote(client_key)
+        if pinned and not is_write:
+            metrics.incr("db.replica.fallback.sticky")
+
+        with pin_to_primary(pinned):
+            response = self.get_response(request)
+
+        if is_write and client_key and response.status_code < 400:
+            cache.set(
+                self._cache_key(client_key),
+                time.time(),
+                settings.REPLICA_STICKY_SECONDS,
+            )
+        return response
+
+    def _recently_wrote(self, client_key: Optional[str]) -> bool:
+        if client_key is None:
+            return False
+        return cache.get(self._cache_key(client_key)) is not None
+
+    def _cache_key(self, client_key: str) -> str:
+        return f"{self.cache_key_prefix}:{client_key}"
+
+
+class IdempotencyMiddleware:
+    """Replay stored responses for retried API mutations.
+
+    A request carrying an `Idempotency-Key` header is identified by
+    the key, method, path and credentials. Its response is cached for
+    `IDEMPOTENCY_TTL` seconds together with a fingerprint of the body.
+    A retry is answered from the cache before any authentication,
+    DB work or password hashing happens. Reusing a key with another
+    body gives 422, retrying while the first request runs gives 409.
+    Replays keep the stored response headers (`ETag`, `Last-Modified`,
+    ...), except hop-by-hop ones. Routes in `IDEMPOTENCY_EXCLUDED_ROUTES`
+    (e.g. responses holding short-lived tokens) are never stored."""
+
+    header = "HTTP_IDEMPOTENCY_KEY"
+    cache_key_prefix = "idempotency:2"  # bumped when stored values change
+    max_key_length = 255
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        key = request.META.get(self.header)
+        if (
+            key is None
+            or request.method not in settings.IDEMPOTENCY_METHODS
+            or not request.path.startswith(settings.IDEMPOTENCY_PATH_PREFIX)
+            or self._is_excluded(request)
+        ):
+            return self.get_response(request)
+        if not key or len(key) > self.max_key_length:
+            return JsonResponse(
+                {"detail": "Invalid Idempotency-Key header"}, status=400
+            )
+
+        cache_key = self._cache_key(request, key)
+        fingerprint = hashlib.blake2b(request.body, digest_size=16).hexdigest()
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return self._replay(stored, fingerprint)
+
+        lock_key = f"{cache_key}:lock"
+        if not cache.add(lock_key, fingerprint, settings.IDEMPOTENCY_LOCK_TTL):
+            metrics.incr("idempotency.conflict")
+            return JsonResponse(
+                {
+                    "detail": "A request with this Idempotency-Key is in progress"
+                },
+                status=409,
+            )
+        try:
+            response = self.get_response(request)
+            if not response.streaming and response.status_code < 500:
+                cache.set(
+                    cache_key,
+                    (
+                        fingerprint,
+                        response.status_code,
+                        [
+                            (header, value)
+                            for header, value in response.items()
+                            if not is_hop_by_hop(header)
+                            and header.lower() != "content-length"
+                        ],
+                        response.content,
+                    ),
+                    settings.IDEMPOTENCY_TTL,
+                )
+        finally:
+            cache.delete(lock_key)
+        return response
+
+    def _replay(self, stored: tuple, fingerprint: str) -> HttpResponse:
+        stored_fingerprint, status, headers, content = stored
+        if stored_fingerprint != fingerprint:
+            metrics.incr("idempotency.mismatch")
+            return JsonResponse(
+                {"detail": "Idempotency-Key was used with another payload"},
+                status=422,
+            )
+        metrics.incr("idempotency.replayed")
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+    def _is_excluded(self, request: HttpRequest) -> bool:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.url_name in settings.IDEMPOTENCY_EXCLUDED_ROUTES
+
+    def _cache_key(self, request: HttpRequest, key: str) -> str:
+        scope = "\n".join(
+            (
+                key,
+                request.method,
+                request.path,
+                request.META.get("HTTP_AUTHORIZATION", ""),
+            )
+        )
+        digest = hashlib.blake2b(scope.encode(), digest_size=16).hexdigest()
+        return f"{self.cache_key_prefix}:{digest}"
+
+
+class SingleFlightMiddleware:
+    """Coalesce identical concurrent GETs of `SINGLE_FLIGHT_ROUTES`.
+
+    Requests for the same URL with the same credentials and
+    negotiation/conditional headers wait for the one already in
+    flight and get a copy of its response, so a hot vendor page is
+    queried and serialized once per burst. Streamed responses and
+    responses setting cookies are not shared, waiting requests then
+    run on their own.
+
+    Sync only, like the middleware below it: requests are coalesced
+    across the threads of a WSGI server. Under ASGI Django runs the
+    sync stack one request at a time, so there is nothing to share."""
+
+    # request headers the response depends on, besides credentials
+    vary_meta = (
+        "HTTP_ACCEPT",
+        "HTTP_ACCEPT_ENCODING",
+        "HTTP_IF_NONE_MATCH",
+        "HTTP_IF_MODIFIED_SINCE",
+    )
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.flights = SingleFlight("responses")
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        key = self._flight_key(request)
+        if key is None:
+            return self.get_response(request)
+        (response, content), shared = self.flights.do(
+            key, lambda: self._snapshot(self.get_response(request))
+        )
+        if not shared:
+            return response
+        if content is None:
+            return self.get_response(request)
+        return self._copy(content)
+
+    def _flight_key(self, request: HttpRequest) -> Optional[str]:
+        if request.method not in ("GET", "HEAD"):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.url_name not in settings.SINGLE_FLIGHT_ROUTES:
+            return None
+        return "\n".join(
+            (
+                request.method,
+                request.get_full_path(),
+                get_client_key(request) or "",
+                *(request.META.get(name, "") for name in self.vary_meta),
+            )
+        )
+
+    def _snapshot(
+        self, response: HttpResponse
+    ) -> Tuple[HttpResponse, Optional[tuple]]:
+        """Copy what waiting requests need before outer middleware
+        of the first request goes on changing the response."""
+        if response.streaming or response.cookies:
+            return response, None
+        return response, (
+            response.status_code,
+            list(response.items()),
+            response.content,
+        )
+
+    def _copy(self, content: tuple) -> HttpResponse:
+        status, headers, body = content
+        response = HttpResponse(body, status=status)
+        for header, value in headers:
+            response[header] = value
+        return response
+
+
+class AdmissionControlMiddleware:
+    """Limit the number of requests in progress per group of routes.
+
+    Paths are mapped to pools by prefix in `ADMISSION_ROUTES`, each pool
+    in `ADMISSION_POOLS` has its own limit, so e.g. password hashing of
+    `/api/auth/token` can't take all workers from vendor reads.
+    Anonymous reads are admitted before other waiting requests.
+    Requests that can't get a slot in time are shed with 503 and
+    `Retry-After` before any view work is done. Streamed bodies are
+    produced after the slot is released."""
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.pools = admission.build_pools()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        pool_name = admission.pool_name_for(request.path)
+        if pool_name is None:
+            return self.get_response(request)
+
+        pool = self.pools[pool_name]
+        if not pool.acquire(self._priority(request)):
+            response = JsonResponse(
+                {"detail": "Server is overloaded, retry later"}, status=503
+            )
+            response["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER)
+            return response
+        try:
+            return self.get_response(request)
+        finally:
+            pool.release()
+
+    def _priority(self, request: HttpRequest) -> int:
+        if (
+            request.method in SAFE_METHODS
+            and "HTTP_AUTHORIZATION" not in request.META
+        ):
+            return admission.HIGH_PRIORITY
+        return admission.LOW_PRIORITY
+
+
+class InvalidationMiddleware:
+    """Apply cache invalidations published by other processes before
+    handling a request, see `db.invalidation`. Polls at most every
+    `INVALIDATION_POLL_INTERVAL` secs, which bounds how stale per-process
+    caches can be."""
+
+    def __init__(self, get_response: Callable) -> None:
+        if not settings.INVALIDATION_TRANSPORT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        invalidation.poll()
+        return self.get_response(request)
+
+
+class CompressionMiddleware:
+    """Compress responses with gzip, brotli or zstd,
+    whichever `Accept-Encoding` prefers among installed codings.
+
+    Streaming responses are compressed chunk by chunk as they are
+    sent. Bodies shorter than `COMPRESSION_MIN_SIZE` and content types
+    outside `COMPRESSION_CONTENT_TYPES` are sent as is. Levels are set
+    per coding in `COMPRESSION_LEVELS` and can be overridden by path
+    prefix in `COMPRESSION_ROUTE_LEVELS`."""
+
+    bodiless_statuses = (204, 206, 304)  # 206 content is a byte range
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.encodings = compression.available_encodings()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        response = self.get_response(request)
+        if not self._is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = compression.negotiate_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""), self.encodings
+        )
+        if encoding is None:
+            return response
+
+        level = compression.compression_level(request.path, encoding)
+        compressor = self.encodings[encoding](level)
+        if response.streaming:
+            response.streaming_content = compression.compress_sequence(
+                response.streaming_content, compressor
+            )
+            del response["Content-Length"]
+        else:
+            content = compressor.compress(response.content)
+            content += compressor.finish()
+            if len(content) >= len(response.content):
+                return response
+            metrics.incr(
+                "compression.saved_bytes", len(response.content) - len(content)
+            )
+            response.content = content
+            response["Content-Length"] = str(len(content))
+
+        # compressed body is not byte-for-byte the same, see RFC 9110 8.8.1
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        metrics.incr(f"compression.{encoding}")
+        return response
+
+    def _is_compressible(self, response: HttpResponse) -> bool:
+        if (
+            response.has_header("Content-Encoding")
+            or response.status_code in self.bodiless_statuses
+        ):
+            return False
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0]
+        return content_type.startswith(settings.COMPRESSION_CONTENT_TYPES)
+
+
+class MiddlewareChain:
+    """Middleware stack built the same way `BaseHandler.load_middleware`
+    builds `settings.MIDDLEWARE`, but from an arbitrary list of paths.
+    Sync middleware only."""
+
+    def __init__(self, middleware_paths: List[str], get_response: Callable):
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+
+        handler = convert_exception_to_response(get_response)
+        for middleware_path in reversed(middleware_paths):
+            try:
+                mw_instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(mw_instance, "process_view"):
+                self.view_middleware.insert(0, mw_instance.process_view)
+            if hasattr(mw_instance, "process_template_response"):
+                self.template_response_middleware.append(
+                    mw_instance.process_template_response
+                )
+            if hasattr(mw_instance, "process_exception"):
+                self.exception_middleware.append(mw_instance.process_exception)
+            handler = convert_exception_to_response(mw_instance)
+        self.handler = handler
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        return self.handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        for process_template_response in self.template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for process_exception in self.exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
+
+
+class PathMiddlewareDispatcher:
+    """Run `API_MIDDLEWARE` for requests under `API_PATH_PREFIX`
+    and `SITE_MIDDLEWARE` (sessions, csrf, auth, messages, etc.)
+    for everything else, e.g. `admin/`.
+
+    Bearer-token API routes don't use sessions, cookies or messages,
+    so they skip that per-request work entirely."""
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response: Callable) -> None:
+        self.api_chain = MiddlewareChain(settings.API_MIDDLEWARE, get_response)
+        self.site_chain = MiddlewareChain(
+            settings.SITE_MIDDLEWARE, get_response
+        )
+
+    def chain_for(self, request: HttpRequest) -> MiddlewareChain:
+        if request.path_info.startswith(settings.API_PATH_PREFIX):
+            return self.api_chain
+        return self.site_chain
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        return self.chain_for(request)(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        return self.chain_for(request).process_view(
+            request, view_func, view_args, view_kwargs
+        )
+
+    def process_template_response(self, request, response):
+        return self.chain_for(request).process_template_response(
+            request, response
+        )
+
+    def process_exception(self, request, exception):
+        return self.chain_for(request).process_exception(request, exception)
@@ -3,3 +3,5 @@ from decouple import Csv, config
 SECRET_KEY = config("SECRET_KEY")
 DEBUG = config("DEBUG")
 ALLOWED_HOSTS = config("ALLOWED_HOSTS", cast=Csv())
+# comma separated list of replica database names, e.g. `db_replica.sqlite3`
+DATABASE_REPLICAS = config("DATABASE_REPLICAS", default="", cast=Csv())
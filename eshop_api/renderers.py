@@ -0,0 +1,163 @@
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+from ninja import NinjaAPI
+from ninja.parser import Parser
+from ninja.renderers import BaseRenderer
+from ninja.types import DictStrAny
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def default(obj: Any) -> Any:
+    """Encode types not supported natively by orjson/msgpack.
+    `datetime` and enums (`CustomerStatus`) are native to orjson,
+    `Decimal` is encoded as string the way DjangoJSONEncoder does."""
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    return _django_encoder.default(obj)
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize `data` straight to JSON bytes."""
+    if orjson is None:
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+    return orjson.dumps(
+        data,
+        default=default,
+        option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+def stream_json_array(
+    rows: Iterable[Any], chunk_size: int = 100
+) -> Iterator[bytes]:
+    """Serialize `rows` as a JSON array piece by piece,
+    `chunk_size` rows at a time, e.g. for `StreamingHttpResponse`."""
+    rows = iter(rows)
+    separator = b""
+    yield b"["
+    while chunk := list(islice(rows, chunk_size)):
+        yield separator + dumps(chunk)[1:-1]
+        separator = b","
+    yield b"]"
+
+
+def quality_values(header: str) -> List[Tuple[str, float]]:
+    """Parse an `Accept`-like header into (value, quality) pairs
+    in the order they are listed."""
+    values = []
+    for item in header.split(","):
+        value, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, q = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(q)
+                except ValueError:
+                    quality = 0.0
+        if value:
+            values.append((value.lower(), quality))
+    return values
+
+
+def accepted_media_types(request: HttpRequest) -> List[str]:
+    """Media types from `Accept` header ordered by quality value."""
+    media_types = [
+        (-quality, position, media_type)
+        for position, (media_type, quality) in enumerate(
+            quality_values(request.headers.get("Accept", ""))
+        )
+        if quality > 0
+    ]
+    return [media_type for *_, media_type in sorted(media_types)]
+
+
+class FastRenderer(BaseRenderer):
+    """Render JSON with orjson and, if `msgpack` is installed,
+    MessagePack for clients that prefer it in `Accept`."""
+
+    media_type = JSON_MEDIA_TYPE
+
+    def media_type_for(self, request: HttpRequest) -> str:
+        if msgpack is None:
+            return self.media_type
+        for media_type in accepted_media_types(request):
+            if media_type in MSGPACK_MEDIA_TYPES:
+                return MSGPACK_MEDIA_TYPES[0]
+            if media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+                break
+        return self.media_type
+
+    def render(
+        self, request: HttpRequest, data: Any, *, response_status: int
+    ) -> bytes:
+        if self.media_type_for(request) in MSGPACK_MEDIA_TYPES:
+            return msgpack.packb(data, default=default)
+        return dumps(data)
+
+
+class FastParser(Parser):
+    """Parse JSON bodies with orjson and MessagePack bodies
+    sent with `Content-Type: application/msgpack`."""
+
+    def parse_body(self, request: HttpRequest) -> DictStrAny:
+        content_type = request.META.get("CONTENT_TYPE", "").split(";")[0]
+        if msgpack is not None and content_type in MSGPACK_MEDIA_TYPES:
+            return msgpack.unpackb(request.body)
+        if orjson is None:
+            return super().parse_body(request)
+        return orjson.loads(request.body)
+
+
+class NegotiatingNinjaAPI(NinjaAPI):
+    """NinjaAPI picking response content type per request
+    with `FastRenderer.media_type_for`."""
+
+    def create_temporal_response(self, request: HttpRequest) -> HttpResponse:
+        return HttpResponse("", content_type=self.get_content_type(request))
+
+    def create_response(
+        self,
+        request: HttpRequest,
+        data: Any,
+        *,
+        status: Optional[int] = None,
+        temporal_response: Optional[HttpResponse] = None,
+    ) -> HttpResponse:
+        if temporal_response is None:
+            temporal_response = self.create_temporal_response(request)
+            temporal_response.status_code = status
+        response = super().create_response(
+            request, data, temporal_response=temporal_response
+        )
+        if msgpack is not None:
+            patch_vary_headers(response, ("Accept",))
+        return response
+
+    def get_content_type(self, request: Optional[HttpRequest] = None) -> str:
+        media_type = self.renderer.media_type
+        if request is not None and hasattr(self.renderer, "media_type_for"):
+            media_type = self.renderer.media_type_for(request)
+        if media_type in MSGPACK_MEDIA_TYPES:
+            return media_type  # binary, no charset
+        return f"{media_type}; charset={self.renderer.charset}"
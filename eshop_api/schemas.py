@@ -0,0 +1,19 @@
+from typing import Any, Dict, List, Literal
+
+from ninja import Field, Schema
+
+
+class BatchItemIn(Schema):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(..., example="/api/customers/1")
+    body: Any = None
+
+
+class BatchIn(Schema):
+    requests: List[BatchItemIn] = Field(..., min_items=1)
+
+
+class BatchItemOut(Schema):
+    status: int
+    headers: Dict[str, str]
+    body: Any
@@ -24,17 +24,36 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "eshop_api.middleware.RequestIdMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "eshop_api.middleware.SingleFlightMiddleware",
+    "eshop_api.middleware.AdmissionControlMiddleware",
+    "eshop_api.middleware.InvalidationMiddleware",
+    "eshop_api.middleware.CompressionMiddleware",
+    "eshop_api.middleware.IdempotencyMiddleware",
+    "eshop_api.middleware.ReplicaStickinessMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "eshop_api.middleware.PathMiddlewareDispatcher",
+]
+
+# middleware run by PathMiddlewareDispatcher
+API_PATH_PREFIX = "/api/"
+API_MIDDLEWARE = []
+SITE_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+# admin checks look for these in MIDDLEWARE only;
+# PathMiddlewareDispatcher runs them from SITE_MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
 
 ROOT_URLCONF = "eshop_api.urls"
 
+TEST_RUNNER = "tests.runner.TestRunner"
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -64,6 +83,23 @@ DATABASES = {
     }
 }
 
+# Read replicas. Each one mirrors `default` in tests.
+REPLICA_DATABASES = []
+for num, replica_name in enumerate(project_secrets.DATABASE_REPLICAS):
+    alias = f"replica_{num}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME": BASE_DIR / replica_name,
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["db.routers.PrimaryReplicaRouter"]
+# how long a client reads from the primary after its last write; the pin
+# is kept in the default cache, which must be shared by all workers
+# (not the default per-process LocMemCache), see check `db.W001`
+REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -109,12 +145,184 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "x_users.User"
 
 # django_ninja settings
-NINJA_PAGINATION_CLASS = "ninja.pagination.PageNumberPagination"
+NINJA_PAGINATION_CLASS = "db.pagination.CachedCountPagination"
 NINJA_PAGINATION_PER_PAGE = 10
+# total counts of paginated lists, see `db.pagination.count_queryset`
+PAGINATION_COUNT_TTL = 30  # secs
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = 100_000  # rows
+# models whose inserts and deletes invalidate cached counts
+PAGINATION_COUNT_CACHE_MODELS = (
+    "customers.Customer",
+    "vendors.Vendor",
+    "x_users.User",
+)
+USER_STREAM_CHUNK_SIZE = 2000  # rows fetched and serialized at a time
 
 # auth settings
 TOKEN_EXP_TIME = 1200  # 20 mins
 
+# idempotency settings
+IDEMPOTENCY_METHODS = ("POST", "PUT", "PATCH")
+IDEMPOTENCY_PATH_PREFIX = "/api/"
+IDEMPOTENCY_TTL = 60 * 60 * 24  # stored responses, secs
+IDEMPOTENCY_LOCK_TTL = 30  # in-flight requests, secs
+# url names never stored: tokens expire long before IDEMPOTENCY_TTL
+IDEMPOTENCY_EXCLUDED_ROUTES = ("token_create",)
+
+# customers archive, see `customers.archive`
+CUSTOMER_ARCHIVE_CHUNK_SIZE = 1000  # customers moved per transaction
+
+# purge (erasure) jobs, see `db.purge`
+PURGE_CHUNK_SIZE = 500  # rows per transaction
+PURGE_MAX_IDS = 10_000  # ids per job
+PURGE_IN_PROCESS = True  # else run by the `run_purge_jobs` command
+PURGE_LEASE = 60 * 60  # secs before a running job is taken as abandoned
+
+# pruning of never activated signups, see `customers.signups`
+SIGNUP_PRUNE_MAX_AGE_DAYS = 30
+SIGNUP_PRUNE_MODE = "delete"  # or "archive"
+SIGNUP_PRUNE_CHUNK_SIZE = 1000  # users archived per transaction or purge job
+
+# cross-process cache invalidation, see `db.invalidation`;
+# `None` (one process), "db.invalidation.FileTransport" (one host)
+# or "db.invalidation.DatabaseTransport" (several hosts)
+INVALIDATION_TRANSPORT = None
+INVALIDATION_MODELS = ("customers.Customer", "vendors.Vendor", "x_users.User")
+INVALIDATION_POLL_INTERVAL = 1.0  # max staleness of other processes, secs
+INVALIDATION_FILE = BASE_DIR / "invalidation.log"
+INVALIDATION_FILE_MAX_BYTES = 1024 * 1024  # rotated after
+INVALIDATION_RETENTION = 60 * 60  # DB events kept, secs
+INVALIDATION_DB_GRACE = 10  # secs for DB events to commit
+
+# username/email availability filter, see `x_users.availability`
+AVAILABILITY_FILTER_ERROR_RATE = 0.01  # false positives, need a query
+AVAILABILITY_FILTER_MIN_CAPACITY = 100_000  # usernames and emails
+AVAILABILITY_FILTER_GROWTH = 2  # room for new users before a rebuild
+AVAILABILITY_FILTER_CHUNK_SIZE = 2000  # users read per query on build
+AVAILABILITY_FILTER_MAX_PENDING = 10_000  # updates kept before a rebuild
+AVAILABILITY_FILTER_WARM = True  # build on startup, see wsgi.py/asgi.py
+
+# write-behind last_seen/last_login, see `x_users.activity`
+LAST_SEEN_FLUSH_INTERVAL = 30  # secs between bulk updates
+LAST_SEEN_RESOLUTION = 60  # users seen more recently aren't recorded
+LAST_SEEN_MAX_BUFFER = 10_000  # users buffered before an early flush
+LAST_SEEN_FLUSH_BATCH = 500  # users per UPDATE
+# flush from a background thread too, and at exit; off in tests, see
+# `tests.runner`
+LAST_SEEN_FLUSH_THREAD = True
+
+# periodic jobs run by `run_scheduler`, see `db.scheduler`
+SCHEDULER_POLL_INTERVAL = 30  # secs between checks for due jobs
+SCHEDULER_JITTER = 60  # max random delay added to each run, secs
+SCHEDULER_LEASE = 60 * 60  # secs before a crashed run may be retaken
+# job name -> cron spec overriding the registered one, `None` disables it
+SCHEDULER_SCHEDULES = {}
+
+# slow query log, see `db.slow_queries`
+SLOW_QUERY_THRESHOLD = None  # secs, e.g. 0.1; `None` disables it
+SLOW_QUERY_MAX_FINGERPRINTS = 1000  # distinct queries aggregated
+# plumbing skipped when looking for the code that ran a query
+SLOW_QUERY_IGNORED_FILES = (
+    "manage.py",
+    "db/management/commands/run_scheduler.py",
+    "db/models.py",
+    "db/pagination.py",
+    "db/purge.py",
+    "db/scheduler.py",
+    "db/signals.py",
+    "db/slow_queries.py",
+    "eshop_api/batch.py",
+    "eshop_api/middleware.py",
+    "eshop_api/singleflight.py",
+)
+
+# multi-get (`/many?ids=`) settings
+MULTI_GET_MAX_SIZE = 100
+
+# batch settings
+BATCH_MAX_SIZE = 50  # requests per batch
+BATCH_MAX_WORKERS = 8  # threads running GETs of a batch in parallel
+
+# change feed settings
+CHANGE_FEED_POLL_INTERVAL = 0.5  # secs
+CHANGE_FEED_MAX_WAIT = 10  # long-poll timeout cap, secs, < worker timeout
+CHANGE_FEED_STREAM_TIMEOUT = 60  # secs
+CHANGE_FEED_PAGE_SIZE = 100
+# entries are served once this old, so that the id cursor can't pass
+# an entry whose transaction (allocated an id, then) commits later
+CHANGE_FEED_SETTLE = 5  # secs, longer than write transactions
+CHANGE_LOG_UPDATE_CHUNK_SIZE = 500  # rows per transaction of bulk updates
+
+# admission control (load shedding) settings
+# pool: max requests in progress, max waiting, max wait in secs
+ADMISSION_POOLS = {
+    "auth": {"limit": 4, "max_queue": 16, "timeout": 0.5},
+    "api": {"limit": 32, "max_queue": 64, "timeout": 2.0},
+    # long polls hold a worker for up to CHANGE_FEED_MAX_WAIT
+    "changes": {"limit": 4, "max_queue": 4, "timeout": 0.5},
+}
+# path prefix: pool, the longest matching prefix wins, `None` isn't limited
+ADMISSION_ROUTES = {
+    "/api/auth/": "auth",
+    "/api/": "api",
+    "/api/changes/": "changes",
+}
+ADMISSION_RETRY_AFTER = 1  # secs
+
+# single-flight: url names of GET routes whose concurrent identical
+# requests share one response
+SINGLE_FLIGHT_ROUTES = ("vendor_detail", "customer_detail")
+
 # email settings
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 CORPORATE_EMAIL = "support@eshop.commy"
+
+# Response compression
+COMPRESSION_ENCODINGS = ("br", "zstd", "gzip")  # server preference
+COMPRESSION_LEVELS = {"gzip": 6, "br": 5, "zstd": 3}
+# path prefix: levels; the longest matching prefix wins
+COMPRESSION_ROUTE_LEVELS = {
+    "/api/changes/stream": {"gzip": 1, "br": 1, "zstd": 1},
+}
+COMPRESSION_MIN_SIZE = 512  # bytes
+COMPRESSION_CONTENT_TYPES = (
+    "text/",
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "application/xml",
+)
+
+# logging, see `eshop_api.log`: JSON lines written by a background thread
+LOG_LEVEL = "INFO"  # "DEBUG" adds sampled debug records
+LOG_FILE = None  # stderr
+LOG_QUEUE_SIZE = 10_000  # records waiting to be written, more are dropped
+LOG_DEBUG_SAMPLE_RATE = 0.01  # requests keeping DEBUG records
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_context": {"()": "eshop_api.log.RequestContextFilter"},
+        "debug_sampling": {
+            "()": "eshop_api.log.DebugSamplingFilter",
+            "rate": LOG_DEBUG_SAMPLE_RATE,
+        },
+    },
+    "handlers": {
+        "queue": {
+            "class": "eshop_api.log.AsyncQueueHandler",
+            "filename": LOG_FILE,
+            "maxsize": LOG_QUEUE_SIZE,
+            "filters": ["request_context", "debug_sampling"],
+        },
+    },
+    "root": {"handlers": ["queue"], "level": LOG_LEVEL},
+    "loggers": {
+        # replaces django's own console and mail handlers
+        "django": {
+            "handlers": ["queue"],
+            "level": LOG_LEVEL,
+            "propagate": False,
+        },
+    },
+}
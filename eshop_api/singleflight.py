@@ -0,0 +1,51 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from .metrics import metrics
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Any = None
+
+
+class SingleFlight:
+    """Run one computation per key at a time; callers arriving while
+    it is in flight wait for it and get the same result (or exception).
+
+    For threads (WSGI). Results are not kept once the computation is
+    over. `do` returns `(result, shared)`, `shared` is false for the
+    caller that did the work."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr(f"singleflight.{self.name}.shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        metrics.incr(f"singleflight.{self.name}.executed")
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
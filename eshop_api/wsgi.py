@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "eshop_api.settings")
 
 application = get_wsgi_application()
+
+from x_users import availability  # noqa: E402, needs the app registry
+
+availability.warm()
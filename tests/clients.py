@@ -12,13 +12,20 @@ class AuthClient(TestClient):
         self.router_or_app = router_or_app
         self.token = token
 
+    def _auth_headers(self, request_params: Dict) -> Dict:
+        """Add authorization header to the ones given in request."""
+        return {
+            **request_params.get("headers", {}),
+            "Authorization": f"Bearer {self.token}",
+        }
+
     def get(
         self,
         path: str,
         data: Dict = {},
         **request_params: Dict,
     ) -> "NinjaResponse":
-        request_params["headers"] = {"Authorization": f"Bearer {self.token}"}
+        request_params["headers"] = self._auth_headers(request_params)
         return super().get(path, data, **request_params)
 
     def post(
@@ -28,7 +35,7 @@ class AuthClient(TestClient):
         json: Any = None,
         **request_params: Any,
     ) -> "NinjaResponse":
-        request_params["headers"] = {"Authorization": f"Bearer {self.token}"}
+        request_params["headers"] = self._auth_headers(request_params)
         return super().post(path, data, json, **request_params)
 
     def patch(
@@ -38,7 +45,7 @@ class AuthClient(TestClient):
         json: Any = None,
         **request_params: Any,
     ) -> "NinjaResponse":
-        request_params["headers"] = {"Authorization": f"Bearer {self.token}"}
+        request_params["headers"] = self._auth_headers(request_params)
         return super().patch(path, data, json, **request_params)
 
     def put(
@@ -48,7 +55,7 @@ class AuthClient(TestClient):
         json: Any = None,
         **request_params: Any,
     ) -> "NinjaResponse":
-        request_params["headers"] = {"Authorization": f"Bearer {self.token}"}
+        request_params["headers"] = self._auth_headers(request_params)
         return super().put(path, data, json, **request_params)
 
     def delete(
@@ -58,5 +65,5 @@ class AuthClient(TestClient):
         json: Any = None,
         **request_params: Any,
     ) -> "NinjaResponse":
-        request_params["headers"] = {"Authorization": f"Bearer {self.token}"}
+        request_params["headers"] = self._auth_headers(request_params)
         return super().delete(path, data, json, **request_params)
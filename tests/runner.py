@@ -0,0 +1,36 @@
+import logging
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """`DiscoverRunner` with the settings of the test run.
+
+    Last seen times aren't flushed from a background thread: test
+    databases are shared with test transactions and are gone at exit.
+    Tests of the flusher enable it with `override_settings`.
+
+    The root and `django` loggers log warnings and up only, so that
+    INFO records of requests don't flood the output. `assertLogs`
+    still sees lower levels of the logger it watches."""
+
+    test_settings = {"LAST_SEEN_FLUSH_THREAD": False}
+    log_level = logging.WARNING
+    quiet_loggers = ("", "django")
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(**self.test_settings)
+        self._test_settings.enable()
+        self._log_levels = {}
+        for name in self.quiet_loggers:
+            logger = logging.getLogger(name)
+            self._log_levels[name] = logger.level
+            logger.setLevel(max(logger.level, self.log_level))
+
+    def teardown_test_environment(self, **kwargs):
+        for name, level in self._log_levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,141 @@
+import datetime as dt
+import json
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from db.models import ChangeLogEntry
+from x_auth.authentication import generate_user_token
+from x_users import activity
+
+User = get_user_model()
+
+
+class ActivityTestCase(TestCase):
+    def setUp(self):
+        activity._seen.clear()
+        activity._logins.clear()
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        self.users = [
+            User.objects.create_user(username=f"user{i}", email=f"{i}@a.py")
+            for i in range(3)
+        ]
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {generate_user_token(self.admin)}"
+        }
+
+    def test_flush_is_one_update(self):
+        for user in self.users:
+            activity.touch(user)
+        ChangeLogEntry.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(activity.flush(), 3)
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+
+        for user in self.users:
+            version = user.version
+            user.refresh_from_db()
+            self.assertIsNotNone(user.last_seen)
+            self.assertEqual(user.version, version)
+        self.assertFalse(ChangeLogEntry.objects.exists())
+        self.assertEqual(activity.flush(), 0)
+
+    @override_settings(LAST_SEEN_FLUSH_BATCH=2)
+    def test_flush_in_batches(self):
+        for user in self.users:
+            activity.touch(user)
+        with CaptureQueriesContext(connection) as queries:
+            activity.flush()
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+
+    def test_recently_seen_users_are_skipped(self):
+        user = self.users[0]
+        user.last_seen = timezone.now() - dt.timedelta(seconds=10)
+        activity.touch(user)
+        self.assertEqual(activity._seen, {})
+        user.last_seen -= dt.timedelta(minutes=5)
+        activity.touch(user)
+        self.assertIn(user.pk, activity._seen)
+
+    def test_newer_times_are_kept(self):
+        user = self.users[0]
+        activity.touch(user)
+        newer = timezone.now() + dt.timedelta(minutes=1)
+        User.objects.filter(pk=user.pk).update(last_seen=newer)
+        activity.flush()
+        user.refresh_from_db()
+        self.assertEqual(user.last_seen, newer)
+
+    def test_failed_flush_is_retried(self):
+        activity.touch(self.users[0])
+        with mock.patch.object(
+            activity, "write", side_effect=DatabaseError("down")
+        ), self.assertLogs("x_users.activity", "ERROR"):
+            self.assertEqual(activity.flush(), 0)
+        self.assertIn(self.users[0].pk, activity._seen)
+        self.assertEqual(activity.flush(), 1)
+
+    @override_settings(LAST_SEEN_FLUSH_INTERVAL=0)
+    def test_requests_and_logins_are_recorded(self):
+        self.client.get(reverse("api-1.0.0:user_list"), **self.auth)
+        self.admin.refresh_from_db()
+        self.assertIsNotNone(self.admin.last_seen)
+        self.assertIsNone(self.admin.last_login)
+
+        self.client.post(
+            reverse("api-1.0.0:token_create"),
+            data=json.dumps({"username": "admin", "password": "hello"}),
+            content_type="application/json",
+        )
+        self.admin.refresh_from_db()
+        self.assertIsNotNone(self.admin.last_login)
+
+    @override_settings(LAST_SEEN_FLUSH_INTERVAL=3600)
+    def test_flush_waits_for_interval(self):
+        activity._last_flush = float("inf")  # flushed just now
+        self.addCleanup(setattr, activity, "_last_flush", 0.0)
+        self.client.get(reverse("api-1.0.0:user_list"), **self.auth)
+        self.admin.refresh_from_db()
+        self.assertIsNone(self.admin.last_seen)
+        self.assertIn(self.admin.pk, activity._seen)
+
+    @override_settings(LAST_SEEN_FLUSH_INTERVAL=0)
+    def test_user_list_filters(self):
+        seen = timezone.now() - dt.timedelta(days=2)
+        User.objects.filter(pk=self.users[0].pk).update(last_seen=seen)
+        url = reverse("api-1.0.0:user_list")
+        resp = self.client.get(
+            url,
+            {"seen_before": timezone.now() - dt.timedelta(days=1)},
+            **self.auth,
+        )
+        self.assertEqual(
+            [user["username"] for user in resp.json()["items"]], ["user0"]
+        )
+        resp = self.client.get(url, {"never_seen": True}, **self.auth)
+        self.assertEqual(  # admin was seen by the first request
+            [user["username"] for user in resp.json()["items"]],
+            ["user1", "user2"],
+        )
+
+    @override_settings(LAST_SEEN_FLUSH_THREAD=True, LAST_SEEN_FLUSH_INTERVAL=0)
+    def test_idle_processes_flush_in_background(self):
+        flushed = threading.Event()
+        with mock.patch.object(
+            activity, "flush", side_effect=lambda: flushed.set()
+        ) as flush:
+            activity.touch(self.users[0])
+            self.assertTrue(flushed.wait(5))
+            activity.stop_flusher()  # and flushes once more
+            self.assertFalse(activity._flusher.is_alive())
+            self.assertGreaterEqual(flush.call_count, 2)
@@ -0,0 +1,123 @@
+import threading
+import time
+from http import HTTPStatus
+
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from eshop_api.admission import HIGH_PRIORITY, LOW_PRIORITY, AdmissionPool
+from eshop_api.metrics import metrics
+from eshop_api.middleware import AdmissionControlMiddleware
+
+POOLS = {
+    "auth": {"limit": 1, "max_queue": 1, "timeout": 0.2},
+    "api": {"limit": 2, "max_queue": 2, "timeout": 0.2},
+}
+ROUTES = {"/api/auth/": "auth", "/api/": "api", "/api/changes/": None}
+
+
+@override_settings(ADMISSION_POOLS=POOLS, ADMISSION_ROUTES=ROUTES)
+class AdmissionControlMiddlewareTestCase(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.factory = RequestFactory()
+        self.release = threading.Event()
+        self.entered = threading.Semaphore(0)
+        self.middleware = AdmissionControlMiddleware(self.slow_view)
+
+    def tearDown(self):
+        self.release.set()
+
+    def slow_view(self, request):
+        if request.path.startswith("/api/auth/"):
+            self.entered.release()
+            self.release.wait(5)
+        return HttpResponse("ok")
+
+    def start(self, request, responses):
+        thread = threading.Thread(
+            target=lambda: responses.append(self.middleware(request))
+        )
+        thread.start()
+        return thread
+
+    def test_overload_is_shed_with_retry_after(self):
+        responses = []
+        login = self.factory.post("/api/auth/token")
+        in_progress = self.start(login, responses)
+        self.assertTrue(self.entered.acquire(timeout=5))
+        queued = self.start(self.factory.post("/api/auth/token"), responses)
+
+        # the queue is full: rejected without waiting
+        resp = self.middleware(self.factory.post("/api/auth/token"))
+        self.assertEqual(resp.status_code, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertEqual(resp["Retry-After"], "1")
+        # the queued request gives up after its deadline
+        queued.join(5)
+        self.assertEqual(
+            responses.pop().status_code, HTTPStatus.SERVICE_UNAVAILABLE
+        )
+
+        self.release.set()
+        in_progress.join(5)
+        self.assertEqual(responses.pop().status_code, HTTPStatus.OK)
+        self.assertEqual(metrics.get("admission.auth.admitted"), 1)
+        self.assertEqual(metrics.get("admission.auth.queued"), 1)
+        self.assertEqual(metrics.get("admission.auth.rejected"), 2)
+
+    def test_login_spike_does_not_block_public_reads(self):
+        responses = []
+        login = self.start(self.factory.post("/api/auth/token"), responses)
+        self.assertTrue(self.entered.acquire(timeout=5))
+        resp = self.middleware(self.factory.get("/api/vendors/"))
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.release.set()
+        login.join(5)
+        self.assertEqual(metrics.get("admission.api.rejected"), 0)
+
+    def test_unlimited_routes(self):
+        with self.settings(ADMISSION_POOLS={}):
+            middleware = AdmissionControlMiddleware(self.slow_view)
+            resp = middleware(self.factory.get("/api/changes/"))
+            self.assertEqual(resp.status_code, HTTPStatus.OK)
+
+
+class AdmissionPoolTestCase(SimpleTestCase):
+    def test_high_priority_waiters_are_admitted_first(self):
+        pool = AdmissionPool("test", limit=1, max_queue=2, timeout=5)
+        self.assertTrue(pool.acquire())
+        order = []
+
+        def wait(priority):
+            self.assertTrue(pool.acquire(priority))
+            order.append(priority)
+            pool.release()
+
+        threads = [
+            threading.Thread(target=wait, args=(LOW_PRIORITY,)),
+            threading.Thread(target=wait, args=(HIGH_PRIORITY,)),
+        ]
+        for thread in threads:
+            thread.start()
+            while pool.queued < threads.index(thread) + 1:
+                time.sleep(0.01)
+        pool.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, [HIGH_PRIORITY, LOW_PRIORITY])
+        self.assertEqual(pool.active, 0)
+
+
+class AdmissionControlStackTestCase(TestCase):
+    @override_settings(
+        ADMISSION_POOLS={
+            "api": {"limit": 0, "max_queue": 0, "timeout": 0},
+        },
+        ADMISSION_ROUTES={"/api/": "api"},
+    )
+    def test_rejected_before_view(self):
+        resp = Client().get(reverse("api-1.0.0:vendor_list"))
+        self.assertEqual(resp.status_code, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertIn("Retry-After", resp)
@@ -0,0 +1,124 @@
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from customers.archive import archive_customers
+from customers.models import ArchivedCustomer, Customer
+from customers.stats import get_customer_stats, recompute_customer_stats
+from x_auth.authentication import generate_user_token
+from x_users.models import ArchivedUser
+
+User = get_user_model()
+
+
+class CustomerArchiveTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {generate_user_token(admin)}"
+        }
+        for i in range(4):
+            User.objects.create_user(
+                username=f"user{i}",
+                email=f"user{i}@hello.py",
+                create_customer=True,
+            )
+        self.active = Customer.objects.get(user__username="user0")
+        for customer in Customer.objects.exclude(id=self.active.id):
+            customer.status = Customer.CustomerStatus.ARCHIVED
+            customer.save()
+        staff = User.objects.get(username="user3")
+        staff.is_staff = True
+        staff.save()
+
+    def test_archived_customers_are_moved(self):
+        stats = get_customer_stats()
+        self.assertEqual(archive_customers(chunk_size=2), (3, 0))
+        self.assertEqual(list(Customer.objects.all()), [self.active])
+        self.assertEqual(ArchivedCustomer.objects.count(), 3)
+        self.assertFalse(ArchivedUser.objects.exists())
+        # moved customers are still counted
+        self.assertEqual(get_customer_stats(), stats)
+        recompute_customer_stats()
+        self.assertEqual(get_customer_stats(), stats)
+
+    def test_inactive_users_are_moved_with_customers(self):
+        self.assertEqual(archive_customers(include_users=True), (3, 2))
+        self.assertEqual(
+            set(ArchivedUser.objects.values_list("username", flat=True)),
+            {"user1", "user2"},
+        )
+        # staff users stay
+        self.assertTrue(User.objects.filter(username="user3").exists())
+        user = ArchivedUser.objects.get(username="user1")
+        customer = ArchivedCustomer.objects.get(user_id=user.id)
+        self.assertEqual(customer.user.username, "user1")
+
+    def test_archive_columns_match(self):
+        for model, archive in (
+            (Customer, ArchivedCustomer),
+            (User, ArchivedUser),
+        ):
+            self.assertLessEqual(
+                {field.attname for field in model._meta.concrete_fields},
+                {field.attname for field in archive._meta.concrete_fields},
+            )
+
+    def test_list_reads_archive_only_when_asked(self):
+        archive_customers(include_users=True)
+        url = reverse("api-1.0.0:customer_list")
+        resp = self.client.get(url, **self.auth)
+        self.assertEqual(
+            [item["username"] for item in resp.json()["items"]], ["user0"]
+        )
+        # auth, count estimate, count, customers, users, archived users
+        with self.assertNumQueries(6):
+            resp = self.client.get(url, {"archived": True}, **self.auth)
+        self.assertEqual(
+            sorted(item["username"] for item in resp.json()["items"]),
+            ["user1", "user2", "user3"],
+        )
+
+    def test_detail_and_restore(self):
+        archive_customers(include_users=True)
+        customer = ArchivedCustomer.objects.order_by("id").first()
+        url = reverse("api-1.0.0:customer_detail", args=(customer.id,))
+        resp = self.client.get(url, **self.auth)
+        self.assertEqual(resp.status_code, HTTPStatus.NOT_FOUND)
+        resp = self.client.get(url, {"archived": True}, **self.auth)
+        self.assertEqual(resp.json()["username"], "user1")
+
+        resp = self.client.post(
+            reverse("api-1.0.0:customer_restore", args=(customer.id,)),
+            **self.auth,
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertEqual(resp.json()["status"], "archived")
+        restored = Customer.objects.get(id=customer.id)
+        self.assertEqual(restored.user.username, "user1")
+        self.assertFalse(ArchivedUser.objects.filter(username="user1"))
+        self.assertEqual(self.client.get(url, **self.auth).status_code, 200)
+
+    def test_restore_conflict(self):
+        archive_customers(include_users=True)
+        customer = ArchivedCustomer.objects.order_by("id").first()
+        User.objects.create_user(username="user1", email="new@hello.py")
+        resp = self.client.post(
+            reverse("api-1.0.0:customer_restore", args=(customer.id,)),
+            **self.auth,
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertTrue(ArchivedCustomer.objects.filter(id=customer.id))
+
+    def test_command(self):
+        out = StringIO()
+        call_command("archive_customers", "--include-users", stdout=out)
+        self.assertIn("Archived 3 customers and 2 users", out.getvalue())
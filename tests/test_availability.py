@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from customers.models import Customer
+from x_auth.authentication import generate_user_token
+from x_users import availability
+from x_users.availability import BloomFilter, is_taken
+from x_users.models import ArchivedUser
+
+User = get_user_model()
+
+
+class BloomFilterTestCase(SimpleTestCase):
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"user{i}")
+        self.assertTrue(all(f"user{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"other{i}" in bloom for i in range(10_000))
+        self.assertLess(false_positives, 300)
+
+
+class AvailabilityTestCase(TestCase):
+    def setUp(self):
+        availability._reset()
+        User.objects.create_user(username="Taken", email="taken@hello.py")
+        ArchivedUser.objects.create(
+            id=1000,
+            username="archived",
+            email="archived@hello.py",
+            date_joined="2024-01-01T00:00Z",
+        )
+
+    def test_free_names_need_no_query(self):
+        availability.get_filter()
+        with self.assertNumQueries(0):
+            self.assertFalse(is_taken("username", "free"))
+            self.assertFalse(is_taken("email", "free@hello.py"))
+
+    def test_hits_are_confirmed(self):
+        availability.get_filter()
+        with self.assertNumQueries(1):
+            self.assertTrue(is_taken("username", "Taken"))
+        with self.assertNumQueries(2):  # users, archived users
+            self.assertFalse(is_taken("username", "taken"))
+        self.assertTrue(is_taken("email", "archived@hello.py"))
+        self.assertFalse(
+            is_taken("email", "archived@hello.py", include_archived=False)
+        )
+
+    def test_saved_users_are_added(self):
+        availability.get_filter()
+        User.objects.create_user(username="new", email="new@hello.py")
+        self.assertTrue(is_taken("username", "new"))
+        self.assertTrue(is_taken("email", "new@hello.py"))
+
+    def test_users_of_other_processes_are_added(self):
+        availability.get_filter()
+        # no post_save, as if created by another process
+        (user,) = User.objects.bulk_create(
+            [User(username="remote", email="remote@hello.py")]
+        )
+        self.assertFalse(is_taken("username", "remote"))
+        availability.user_changed(str(user.pk))
+        self.assertTrue(is_taken("username", "remote"))
+
+    def test_lost_messages_rebuild(self):
+        availability.get_filter()
+        User.objects.bulk_create(
+            [User(username="remote", email="remote@hello.py")]
+        )
+        availability.user_changed(None)
+        self.assertTrue(is_taken("username", "remote"))
+
+    def test_api(self):
+        url = reverse("api-1.0.0:user_availability")
+        resp = self.client.get(url, {"username": "Taken", "email": "a@b.py"})
+        self.assertEqual(resp.json(), {"username": False, "email": True})
+        resp = self.client.get(url, {"username": "free"})
+        self.assertEqual(resp.json(), {"username": True, "email": None})
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_user_create_rejects_taken_names(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        resp = self.client.post(
+            reverse("api-1.0.0:user_create"),
+            data={
+                "username": "Taken",
+                "email": "other@hello.py",
+                "password": "password123",
+            },
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {generate_user_token(admin)}",
+        )
+        self.assertEqual(resp.status_code, 400)
+
+    def test_creates_missed_by_the_filter_are_rejected(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        availability.get_filter()
+        # no post_save nor invalidation, as if created by another process
+        (user,) = User.objects.bulk_create(
+            [User(username="remote", email="remote@hello.py")]
+        )
+        Customer.objects.create(user=user)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {generate_user_token(admin)}"}
+        for url_name in ("user_create", "customer_create"):
+            with self.subTest(url_name):
+                resp = self.client.post(
+                    reverse(f"api-1.0.0:{url_name}"),
+                    data={
+                        "username": "remote",
+                        "email": "other@hello.py",
+                        "password": "password123",
+                    },
+                    content_type="application/json",
+                    **auth,
+                )
+                self.assertEqual(resp.status_code, 400)
+
+    def test_warm(self):
+        with self.settings(AVAILABILITY_FILTER_WARM=False):
+            availability.warm()
+        self.assertIsNone(availability._filter)
+        with mock.patch.object(
+            availability, "build_filter", side_effect=DatabaseError
+        ), self.assertLogs("x_users.availability", "WARNING"):
+            availability.warm()
+        self.assertIsNone(availability._filter)
+        availability.warm()
+        self.assertTrue(is_taken("username", "Taken"))
@@ -0,0 +1,136 @@
+import json
+import threading
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from eshop_api import batch
+from tests.factories import VendorFactory
+from x_auth.authentication import BasicAuthBearer, generate_user_token
+
+User = get_user_model()
+
+
+class BatchTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        self.vendor = VendorFactory.create()
+        self.url = reverse("api-1.0.0:batch")
+
+    def batch(self, *requests):
+        return self.client.post(
+            self.url,
+            data=json.dumps({"requests": list(requests)}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {generate_user_token(self.admin)}",
+        )
+
+    def test_results_are_returned_in_order(self):
+        resp = self.batch(
+            {"path": f"/api/users/{self.admin.id}/"},
+            {"path": f"/api/vendors/{self.vendor.slug}/"},
+            {"path": "/api/users/0/"},
+            {"path": "/api/nowhere/"},
+            {"path": "/admin/"},
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        results = resp.json()
+        self.assertEqual(
+            [result["status"] for result in results],
+            [200, 200, 404, 404, 400],
+        )
+        self.assertEqual(results[0]["body"]["username"], "admin")
+        self.assertEqual(results[1]["body"]["slug"], self.vendor.slug)
+
+    def test_user_is_authenticated_once(self):
+        with mock.patch.object(
+            BasicAuthBearer,
+            "get_user",
+            autospec=True,
+            side_effect=BasicAuthBearer.get_user,
+        ) as get_user:
+            resp = self.batch(
+                {"path": f"/api/users/{self.admin.id}/"},
+                {"path": "/api/users/"},
+                {"path": "/api/customers/"},
+            )
+        self.assertEqual(
+            [result["status"] for result in resp.json()], [200, 200, 200]
+        )
+        self.assertEqual(get_user.call_count, 1)
+
+    def test_reads_see_earlier_writes(self):
+        resp = self.batch(
+            {
+                "method": "PUT",
+                "path": f"/api/vendors/{self.vendor.slug}/update",
+                "body": {"description": "updated"},
+            },
+            {"path": f"/api/vendors/{self.vendor.slug}/"},
+        )
+        update, detail = resp.json()
+        self.assertEqual(update["status"], HTTPStatus.OK)
+        self.assertEqual(detail["body"]["description"], "updated")
+
+    def test_sub_requests_are_authorized(self):
+        user = User.objects.create_user(
+            username="user", email="user@hello.py", is_active=True
+        )
+        resp = self.client.post(
+            self.url,
+            data=json.dumps({"requests": [{"path": "/api/users/"}]}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {generate_user_token(user)}",
+        )
+        self.assertEqual(resp.json()[0]["status"], HTTPStatus.UNAUTHORIZED)
+
+    def test_nested_batch_is_rejected(self):
+        resp = self.batch(
+            {"method": "POST", "path": "/api/batch", "body": {"requests": []}}
+        )
+        self.assertEqual(resp.json()[0]["status"], HTTPStatus.BAD_REQUEST)
+
+    @override_settings(BATCH_MAX_SIZE=2)
+    def test_batch_size_is_capped(self):
+        resp = self.batch(*[{"path": "/api/users/"}] * 3)
+        self.assertEqual(resp.status_code, HTTPStatus.BAD_REQUEST)
+
+
+class ParallelBatchTestCase(TransactionTestCase):
+    def test_reads_run_in_parallel(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        vendors = VendorFactory.create_batch(3)
+        threads = set()
+
+        def execute(request, item):
+            threads.add(threading.current_thread().name)
+            return batch_execute(request, item)
+
+        batch_execute = batch.execute
+        with mock.patch.object(batch, "execute", execute):
+            resp = self.client.post(
+                reverse("api-1.0.0:batch"),
+                data=json.dumps(
+                    {
+                        "requests": [
+                            {"path": f"/api/vendors/{vendor.slug}/"}
+                            for vendor in vendors
+                        ]
+                    }
+                ),
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {generate_user_token(admin)}",
+            )
+        self.assertEqual(
+            [result["body"]["slug"] for result in resp.json()],
+            [vendor.slug for vendor in vendors],
+        )
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith("batch") for name in threads))
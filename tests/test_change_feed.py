@@ -0,0 +1,124 @@
+import datetime as dt
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from customers.api import router as customers_router
+from customers.models import Customer
+from db.api import router
+from db.models import ChangeLogEntry
+from tests.clients import AuthClient
+from tests.factories import VendorFactory
+from vendors.models import Vendor
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+Action = ChangeLogEntry.Action
+
+
+@override_settings(CHANGE_FEED_SETTLE=0)
+class ChangeLogTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        self.client = AuthClient(router, generate_user_token(self.admin))
+
+    def changes(self, model: str):
+        return list(
+            ChangeLogEntry.objects.filter(model=model).values_list(
+                "action", "changed_fields"
+            )
+        )
+
+    def test_save_and_delete_are_logged(self):
+        vendor = VendorFactory.create()
+        vendor.description = "new"
+        vendor.save(update_fields=("description",))
+        vendor.delete()
+        self.assertEqual(
+            self.changes("vendors.vendor"),
+            [
+                (Action.CREATE, []),
+                (Action.UPDATE, ["description"]),
+                (Action.DELETE, []),
+            ],
+        )
+
+    def test_cascaded_delete_is_logged(self):
+        user = User.objects.create_user(
+            username="user1", email="user1@hello.py", create_customer=True
+        )
+        user.delete()
+        self.assertIn((Action.DELETE, []), self.changes("customers.customer"))
+
+    def test_customer_delete_logs_bulk_user_update(self):
+        customer = Customer.objects.create(
+            user=User.objects.create_user(
+                username="user1", email="user1@hello.py", is_active=True
+            )
+        )
+        admin_client = AuthClient(
+            customers_router, generate_user_token(self.admin)
+        )
+        admin_client.delete(f"/{customer.id}/delete")
+        self.assertIn(
+            (Action.UPDATE, ["is_active"]), self.changes("x_users.user")
+        )
+        self.assertIn(
+            (Action.UPDATE, ["status", "updated_at"]),
+            self.changes("customers.customer"),
+        )
+
+    @override_settings(CHANGE_LOG_UPDATE_CHUNK_SIZE=2)
+    def test_bulk_update_runs_in_chunks(self):
+        VendorFactory.create_batch(5, description="old")
+        ChangeLogEntry.objects.all().delete()
+        # 3 chunks of select, update and log insert, then an empty select
+        with self.assertNumQueries(10):
+            rows = Vendor.objects.filter(description="old").update(
+                description="new"
+            )
+        self.assertEqual(rows, 5)
+        self.assertEqual(Vendor.objects.filter(description="new").count(), 5)
+        self.assertEqual(
+            self.changes("vendors.vendor"),
+            [(Action.UPDATE, ["description"])] * 5,
+        )
+
+    def test_change_list_pages_with_cursor(self):
+        VendorFactory.create_batch(3)
+        resp = self.client.get("/?models=vendors.vendor&limit=2")
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        data = resp.json()
+        self.assertEqual(len(data["items"]), 2)
+
+        resp = self.client.get(
+            f"/?models=vendors.vendor&since={data['next_cursor']}"
+        )
+        self.assertEqual(len(resp.json()["items"]), 1)
+
+    @override_settings(CHANGE_FEED_STREAM_TIMEOUT=0.1)
+    def test_change_stream_sends_events(self):
+        vendor = VendorFactory.create()
+        resp = self.client.get("/stream?models=vendors.vendor")
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        self.assertIn(f'"object_id": "{vendor.id}"', resp.content.decode())
+
+    def test_unsettled_entries_hold_the_cursor(self):
+        vendors = VendorFactory.create_batch(3)
+        # the middle entry committed late, as seen by a feed at `now`
+        ChangeLogEntry.objects.filter(object_id=str(vendors[1].id)).update(
+            created_at=timezone.now() + dt.timedelta(minutes=1)
+        )
+        data = self.client.get("/?models=vendors.vendor").json()
+        self.assertEqual(
+            [entry["object_id"] for entry in data["items"]],
+            [str(vendors[0].id)],
+        )
+        with override_settings(CHANGE_FEED_SETTLE=60 * 60):
+            data = self.client.get("/?models=vendors.vendor").json()
+            self.assertEqual(data["items"], [])
+            self.assertEqual(data["next_cursor"], 0)
@@ -0,0 +1,138 @@
+import gzip
+import zlib
+from unittest import skipUnless
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from eshop_api.compression import (
+    brotli,
+    compression_level,
+    negotiate_encoding,
+    zstandard,
+)
+from eshop_api.middleware import CompressionMiddleware
+from tests.factories import VendorFactory
+
+BODY = b'{"items": [' + b'{"name": "vendor"}, ' * 100 + b"]}"
+
+
+class NegotiationTestCase(SimpleTestCase):
+    def test_highest_quality_wins(self):
+        self.assertEqual(
+            negotiate_encoding("gzip;q=1.0, br;q=0.5", ["br", "gzip"]),
+            "gzip",
+        )
+
+    def test_server_preference_breaks_ties(self):
+        self.assertEqual(negotiate_encoding("gzip, br", ["br", "gzip"]), "br")
+
+    def test_wildcard_and_refused_codings(self):
+        self.assertEqual(
+            negotiate_encoding("*, br;q=0", ["br", "gzip"]), "gzip"
+        )
+        self.assertIsNone(negotiate_encoding("identity", ["br", "gzip"]))
+        self.assertIsNone(negotiate_encoding("", ["br", "gzip"]))
+
+    @override_settings(
+        COMPRESSION_LEVELS={"gzip": 6},
+        COMPRESSION_ROUTE_LEVELS={
+            "/api/": {"gzip": 4},
+            "/api/a/": {"gzip": 1},
+        },
+    )
+    def test_route_levels(self):
+        self.assertEqual(compression_level("/admin/", "gzip"), 6)
+        self.assertEqual(compression_level("/api/b/", "gzip"), 4)
+        self.assertEqual(compression_level("/api/a/1/", "gzip"), 1)
+
+
+@override_settings(COMPRESSION_ENCODINGS=("br", "zstd", "gzip"))
+class CompressionMiddlewareTestCase(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, response, accept_encoding="gzip"):
+        middleware = CompressionMiddleware(lambda request: response)
+        request = self.factory.get(
+            "/api/", HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        return middleware(request)
+
+    def test_gzip(self):
+        response = self.get(
+            HttpResponse(BODY, content_type="application/json")
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_small_body_is_not_compressed(self):
+        response = self.get(
+            HttpResponse(b"{}", content_type="application/json")
+        )
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response.content, b"{}")
+
+    def test_binary_content_type_is_not_compressed(self):
+        response = self.get(HttpResponse(BODY, content_type="image/png"))
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_strong_etag_is_weakened(self):
+        response = HttpResponse(BODY, content_type="application/json")
+        response["ETag"] = '"abc"'
+        self.assertEqual(self.get(response)["ETag"], 'W/"abc"')
+
+    def test_streaming_is_compressed_chunk_by_chunk(self):
+        chunks = [b"data: %d\n\n" % i for i in range(3)]
+        response = self.get(
+            StreamingHttpResponse(
+                iter(chunks), content_type="text/event-stream"
+            )
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        decompressor = zlib.decompressobj(31)
+        streamed = iter(response.streaming_content)
+        # every chunk can be decoded as soon as it arrives
+        for chunk in chunks:
+            self.assertEqual(decompressor.decompress(next(streamed)), chunk)
+        decompressor.decompress(b"".join(streamed))
+        self.assertTrue(decompressor.eof)
+
+    @skipUnless(brotli, "brotli is not installed")
+    def test_brotli(self):
+        response = self.get(
+            HttpResponse(BODY, content_type="application/json"), "gzip, br"
+        )
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), BODY)
+
+    @skipUnless(zstandard, "zstandard is not installed")
+    def test_zstd(self):
+        response = self.get(
+            HttpResponse(BODY, content_type="application/json"), "zstd"
+        )
+        self.assertEqual(response["Content-Encoding"], "zstd")
+        self.assertEqual(
+            zstandard.ZstdDecompressor()
+            .decompressobj()
+            .decompress(response.content),
+            BODY,
+        )
+
+
+class CompressedApiTestCase(TestCase):
+    def test_vendor_list_is_compressed(self):
+        VendorFactory.create_batch(10)
+        url = reverse("api-1.0.0:vendor_list")
+        plain = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
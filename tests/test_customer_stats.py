@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from customers.api import router
+from customers.models import Customer, CustomerStatsCounter
+from customers.stats import get_customer_stats, recompute_customer_stats
+from tests.clients import AuthClient
+from tests.factories import CustomerFactory, UserFactory
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+Status = Customer.CustomerStatus
+
+
+class CustomerStatsTestCase(TestCase):
+    def setUp(self):
+        self.users = UserFactory.create_batch(5, is_active=False)
+        self.customers = [
+            CustomerFactory.create(user=user, status=Status.CREATED)
+            for user in self.users
+        ]
+
+    def test_counters_follow_customer_creation(self):
+        stats = get_customer_stats()
+        self.assertEqual(stats["total"], 5)
+        self.assertEqual(stats["statuses"][Status.CREATED], 5)
+        today = timezone.localdate().isoformat()
+        self.assertEqual(stats["signups"], {today: 5})
+        self.assertEqual(stats["users"], {"active": 0, "inactive": 5})
+
+    def test_counters_follow_status_change(self):
+        customer = Customer.objects.get(id=self.customers[0].id)
+        customer.status = Status.FROZEN
+        customer.save(update_fields=("status",))
+        stats = get_customer_stats()
+        self.assertEqual(stats["statuses"][Status.CREATED], 4)
+        self.assertEqual(stats["statuses"][Status.FROZEN], 1)
+
+    def test_counters_follow_user_activation_and_deletion(self):
+        user = User.objects.get(id=self.users[0].id)
+        user.is_active = True
+        user.save(update_fields=("is_active",))
+        User.objects.get(id=self.users[1].id).delete()
+        stats = get_customer_stats()
+        self.assertEqual(stats["users"], {"active": 1, "inactive": 3})
+        self.assertEqual(stats["total"], 4)
+
+    def test_recompute_matches_incremental_counters(self):
+        expected = get_customer_stats()
+        CustomerStatsCounter.objects.update(value=0)
+        recompute_customer_stats()
+        self.assertEqual(get_customer_stats(), expected)
+
+    def test_stats_endpoint_is_staff_only(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        user_client = AuthClient(router, generate_user_token(self.users[0]))
+        admin_client = AuthClient(router, generate_user_token(admin))
+        resp = user_client.get("/stats")
+        self.assertEqual(resp.status_code, HTTPStatus.UNAUTHORIZED)
+        resp = admin_client.get("/stats")
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertEqual(resp.json()["total"], 5)
@@ -0,0 +1,69 @@
+import datetime as dt
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils.http import http_date
+
+from customers.api import router
+from customers.models import Customer
+from tests.clients import AuthClient
+from tests.factories import CustomerFactory, UserFactory
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+
+
+class CustomerDeltaSyncTestCase(TestCase):
+    def setUp(self):
+        self.customers = [
+            CustomerFactory.create(
+                user=user, status=Customer.CustomerStatus.CREATED
+            )
+            for user in UserFactory.create_batch(3)
+        ]
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        self.client = AuthClient(router, generate_user_token(self.admin))
+        self.customer = self.customers[0]
+
+    def test_detail_sends_last_modified(self):
+        resp = self.client.get(f"/{self.customer.id}/")
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            resp["Last-Modified"],
+            http_date(self.customer.updated_at.timestamp()),
+        )
+
+    def test_detail_not_modified_since_last_fetch(self):
+        resp = self.client.get(f"/{self.customer.id}/")
+        resp = self.client.get(
+            f"/{self.customer.id}/",
+            META={"HTTP_IF_MODIFIED_SINCE": resp["Last-Modified"]},
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_detail_modified_after_given_date(self):
+        earlier = self.customer.updated_at - dt.timedelta(minutes=1)
+        resp = self.client.get(
+            f"/{self.customer.id}/",
+            META={"HTTP_IF_MODIFIED_SINCE": http_date(earlier.timestamp())},
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+
+    def test_list_filters_by_updated_since(self):
+        since = dt.datetime.now(dt.timezone.utc)
+        Customer.objects.filter(id=self.customer.id).update(
+            status=Customer.CustomerStatus.FROZEN
+        )
+        resp = self.client.get(
+            f"/?updated_since={since:%Y-%m-%dT%H:%M:%S.%fZ}"
+        )
+        ids = [item["id"] for item in resp.json()["items"]]
+        self.assertEqual(ids, [self.customer.id])
+
+    def test_archiving_bumps_updated_at(self):
+        self.client.delete(f"/{self.customer.id}/delete")
+        customer = Customer.objects.get(id=self.customer.id)
+        self.assertGreater(customer.updated_at, self.customer.updated_at)
@@ -0,0 +1,132 @@
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from customers.models import Customer
+from db.models import ChangeLogEntry
+from tests.factories import VendorFactory
+from vendors.models import Vendor
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+
+
+class DirtyFieldsMixinTestCase(TestCase):
+    def setUp(self):
+        VendorFactory.create(name="Vendor", slug="custom-slug")
+        self.vendor = Vendor.objects.get()
+
+    def test_unchanged_instance_is_not_saved(self):
+        entries = ChangeLogEntry.objects.count()
+        with self.assertNumQueries(0):
+            self.vendor.save()
+        self.assertEqual(ChangeLogEntry.objects.count(), entries)
+
+    def test_only_changed_fields_are_written(self):
+        self.vendor.description = "new"
+        self.assertEqual(self.vendor.get_dirty_fields(), ["description"])
+        with CaptureQueriesContext(connection) as queries:
+            self.vendor.save()
+        update = next(
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("UPDATE")
+        )
+        self.assertIn('"description"', update)
+        self.assertNotIn('"name"', update)
+        self.assertEqual(self.vendor.get_dirty_fields(), [])
+
+    def test_saved_value_set_back_is_clean(self):
+        self.vendor.name = "Other"
+        self.vendor.name = "Vendor"
+        self.assertEqual(self.vendor.get_dirty_fields(), [])
+
+    def test_refresh_from_db_resets_snapshot(self):
+        Vendor.objects.filter(id=self.vendor.id).update(description="db")
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.get_dirty_fields(), [])
+        self.assertEqual(self.vendor.get_loaded_value("description"), "db")
+
+    def test_deferred_fields_are_not_dirty(self):
+        vendor = Vendor.objects.only("id", "name").get()
+        self.assertEqual(vendor.get_dirty_fields(), [])
+        vendor.description = "new"
+        self.assertEqual(vendor.get_dirty_fields(), ["description"])
+
+    def test_customer_updated_at_is_kept_when_nothing_changed(self):
+        user = User.objects.create_user(
+            username="user", email="user@hello.py", create_customer=True
+        )
+        customer = Customer.objects.get(user=user)
+        updated_at = customer.updated_at
+        customer.save()
+        customer.status = Customer.CustomerStatus.FROZEN
+        customer.save()
+        customer.refresh_from_db()
+        self.assertEqual(customer.status, Customer.CustomerStatus.FROZEN)
+        self.assertGreater(customer.updated_at, updated_at)
+
+
+class UpdateViewsTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {generate_user_token(self.admin)}"
+        }
+
+    def put(self, url: str, payload: dict):
+        return self.client.put(
+            url,
+            data=json.dumps(payload),
+            content_type="application/json",
+            **self.auth,
+        )
+
+    def test_vendor_slug_is_kept_if_name_is_unchanged(self):
+        vendor = VendorFactory.create(name="Vendor", slug="custom-slug")
+        resp = self.put(
+            f"/api/vendors/{vendor.slug}/update",
+            {"name": "Vendor", "description": "new"},
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertEqual(resp.json()["slug"], "custom-slug")
+        self.assertEqual(
+            ChangeLogEntry.objects.filter(model="vendors.vendor")
+            .values_list("changed_fields", flat=True)
+            .last(),
+            ["description"],
+        )
+
+    def test_user_update_leaves_unset_fields_alone(self):
+        user = User.objects.create_user(
+            username="user", email="user@hello.py", first_name="Old"
+        )
+        resp = self.put(
+            reverse("api-1.0.0:user_update", args=(user.id,)),
+            {"last_name": "New"},
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        user.refresh_from_db()
+        self.assertEqual(
+            (user.email, user.first_name, user.last_name),
+            ("user@hello.py", "Old", "New"),
+        )
+
+    def test_customer_update_without_changes_writes_nothing(self):
+        user = User.objects.create_user(
+            username="user", email="user@hello.py", create_customer=True
+        )
+        entries = ChangeLogEntry.objects.count()
+        resp = self.put(
+            reverse("api-1.0.0:customer_update", args=(user.customer.id,)),
+            {"email": "user@hello.py"},
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertEqual(ChangeLogEntry.objects.count(), entries)
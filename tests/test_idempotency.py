@@ -0,0 +1,98 @@
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from customers.models import Customer
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+
+
+class IdempotencyTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("api-1.0.0:user_signup")
+        self.payload = {
+            "username": "new_user",
+            "email": "new_user@hello.py",
+            "password": "hello",
+        }
+
+    def signup(self, payload: dict, **headers):
+        return self.client.post(
+            self.url,
+            data=json.dumps(payload),
+            content_type="application/json",
+            **headers,
+        )
+
+    def test_retry_with_same_key_is_replayed(self):
+        first = self.signup(self.payload, HTTP_IDEMPOTENCY_KEY="key-1")
+        retry = self.signup(self.payload, HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(first.status_code, HTTPStatus.OK)
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(User.objects.filter(username="new_user").count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_same_key_with_other_payload_returns_422(self):
+        self.signup(self.payload, HTTP_IDEMPOTENCY_KEY="key-2")
+        other_payload = {**self.payload, "username": "other_user"}
+        resp = self.signup(other_payload, HTTP_IDEMPOTENCY_KEY="key-2")
+        self.assertEqual(resp.status_code, HTTPStatus.UNPROCESSABLE_ENTITY)
+        self.assertFalse(User.objects.filter(username="other_user").exists())
+
+    def test_requests_without_key_are_not_replayed(self):
+        self.signup(self.payload)
+        resp = self.signup(self.payload)
+        self.assertEqual(resp.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertNotIn("Idempotent-Replayed", resp)
+
+    def test_replay_keeps_response_headers(self):
+        User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        customer = Customer.objects.create(
+            user=User.objects.create_user(
+                username="user1", email="user1@hello.py"
+            )
+        )
+        token = generate_user_token(User.objects.get(username="admin"))
+        url = reverse("api-1.0.0:customer_update", args=[customer.id])
+        headers = {
+            "HTTP_AUTHORIZATION": f"Bearer {token}",
+            "HTTP_IDEMPOTENCY_KEY": "key-3",
+        }
+        payload = json.dumps({"first_name": "New"})
+        first = self.client.put(
+            url, payload, content_type="application/json", **headers
+        )
+        retry = self.client.put(
+            url, payload, content_type="application/json", **headers
+        )
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry["ETag"], first["ETag"])
+        self.assertEqual(retry["Content-Type"], first["Content-Type"])
+        self.assertIn("X-Request-ID", retry)
+
+    def test_tokens_are_not_stored(self):
+        User.objects.create_user(
+            username="user1", email="user1@hello.py", password="hello"
+        )
+        url = reverse("api-1.0.0:token_create")
+        payload = json.dumps({"username": "user1", "password": "hello"})
+        for _ in range(2):
+            resp = self.client.post(
+                url,
+                payload,
+                content_type="application/json",
+                HTTP_IDEMPOTENCY_KEY="key-4",
+            )
+            self.assertEqual(resp.status_code, HTTPStatus.OK)
+            self.assertNotIn("Idempotent-Replayed", resp)
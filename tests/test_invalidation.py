@@ -0,0 +1,176 @@
+import datetime as dt
+import multiprocessing
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from db import invalidation
+from db.invalidation import DatabaseTransport, FileTransport
+from db.models import InvalidationEvent
+from tests.factories import VendorFactory
+from vendors.models import Vendor
+
+fork = multiprocessing.get_context("fork")
+
+
+def publish_from_child(path, messages, max_bytes=None):
+    """Publish `messages` from another process."""
+    process = fork.Process(
+        target=lambda: FileTransport(
+            f"child-{os.getpid()}", path, max_bytes
+        ).publish(messages)
+    )
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+
+
+class FileTransportTestCase(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "invalidation.log")
+        self.transport = FileTransport("parent", self.path)
+        self.assertEqual(self.transport.poll(), [])
+
+    def test_messages_of_other_processes(self):
+        messages = [("vendors.vendor", "1"), ("counts", None)]
+        publish_from_child(self.path, messages)
+        publish_from_child(self.path, [("customers.customer", "2")])
+        self.assertEqual(
+            self.transport.poll(), [*messages, ("customers.customer", "2")]
+        )
+        self.assertEqual(self.transport.poll(), [])
+
+    def test_own_messages_are_skipped(self):
+        self.transport.publish([("vendors.vendor", "1")])
+        self.assertEqual(self.transport.poll(), [])
+
+    def test_half_written_line_waits(self):
+        with open(self.path, "ab") as f:
+            f.write(b'["child", "vendors.vendor", "1"]\n["child", "ven')
+        self.assertEqual(self.transport.poll(), [("vendors.vendor", "1")])
+        with open(self.path, "ab") as f:
+            f.write(b'dors.vendor", "2"]\n')
+        self.assertEqual(self.transport.poll(), [("vendors.vendor", "2")])
+
+    def test_rotation_reports_lost_messages(self):
+        publish_from_child(self.path, [("vendors.vendor", "1")])
+        publish_from_child(self.path, [("vendors.vendor", "2")] * 5, 100)
+        self.assertIsNone(self.transport.poll())
+        publish_from_child(self.path, [("vendors.vendor", "3")], 100)
+        self.assertEqual(self.transport.poll(), [("vendors.vendor", "3")])
+
+
+class DatabaseTransportTestCase(TestCase):
+    def setUp(self):
+        self.a = DatabaseTransport("a")
+        self.b = DatabaseTransport("b")
+        self.assertEqual(self.a.poll(), [])
+
+    def test_messages_of_other_nodes(self):
+        self.b.publish([("vendors.vendor", "1"), ("counts", None)])
+        self.a.publish([("vendors.vendor", "2")])
+        self.assertEqual(
+            self.a.poll(), [("vendors.vendor", "1"), ("counts", None)]
+        )
+        self.assertEqual(self.a.poll(), [])
+
+    def test_late_commits_are_read(self):
+        self.b.publish([("vendors.vendor", str(i)) for i in range(1, 4)])
+        late = InvalidationEvent.objects.get(key="2")
+        late.delete()  # stands for an event not committed yet
+        self.assertEqual(
+            self.a.poll(), [("vendors.vendor", "1"), ("vendors.vendor", "3")]
+        )
+        late.save()
+        self.assertEqual(self.a.poll(), [("vendors.vendor", "2")])
+        self.assertEqual(self.a.poll(), [])
+
+    def test_settled_events_are_forgotten(self):
+        self.b.publish([("vendors.vendor", "1")])
+        InvalidationEvent.objects.update(
+            created_at=timezone.now() - dt.timedelta(minutes=1)
+        )
+        self.a.poll()
+        self.assertEqual(self.a._seen, set())
+        self.assertEqual(self.a.poll(), [])
+
+    @override_settings(INVALIDATION_RETENTION=60)
+    def test_long_pause_reports_lost_messages(self):
+        self.a._last_poll -= dt.timedelta(seconds=61)
+        self.assertIsNone(self.a.poll())
+
+    @override_settings(INVALIDATION_RETENTION=60)
+    def test_prune(self):
+        self.b.publish([("vendors.vendor", "1"), ("vendors.vendor", "2")])
+        InvalidationEvent.objects.filter(key="1").update(
+            created_at=timezone.now() - dt.timedelta(seconds=61)
+        )
+        self.assertEqual(invalidation.prune_events(), 1)
+
+
+class IncompleteTransport(invalidation.Transport):
+    def publish(self, messages):
+        pass
+
+
+class InvalidationBusTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "invalidation.log")
+        overrides = override_settings(
+            INVALIDATION_TRANSPORT="db.invalidation.FileTransport",
+            INVALIDATION_FILE=self.path,
+            INVALIDATION_POLL_INTERVAL=0,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.dict(invalidation._subscribers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.keys = []
+        invalidation.subscribe("vendors.vendor", self.keys.append)
+        invalidation.poll(force=True)
+
+    def test_incomplete_transport_fails_when_created(self):
+        with override_settings(
+            INVALIDATION_TRANSPORT="tests.test_invalidation.IncompleteTransport"
+        ), self.assertRaises(TypeError):
+            invalidation.get_transport()
+
+    def test_model_signals_publish_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor = VendorFactory.create()
+            self.assertEqual(self.keys, [str(vendor.pk)])
+        self.assertGreater(os.path.getsize(self.path), 0)
+
+        # the other processes get it on their next request
+        self.keys.clear()
+        publish_from_child(self.path, [("vendors.vendor", str(vendor.pk))])
+        self.client.get(reverse("api-1.0.0:vendor_list"))
+        self.assertEqual(self.keys, [str(vendor.pk)])
+
+    def test_counts_of_other_processes_are_invalidated(self):
+        VendorFactory.create_batch(2)
+        url = reverse("api-1.0.0:vendor_list")
+        self.assertEqual(self.client.get(url).json()["count"], 2)
+        Vendor.objects.bulk_create([Vendor(name="Bulk", slug="bulk")])
+        self.assertEqual(self.client.get(url).json()["count"], 2)
+
+        publish_from_child(self.path, [("counts", Vendor._meta.db_table)])
+        self.assertEqual(self.client.get(url).json()["count"], 3)
+
+    def test_lost_messages_flush_subscribers(self):
+        publish_from_child(self.path, [("vendors.vendor", "1")])
+        os.replace(self.path, f"{self.path}.1")
+        publish_from_child(self.path, [("vendors.vendor", "2")])
+        invalidation.poll(force=True)
+        self.assertEqual(self.keys, [None])
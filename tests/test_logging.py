@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from eshop_api import log
+from eshop_api.log import (
+    AsyncQueueHandler,
+    DebugSamplingFilter,
+    RequestContextFilter,
+)
+from eshop_api.metrics import metrics
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(RequestContextFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class Changing:
+    def __init__(self):
+        self.value = "before"
+
+    def __str__(self):
+        return self.value
+
+
+class AsyncQueueHandlerTestCase(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "app.log")
+        self.handler = AsyncQueueHandler(self.path)
+        self.handler.addFilter(RequestContextFilter())
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger("tests.logging")
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        self.addCleanup(setattr, self.logger, "propagate", True)
+
+    def read(self):
+        self.handler.close()
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_json_lines(self):
+        token = log.request_id_var.set("abc")
+        self.addCleanup(log.request_id_var.reset, token)
+        self.logger.warning("Hello %s", "world", extra={"user_id": 1})
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            self.logger.exception("Failed")
+        first, second = self.read()
+        self.assertEqual(first["message"], "Hello world")
+        self.assertEqual(first["level"], "WARNING")
+        self.assertEqual(first["request_id"], "abc")
+        self.assertEqual(first["user_id"], 1)
+        self.assertIn("ZeroDivisionError", second["exception"])
+
+    def test_objects_are_formatted_when_logged(self):
+        changing = Changing()
+        with mock.patch.object(self.handler, "_start"):  # writer paused
+            self.logger.warning("Value %s", changing)
+        changing.value = "after"
+        self.handler._start()
+        self.assertEqual(self.read()[0]["message"], "Value before")
+
+    def test_plain_args_stay_lazy(self):
+        record = logging.makeLogRecord({"msg": "Id %s", "args": (1,)})
+        record = self.handler.prepare(record)
+        self.assertEqual((record.msg, record.args), ("Id %s", (1,)))
+
+    def test_full_queue_drops_records(self):
+        self.handler.queue.maxsize = 1
+        metrics.reset()
+        with mock.patch.object(self.handler, "_start"):  # writer paused
+            self.handler._pid = os.getpid()
+            self.logger.warning("kept")
+            self.logger.warning("dropped")
+        self.assertEqual(metrics.get("logging.dropped"), 1)
+
+    def test_queued_records_are_written_at_exit(self):
+        script = f"""if True:
+            import logging, time
+            from eshop_api.log import AsyncQueueHandler
+
+            handler = AsyncQueueHandler({self.path!r}, maxsize=1)
+            emit = handler.target.emit
+            handler.target.emit = lambda r: (time.sleep(0.2), emit(r))
+            logger = logging.getLogger("exit")
+            logger.addHandler(handler)
+            logger.warning("first")
+            time.sleep(0.05)
+            logger.warning("second")  # the queue is full now
+        """
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        self.assertEqual(result.stderr, "")
+        self.assertEqual(
+            [record["message"] for record in self.read()],
+            ["first", "second"],
+        )
+
+
+class DebugSamplingFilterTestCase(SimpleTestCase):
+    def record(self, level, request_id=None):
+        record = logging.makeLogRecord({"levelno": level})
+        record.request_id = request_id
+        return record
+
+    def test_sampled_per_request(self):
+        sampling = DebugSamplingFilter(0.5)
+        self.assertTrue(sampling.filter(self.record(logging.INFO, "a")))
+        kept = [
+            sampling.filter(self.record(logging.DEBUG, str(i)))
+            for i in range(1000)
+        ]
+        self.assertTrue(300 < sum(kept) < 700)
+        for i in range(10):
+            self.assertEqual(
+                sampling.filter(self.record(logging.DEBUG, str(i))), kept[i]
+            )
+
+
+class RequestIdMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.handler = ListHandler()
+        logger = logging.getLogger("django.request")
+        logger.addHandler(self.handler)
+        self.addCleanup(logger.removeHandler, self.handler)
+
+    def test_request_id_is_echoed_and_logged(self):
+        resp = self.client.get(
+            reverse("api-1.0.0:vendor_detail", args=["missing"]),
+            HTTP_X_REQUEST_ID="req-1",
+            HTTP_TRACEPARENT="00-" + "a" * 32 + "-" + "b" * 16 + "-01",
+        )
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp["X-Request-ID"], "req-1")
+        (record,) = self.handler.records
+        self.assertEqual(record.request_id, "req-1")
+        self.assertEqual(record.trace_id, "a" * 32)
+        self.assertIsNone(log.request_id_var.get())
+
+    def test_invalid_request_id_is_replaced(self):
+        resp = self.client.get(
+            reverse("api-1.0.0:vendor_list"), HTTP_X_REQUEST_ID="a b\n"
+        )
+        self.assertRegex(resp["X-Request-ID"], r"^[\da-f]{32}$")
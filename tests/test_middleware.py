@@ -0,0 +1,28 @@
+from http import HTTPStatus
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from tests.factories import VendorFactory
+
+
+class PathMiddlewareDispatcherTestCase(TestCase):
+    def setUp(self):
+        self.vendor = VendorFactory.create()
+
+    def test_api_requests_skip_site_middleware(self):
+        resp = self.client.get(reverse("api-1.0.0:vendor_list"))
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertNotIn("X-Frame-Options", resp)
+        self.assertNotIn("Cookie", resp.get("Vary", ""))
+
+    def test_admin_requests_run_site_middleware(self):
+        resp = self.client.get(reverse("admin:login"))
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertEqual(resp["X-Frame-Options"], "DENY")
+        self.assertIn("csrftoken", resp.cookies)
+
+    def test_admin_keeps_csrf_protection(self):
+        client = Client(enforce_csrf_checks=True)
+        resp = client.post(reverse("admin:login"), {"username": "admin"})
+        self.assertEqual(resp.status_code, HTTPStatus.FORBIDDEN)
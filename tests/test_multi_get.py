@@ -0,0 +1,82 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from customers.models import Customer
+from tests.factories import VendorFactory
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+
+
+class MultiGetTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        self.users = [
+            User.objects.create_user(
+                username=f"user{i}",
+                email=f"user{i}@hello.py",
+                create_customer=True,
+            )
+            for i in range(3)
+        ]
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {generate_user_token(self.admin)}"
+        }
+
+    def get(self, url_name: str, **params):
+        return self.client.get(
+            reverse(f"api-1.0.0:{url_name}"), params, **self.auth
+        )
+
+    def test_users_in_request_order_with_missing(self):
+        ids = [self.users[2].id, 0, self.users[0].id, self.users[2].id]
+        # token user lookup + one IN query
+        with self.assertNumQueries(2):
+            resp = self.get("user_many", ids=",".join(map(str, ids)))
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        data = resp.json()
+        self.assertEqual(
+            [item["id"] for item in data["items"]],
+            [self.users[2].id, self.users[0].id],
+        )
+        self.assertEqual(data["missing"], [0])
+
+    def test_customers_with_users_in_one_query(self):
+        customers = list(Customer.objects.order_by("-id"))
+        with self.assertNumQueries(2):
+            resp = self.get(
+                "customer_many",
+                ids=",".join(str(customer.id) for customer in customers),
+            )
+        self.assertEqual(
+            [item["username"] for item in resp.json()["items"]],
+            [customer.user.username for customer in customers],
+        )
+
+    def test_vendors_by_slugs(self):
+        vendors = VendorFactory.create_batch(2)
+        resp = self.client.get(
+            reverse("api-1.0.0:vendor_many"),
+            {"slugs": f"{vendors[1].slug},nope,{vendors[0].slug}"},
+        )
+        data = resp.json()
+        self.assertEqual(
+            [item["slug"] for item in data["items"]],
+            [vendors[1].slug, vendors[0].slug],
+        )
+        self.assertEqual(data["missing"], ["nope"])
+
+    def test_invalid_ids(self):
+        resp = self.get("user_many", ids="1,two")
+        self.assertEqual(resp.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(resp.json(), {"error_message": "invalid value: two"})
+
+    @override_settings(MULTI_GET_MAX_SIZE=2)
+    def test_max_size(self):
+        resp = self.get("user_many", ids="1,2,3")
+        self.assertEqual(resp.status_code, HTTPStatus.BAD_REQUEST)
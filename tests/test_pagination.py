@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from db.pagination import count_queryset, invalidate_counts
+from tests.factories import VendorFactory
+from vendors.models import Vendor
+
+
+class CountQuerysetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        VendorFactory.create_batch(3)
+
+    def test_count_is_cached(self):
+        self.assertEqual(count_queryset(Vendor.objects.all()), (3, True))
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                count_queryset(Vendor.objects.order_by("name")), (3, True)
+            )
+
+    def test_replicas_share_cached_counts(self):
+        count_queryset(Vendor.objects.all())
+        # a miss would query the (not configured) replica
+        self.assertEqual(
+            count_queryset(Vendor.objects.using("replica_9")), (3, True)
+        )
+
+    def test_filters_are_counted_separately(self):
+        count_queryset(Vendor.objects.all())
+        vendors = Vendor.objects.filter(name="Nope")
+        self.assertEqual(count_queryset(vendors), (0, True))
+
+    def test_insert_and_delete_invalidate(self):
+        count_queryset(Vendor.objects.all())
+        vendor = VendorFactory.create()
+        self.assertEqual(count_queryset(Vendor.objects.all()), (4, True))
+        vendor.delete()
+        self.assertEqual(count_queryset(Vendor.objects.all()), (3, True))
+
+    def test_bulk_insert_needs_explicit_invalidation(self):
+        count_queryset(Vendor.objects.all())
+        Vendor.objects.bulk_create([Vendor(name="Bulk", slug="bulk")])
+        self.assertEqual(count_queryset(Vendor.objects.all()), (3, True))
+        invalidate_counts(Vendor)
+        self.assertEqual(count_queryset(Vendor.objects.all()), (4, True))
+
+    @override_settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=2)
+    def test_large_tables_use_planner_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Vendor._meta.db_table}")
+        self.assertEqual(count_queryset(Vendor.objects.all()), (3, False))
+        # no estimate for filtered queries on SQLite
+        vendors = Vendor.objects.filter(name__startswith="Vendor")
+        self.assertEqual(count_queryset(vendors), (3, True))
+
+    def test_list_says_whether_count_is_exact(self):
+        resp = self.client.get(reverse("api-1.0.0:vendor_list"))
+        self.assertEqual(resp.json()["count"], 3)
+        self.assertIs(resp.json()["count_exact"], True)
@@ -0,0 +1,138 @@
+import datetime as dt
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from customers.archive import archive_customers
+from customers.models import ArchivedCustomer, Customer
+from customers.stats import get_customer_stats
+from db.models import ChangeLogEntry, PurgeJob
+from db.purge import cascade_steps, run_pending_purge_jobs, submit_purge_job
+from x_auth.authentication import generate_user_token
+from x_users.models import ArchivedUser
+
+User = get_user_model()
+
+
+@override_settings(PURGE_IN_PROCESS=False)
+class PurgeTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        group = Group.objects.create(name="group")
+        self.users = []
+        for i in range(5):
+            user = User.objects.create_user(
+                username=f"user{i}",
+                email=f"user{i}@hello.py",
+                create_customer=True,
+            )
+            user.groups.add(group)
+            self.users.append(user)
+        self.ids = [user.id for user in self.users[:4]]
+
+    def test_cascade_order(self):
+        steps = cascade_steps(User)
+        models = [model for model, *_ in steps]
+        self.assertEqual(models[-1], User)
+        self.assertLess(models.index(Customer), models.index(User))
+        self.assertIn((Customer, "user__pk", None), steps)
+
+    @override_settings(PURGE_CHUNK_SIZE=3)
+    def test_users_and_cascaded_rows_are_purged_in_chunks(self):
+        job = submit_purge_job(User, self.ids)
+        self.assertEqual(run_pending_purge_jobs(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PurgeJob.Status.DONE)
+        self.assertEqual(job.progress["customers.customer"], 4)
+        self.assertEqual(job.progress["x_users.user"], 4)
+        self.assertEqual(job.progress["x_users.user_groups"], 4)
+        self.assertEqual(
+            list(User.objects.values_list("username", flat=True)),
+            ["admin", "user4"],
+        )
+        self.assertEqual(Customer.objects.count(), 1)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(
+            ChangeLogEntry.objects.filter(
+                model="customers.customer",
+                action=ChangeLogEntry.Action.DELETE,
+            ).count(),
+            4,
+        )
+        stats = get_customer_stats()
+        self.assertEqual(stats["total"], 1)
+        self.assertEqual(stats["users"]["inactive"], 2)  # admin, user4
+
+    def test_jobs_run_once(self):
+        submit_purge_job(User, self.ids)
+        self.assertEqual(run_pending_purge_jobs(), 1)
+        self.assertEqual(run_pending_purge_jobs(), 0)
+
+    def test_abandoned_jobs_are_resumed(self):
+        job = submit_purge_job(User, self.ids)
+        PurgeJob.objects.filter(pk=job.pk).update(
+            status=PurgeJob.Status.RUNNING, started_at=timezone.now()
+        )
+        self.assertEqual(run_pending_purge_jobs(), 0)  # still leased
+
+        PurgeJob.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - dt.timedelta(hours=2)
+        )
+        with self.assertLogs("db.purge", "WARNING"):
+            self.assertEqual(run_pending_purge_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PurgeJob.Status.DONE)
+        self.assertFalse(User.objects.filter(id__in=self.ids).exists())
+
+    def test_archived_rows_are_purged(self):
+        Customer.objects.filter(user_id__in=self.ids).update(
+            status=Customer.CustomerStatus.ARCHIVED
+        )
+        archive_customers(include_users=True)
+        submit_purge_job(User, self.ids)
+        run_pending_purge_jobs()
+        self.assertFalse(ArchivedCustomer.objects.exists())
+        self.assertFalse(ArchivedUser.objects.exists())
+
+    def test_api(self):
+        auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {generate_user_token(self.admin)}"
+        }
+        resp = self.client.post(
+            reverse("api-1.0.0:user_purge"),
+            data=json.dumps({"ids": self.ids + self.ids}),
+            content_type="application/json",
+            **auth,
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.ACCEPTED)
+        job = resp.json()
+        self.assertEqual(job["status"], "pending")
+        self.assertEqual(job["object_count"], 4)
+
+        run_pending_purge_jobs()
+        url = reverse("api-1.0.0:user_purge_detail", args=(job["id"],))
+        resp = self.client.get(url, **auth)
+        self.assertEqual(resp.json()["status"], "done")
+        self.assertEqual(resp.json()["progress"]["x_users.user"], 4)
+
+    @override_settings(PURGE_MAX_IDS=3)
+    def test_api_limits_job_size(self):
+        auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {generate_user_token(self.admin)}"
+        }
+        resp = self.client.post(
+            reverse("api-1.0.0:user_purge"),
+            data=json.dumps({"ids": self.ids}),
+            content_type="application/json",
+            **auth,
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertFalse(PurgeJob.objects.exists())
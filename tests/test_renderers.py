@@ -0,0 +1,115 @@
+import datetime as dt
+import json
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from customers.models import Customer
+from eshop_api.renderers import (
+    FastParser,
+    FastRenderer,
+    dumps,
+    msgpack,
+    stream_json_array,
+)
+from tests.factories import VendorFactory
+
+
+class FastRendererTestCase(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.renderer = FastRenderer()
+
+    def render(self, data, **headers):
+        request = self.factory.get("/", **headers)
+        return self.renderer.render(request, data, response_status=200)
+
+    def test_encodes_non_json_types(self):
+        data = {
+            "created_at": dt.datetime(
+                2023, 1, 2, 3, 4, 5, tzinfo=dt.timezone.utc
+            ),
+            "price": Decimal("9.90"),
+            "status": Customer.CustomerStatus.FROZEN,
+        }
+        self.assertEqual(
+            json.loads(self.render(data)),
+            {
+                "created_at": "2023-01-02T03:04:05Z",
+                "price": "9.90",
+                "status": "frozen",
+            },
+        )
+
+    def test_dumps_non_str_keys(self):
+        self.assertEqual(json.loads(dumps({1: "a"})), {"1": "a"})
+
+    def test_stream_json_array(self):
+        rows = ({"id": i} for i in range(5))
+        chunks = list(stream_json_array(rows, chunk_size=2))
+        self.assertEqual(len(chunks), 5)  # [, 3 chunks of rows, ]
+        self.assertEqual(
+            json.loads(b"".join(chunks)), [{"id": i} for i in range(5)]
+        )
+        self.assertEqual(b"".join(stream_json_array([])), b"[]")
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_is_negotiated(self):
+        rendered = self.render(
+            {"a": [1, 2]}, HTTP_ACCEPT="application/msgpack"
+        )
+        self.assertEqual(msgpack.unpackb(rendered), {"a": [1, 2]})
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_json_preferred_by_quality(self):
+        request = self.factory.get(
+            "/",
+            HTTP_ACCEPT="application/msgpack;q=0.5, application/json",
+        )
+        self.assertEqual(
+            self.renderer.media_type_for(request), "application/json"
+        )
+
+
+class FastParserTestCase(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.parser = FastParser()
+
+    def test_parse_json(self):
+        request = self.factory.post(
+            "/", data='{"a": 1}', content_type="application/json"
+        )
+        self.assertEqual(self.parser.parse_body(request), {"a": 1})
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_parse_msgpack(self):
+        request = self.factory.post(
+            "/",
+            data=msgpack.packb({"a": 1}),
+            content_type="application/msgpack",
+        )
+        self.assertEqual(self.parser.parse_body(request), {"a": 1})
+
+
+class ContentNegotiationTestCase(TestCase):
+    def setUp(self):
+        self.vendor = VendorFactory.create()
+        self.url = reverse("api-1.0.0:vendor_list")
+
+    def test_json_by_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response["Content-Type"], "application/json; charset=utf-8"
+        )
+        self.assertEqual(response.json()["items"][0]["slug"], self.vendor.slug)
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_response(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertIn("Accept", response["Vary"])
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data["items"][0]["slug"], self.vendor.slug)
@@ -0,0 +1,78 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from db.checks import check_replica_pin_cache
+from db.routers import (
+    PrimaryReplicaRouter,
+    is_pinned_to_primary,
+    pin_to_primary,
+)
+from eshop_api.metrics import metrics
+from eshop_api.middleware import ReplicaStickinessMiddleware
+from x_users.models import User
+
+
+@override_settings(REPLICA_DATABASES=["replica_0"], REPLICA_STICKY_SECONDS=5)
+class PrimaryReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(User), "replica_0")
+        self.assertEqual(metrics.get("db.replica.selected.replica_0"), 1)
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(User), "default")
+
+    def test_pinned_reads_go_to_primary(self):
+        with pin_to_primary():
+            self.assertEqual(self.router.db_for_read(User), "default")
+        self.assertEqual(metrics.get("db.replica.fallback.primary"), 1)
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_leaves_routing_to_default(self):
+        self.assertIsNone(self.router.db_for_read(User))
+
+
+@override_settings(REPLICA_DATABASES=["replica_0"], REPLICA_STICKY_SECONDS=5)
+class ReplicaStickinessMiddlewareTestCase(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.factory = RequestFactory()
+        self.pinned = []
+
+        def get_response(request):
+            self.pinned.append(is_pinned_to_primary())
+            return HttpResponse()
+
+        self.middleware = ReplicaStickinessMiddleware(get_response)
+
+    def test_read_without_prior_write_is_not_pinned(self):
+        self.middleware(self.factory.get("/", HTTP_AUTHORIZATION="Bearer a"))
+        self.assertEqual(self.pinned, [False])
+
+    def test_write_pins_following_reads_of_same_client(self):
+        self.middleware(self.factory.post("/", HTTP_AUTHORIZATION="Bearer b"))
+        self.middleware(self.factory.get("/", HTTP_AUTHORIZATION="Bearer b"))
+        self.middleware(self.factory.get("/", HTTP_AUTHORIZATION="Bearer c"))
+        self.assertEqual(self.pinned, [True, True, False])
+        self.assertEqual(metrics.get("db.replica.fallback.sticky"), 1)
+
+
+class ReplicaPinCacheCheckTestCase(SimpleTestCase):
+    @override_settings(REPLICA_DATABASES=["replica_0"])
+    def test_warns_about_per_process_cache(self):
+        (warning,) = check_replica_pin_cache(None)
+        self.assertEqual(warning.id, "db.W001")
+        shared = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache"
+            }
+        }
+        with self.settings(CACHES=shared):
+            self.assertEqual(check_replica_pin_cache(None), [])
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_no_warning(self):
+        self.assertEqual(check_replica_pin_cache(None), [])
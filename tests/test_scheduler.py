@@ -0,0 +1,154 @@
+import datetime as dt
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from db import scheduler
+from db.maintenance import optimize_databases
+from db.models import ScheduledJobState
+from db.scheduler import CronSpec, ScheduledJob
+from eshop_api.metrics import metrics
+
+
+class CronSpecTestCase(SimpleTestCase):
+    def next_after(self, spec, moment):
+        return CronSpec(spec).next_after(dt.datetime(*moment))
+
+    def test_next_after(self):
+        cases = [
+            ("* * * * *", (2024, 1, 1, 10, 0, 30), (2024, 1, 1, 10, 1)),
+            ("*/15 * * * *", (2024, 1, 1, 10, 7), (2024, 1, 1, 10, 15)),
+            ("5/15 * * * *", (2024, 1, 1, 10, 51), (2024, 1, 1, 11, 5)),
+            ("30 3 * * *", (2024, 1, 1, 3, 30), (2024, 1, 2, 3, 30)),
+            ("0 9-17/4 * * *", (2024, 1, 1, 14, 0), (2024, 1, 1, 17, 0)),
+            ("0 0 1 * *", (2024, 1, 31, 12, 0), (2024, 2, 1, 0, 0)),
+            ("0 4 * * 0", (2024, 1, 1, 0, 0), (2024, 1, 7, 4, 0)),  # Sunday
+            ("0 4 * * 7", (2024, 1, 1, 0, 0), (2024, 1, 7, 4, 0)),
+            ("0 0 29 2 *", (2024, 3, 1, 0, 0), (2028, 2, 29, 0, 0)),
+            # day of month or day of week
+            ("0 0 15 * 1", (2024, 1, 2, 0, 0), (2024, 1, 8, 0, 0)),
+            ("0 0 1,15 * *", (2024, 1, 2, 0, 0), (2024, 1, 15, 0, 0)),
+        ]
+        for spec, moment, expected in cases:
+            with self.subTest(spec=spec, moment=moment):
+                self.assertEqual(
+                    self.next_after(spec, moment), dt.datetime(*expected)
+                )
+
+    def test_invalid_specs(self):
+        for spec in ("* * * *", "60 * * * *", "* 24 * * *", "5-1 * * * *"):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                CronSpec(spec)
+
+    def test_jitter(self):
+        job = ScheduledJob("job", "0 * * * *", print, jitter=60)
+        moment = dt.datetime(2024, 1, 1, 10, 30)
+        for _ in range(20):
+            delay = job.next_run_after(moment) - dt.datetime(2024, 1, 1, 11)
+            self.assertTrue(
+                dt.timedelta(0) <= delay <= dt.timedelta(seconds=60)
+            )
+
+
+@override_settings(SCHEDULER_JITTER=0, SCHEDULER_LEASE=600)
+class SchedulerTestCase(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.app_jobs = dict(scheduler.jobs)
+        patcher = mock.patch.dict(scheduler.jobs, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+        self.now = timezone.now().replace(second=0, microsecond=0)
+
+    def register(self, name="job", func=None, spec="* * * * *", **kwargs):
+        scheduler.register(
+            name, spec, func or (lambda: self.calls.append(name)), **kwargs
+        )
+
+    def test_app_jobs_are_registered(self):
+        self.assertLessEqual(
+            {
+                "archive_customers",
+                "optimize_databases",
+                "prune_signups",
+                "recompute_customer_stats",
+                "run_purge_jobs",
+            },
+            set(self.app_jobs),
+        )
+        # warms the count cache of other processes, needs a shared one
+        self.assertNotIn("warm_vendor_counts", self.app_jobs)
+
+    def test_first_sight_schedules_without_running(self):
+        self.register()
+        self.assertEqual(scheduler.run_pending(self.now, "a"), [])
+        state = ScheduledJobState.objects.get(name="job")
+        self.assertEqual(state.next_run_at, self.now + dt.timedelta(minutes=1))
+
+        later = self.now + dt.timedelta(minutes=1)
+        self.assertEqual(scheduler.run_pending(later, "a"), ["job"])
+        self.assertEqual(self.calls, ["job"])
+
+    def test_lease_is_exclusive(self):
+        self.register()
+        scheduler.run_pending(self.now, "a")
+        later = self.now + dt.timedelta(minutes=1)
+        job = scheduler.jobs["job"]
+        self.assertTrue(scheduler.claim(job, later, "a"))
+        self.assertFalse(scheduler.claim(job, later, "b"))
+
+        # a crashed owner's lease expires
+        expired = later + dt.timedelta(seconds=600)
+        self.assertTrue(scheduler.claim(job, expired, "b"))
+        state = ScheduledJobState.objects.get(name="job")
+        self.assertEqual(state.lease_owner, "b")
+
+    def test_run_releases_lease_and_reschedules(self):
+        self.register()
+        scheduler.run_pending(self.now, "a")
+        later = self.now + dt.timedelta(minutes=1)
+        self.assertEqual(scheduler.run_pending(later, "a"), ["job"])
+        self.assertEqual(scheduler.run_pending(later, "b"), [])
+
+        state = ScheduledJobState.objects.get(name="job")
+        self.assertEqual(state.lease_owner, "")
+        self.assertIsNone(state.lease_expires_at)
+        self.assertGreater(state.next_run_at, later)
+        self.assertEqual(state.last_error, "")
+        self.assertEqual(metrics.get("scheduler.job.runs"), 1)
+        timing = metrics.snapshot()["timings"]["scheduler.job.duration"]
+        self.assertEqual(timing["count"], 1)
+
+    def test_failures_are_recorded(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        self.register(func=fail)
+        scheduler.run_pending(self.now, "a")
+        later = self.now + dt.timedelta(minutes=1)
+        with self.assertLogs("db.scheduler", "ERROR"):
+            self.assertEqual(scheduler.run_pending(later, "a"), ["job"])
+        state = ScheduledJobState.objects.get(name="job")
+        self.assertEqual(state.last_error, "RuntimeError: boom")
+        self.assertEqual(state.lease_owner, "")
+        self.assertEqual(metrics.get("scheduler.job.failures"), 1)
+
+    @override_settings(SCHEDULER_SCHEDULES={"job": "0 0 1 1 *", "off": None})
+    def test_schedules_setting(self):
+        self.register()
+        self.register("off")
+        self.assertEqual(set(scheduler.jobs), {"job"})
+        self.assertEqual(scheduler.jobs["job"].cron.spec, "0 0 1 1 *")
+
+    def test_command(self):
+        out = StringIO()
+        call_command("run_scheduler", "--once", stdout=out)
+        self.assertIn("Ran jobs: none", out.getvalue())
+
+    def test_optimize_databases(self):
+        with self.assertLogs("db.maintenance", "INFO"):
+            optimize_databases()
@@ -0,0 +1,95 @@
+import datetime as dt
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from customers import signups
+from customers.models import ArchivedCustomer, Customer
+from customers.signups import prune_inactive_signups
+from db.models import PurgeJob
+from eshop_api.metrics import metrics
+from x_users.models import ArchivedUser
+
+User = get_user_model()
+
+
+@override_settings(SIGNUP_PRUNE_MAX_AGE_DAYS=30, SIGNUP_PRUNE_CHUNK_SIZE=2)
+class PruneSignupsTestCase(TestCase):
+    def setUp(self):
+        metrics.reset()
+        old = timezone.now() - dt.timedelta(days=31)
+        for name in ("bot1", "bot2", "bot3"):
+            User.objects.create_user(
+                username=name, email=f"{name}@hello.py", create_customer=True
+            )
+        User.objects.create_user(username="recent", email="recent@hello.py")
+        User.objects.create_user(
+            username="active", email="active@hello.py", is_active=True
+        )
+        archived = User.objects.create_user(
+            username="archived",
+            email="archived@hello.py",
+            create_customer=True,
+        )
+        Customer.objects.filter(user=archived).update(
+            status=Customer.CustomerStatus.ARCHIVED
+        )
+        User.objects.exclude(username="recent").update(date_joined=old)
+
+    def remaining(self):
+        return set(User.objects.values_list("username", flat=True))
+
+    def test_dry_run_changes_nothing(self):
+        self.assertEqual(prune_inactive_signups(dry_run=True), 3)
+        self.assertEqual(len(self.remaining()), 6)
+        self.assertEqual(metrics.get("signups.prune.candidates"), 3)
+
+    def test_delete(self):
+        self.assertEqual(prune_inactive_signups(), 3)
+        self.assertEqual(self.remaining(), {"recent", "active", "archived"})
+        self.assertEqual(Customer.objects.count(), 1)
+        self.assertEqual(metrics.get("signups.prune.deleted"), 3)
+
+    def test_delete_rechecks_each_chunk(self):
+        run_purge_job = signups.run_purge_job
+
+        def activate_bot3(job):
+            run_purge_job(job)
+            User.objects.filter(username="bot3").update(is_active=True)
+
+        with mock.patch.object(
+            signups, "run_purge_job", side_effect=activate_bot3
+        ):
+            self.assertEqual(prune_inactive_signups(), 2)
+        self.assertIn("bot3", self.remaining())
+        self.assertEqual(
+            [
+                len(ids)
+                for ids in PurgeJob.objects.values_list(
+                    "object_ids", flat=True
+                )
+            ],
+            [2],
+        )
+
+    def test_archive(self):
+        self.assertEqual(prune_inactive_signups(mode="archive"), 3)
+        self.assertEqual(self.remaining(), {"recent", "active", "archived"})
+        self.assertEqual(ArchivedUser.objects.count(), 3)
+        self.assertEqual(ArchivedCustomer.objects.count(), 3)
+        self.assertEqual(metrics.get("signups.prune.archived"), 3)
+
+    def test_age_is_configurable(self):
+        self.assertEqual(prune_inactive_signups(max_age_days=40), 0)
+        self.assertEqual(
+            prune_inactive_signups(max_age_days=0, dry_run=True), 4
+        )
+
+    def test_command(self):
+        out = StringIO()
+        call_command("prune_signups", "--dry-run", stdout=out)
+        self.assertIn("Would prune 3 inactive signups", out.getvalue())
@@ -0,0 +1,196 @@
+import threading
+from http import HTTPStatus
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import path
+
+from eshop_api.metrics import metrics
+from eshop_api.middleware import SingleFlightMiddleware
+from eshop_api.singleflight import SingleFlight
+
+VENDOR_URL = "/api/vendors/hot-vendor/"
+
+started = threading.Event()
+release = threading.Event()
+calls = []
+
+
+def hot_view(request):
+    calls.append(request)
+    started.set()
+    release.wait(5)
+    return HttpResponse(b"hot", headers={"ETag": '"1"'})
+
+
+urlpatterns = [path("api/hot/", hot_view, name="hot")]
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.flights = SingleFlight("test")
+        self.calls = 0
+        self.release = threading.Event()
+
+    def run_concurrently(self, target, number=5):
+        threads = [threading.Thread(target=target) for _ in range(number)]
+        for thread in threads:
+            thread.start()
+        while metrics.get("singleflight.test.shared") < number - 1:
+            self.release.wait(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+
+    def compute(self):
+        self.calls += 1
+        self.release.wait(5)
+        return "result"
+
+    def test_concurrent_calls_share_one_computation(self):
+        results = []
+        self.run_concurrently(
+            lambda: results.append(self.flights.do("key", self.compute))
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(
+            sorted(shared for _, shared in results), [False] + [True] * 4
+        )
+        self.assertEqual({result for result, _ in results}, {"result"})
+
+    def test_error_is_raised_for_every_caller(self):
+        errors = []
+
+        def fail():
+            self.release.wait(5)
+            raise ValueError("boom")
+
+        def call():
+            try:
+                self.flights.do("key", fail)
+            except ValueError as exc:
+                errors.append(exc)
+
+        self.run_concurrently(call, number=3)
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(len({id(exc) for exc in errors}), 1)
+
+    def test_next_call_runs_again(self):
+        self.release.set()
+        self.flights.do("key", self.compute)
+        self.flights.do("key", self.compute)
+        self.assertEqual(self.calls, 2)
+
+
+class SingleFlightMiddlewareTestCase(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def view(self, request):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return HttpResponse(b"vendor", headers={"ETag": '"1"'})
+
+    def get_concurrently(self, middleware, requests):
+        responses = []
+        threads = [
+            threading.Thread(
+                target=lambda r=r: responses.append(middleware(r))
+            )
+            for r in requests
+        ]
+        threads[0].start()
+        self.started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        # give the others time to join the flight
+        self.release.wait(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return responses
+
+    def test_identical_requests_are_coalesced(self):
+        middleware = SingleFlightMiddleware(self.view)
+        responses = self.get_concurrently(
+            middleware, [self.factory.get(VENDOR_URL) for _ in range(4)]
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len({id(resp) for resp in responses}), 4)
+        for resp in responses:
+            self.assertEqual(resp.status_code, HTTPStatus.OK)
+            self.assertEqual(resp.content, b"vendor")
+            self.assertEqual(resp["ETag"], '"1"')
+
+    def test_other_credentials_are_not_coalesced(self):
+        middleware = SingleFlightMiddleware(self.view)
+        self.get_concurrently(
+            middleware,
+            [
+                self.factory.get(VENDOR_URL),
+                self.factory.get(VENDOR_URL, HTTP_AUTHORIZATION="Bearer x"),
+            ],
+        )
+        self.assertEqual(self.calls, 2)
+
+    def test_unlisted_routes_are_not_coalesced(self):
+        middleware = SingleFlightMiddleware(self.view)
+        self.get_concurrently(
+            middleware, [self.factory.get("/api/vendors/") for _ in range(2)]
+        )
+        self.assertEqual(self.calls, 2)
+
+    def test_streaming_responses_are_not_shared(self):
+        def view(request):
+            self.view(request)
+            return StreamingHttpResponse(iter([b"vendor"]))
+
+        middleware = SingleFlightMiddleware(view)
+        responses = self.get_concurrently(
+            middleware, [self.factory.get(VENDOR_URL) for _ in range(2)]
+        )
+        self.assertEqual(self.calls, 2)
+        for resp in responses:
+            self.assertEqual(b"".join(resp.streaming_content), b"vendor")
+
+
+@override_settings(ROOT_URLCONF=__name__, SINGLE_FLIGHT_ROUTES=("hot",))
+class SingleFlightStackTestCase(SimpleTestCase):
+    """Through the handler built from `MIDDLEWARE`, as a WSGI server
+    runs it."""
+
+    def setUp(self):
+        started.clear()
+        release.clear()
+        calls.clear()
+
+    def test_identical_requests_are_coalesced(self):
+        handler = WSGIHandler()
+        environ = RequestFactory()._base_environ(PATH_INFO="/api/hot/")
+        statuses, bodies = [], []
+
+        def get():
+            response = handler(
+                dict(environ), lambda status, headers: statuses.append(status)
+            )
+            bodies.append(b"".join(response))
+            response.close()
+
+        threads = [threading.Thread(target=get) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.wait(0.1)  # give the others time to join the flight
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(statuses, ["200 OK"] * 4)
+        self.assertEqual(bodies, [b"hot"] * 4)
@@ -0,0 +1,189 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from db import slow_queries
+from db.slow_queries import (
+    SlowQueryRecorder,
+    SlowQueryStats,
+    fingerprint,
+    params_shape,
+)
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+
+
+class FingerprintTestCase(SimpleTestCase):
+    def test_literals_and_lists_are_normalized(self):
+        self.assertEqual(
+            fingerprint(
+                "SELECT * FROM t1 WHERE a = 'x''y'  AND b IN (%s, %s, %s)"
+                " LIMIT 21"
+            ),
+            "SELECT * FROM t1 WHERE a = ? AND b IN (...) LIMIT ?",
+        )
+        self.assertEqual(
+            fingerprint("SELECT 1 WHERE id IN (%s)"),
+            fingerprint("SELECT 2 WHERE id IN (%s, %s)"),
+        )
+
+    def test_params_shape(self):
+        self.assertEqual(params_shape((1, "a", None)), "(int, str, NoneType)")
+        self.assertEqual(params_shape({"pk": 1}), "{pk: int}")
+        self.assertEqual(params_shape([(1,), (2,)], many=True), "2 x (int)")
+        self.assertEqual(params_shape(None), "()")
+
+
+class SlowQueryRecorderTestCase(TestCase):
+    def setUp(self):
+        self.stats = SlowQueryStats()
+
+    def run_queries(self, threshold):
+        recorder = SlowQueryRecorder(threshold, self.stats)
+        with connection.execute_wrapper(recorder):
+            list(User.objects.filter(username__in=["a", "b"]))
+            list(User.objects.filter(username__in=["c"]))
+
+    def test_queries_over_threshold_are_recorded(self):
+        with self.assertLogs("db.slow_queries", "WARNING") as logs:
+            self.run_queries(0)
+        (entry,) = self.stats.top()
+        self.assertEqual(entry["count"], 2)
+        self.assertIn("IN (...)", entry["sql"])
+        self.assertEqual(
+            entry["call_sites"],
+            {
+                "tests/test_slow_queries.py:"
+                "test_queries_over_threshold_are_recorded > "
+                "tests/test_slow_queries.py:run_queries": 2
+            },
+        )
+        record = logs.records[0]
+        self.assertEqual(record.params_shape, "(str, str)")
+        self.assertEqual(record.call_site, entry["call_sites"].popitem()[0])
+        self.assertNotIn("'a'", record.getMessage())
+
+    def test_queries_are_attributed_to_the_view(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        recorder = SlowQueryRecorder(0, self.stats)
+        with connection.execute_wrapper(recorder), self.assertLogs(
+            "db.slow_queries", "WARNING"
+        ):
+            resp = self.client.post(
+                reverse("api-1.0.0:customer_create"),
+                data={
+                    "username": "new_user",
+                    "email": "new@hello.py",
+                    "password": "password123",
+                },
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {generate_user_token(admin)}",
+            )
+        self.assertEqual(resp.status_code, 200)
+        entries = self.stats.top(100)
+        inserts = [e for e in entries if e["sql"].startswith("INSERT")]
+        self.assertTrue(inserts)
+        for entry in inserts:
+            for site in entry["call_sites"]:
+                self.assertIn(
+                    "test_queries_are_attributed_to_the_view > "
+                    "customers/api.py:customer_create",
+                    site,
+                )
+                self.assertNotIn("db/models.py", site)
+        self.assertFalse(
+            [
+                e
+                for e in entries
+                if e["sql"].startswith(("SAVEPOINT", "RELEASE"))
+            ]
+        )
+
+    def test_fast_queries_are_ignored(self):
+        self.run_queries(60)
+        self.assertEqual(self.stats.top(), [])
+
+    def test_installed_on_new_connections_when_enabled(self):
+        wrappers = connection.execute_wrappers
+        self.addCleanup(setattr, connection, "execute_wrappers", wrappers)
+        connection.execute_wrappers = []
+        slow_queries.install(None, connection)
+        self.assertEqual(connection.execute_wrappers, [])
+        with self.settings(SLOW_QUERY_THRESHOLD=0.1):
+            slow_queries.install(None, connection)
+            slow_queries.install(None, connection)
+        (recorder,) = connection.execute_wrappers
+        self.assertEqual(recorder.threshold, 0.1)
+
+    def test_fingerprints_are_bounded(self):
+        stats = SlowQueryStats(max_fingerprints=1)
+        stats.add("SELECT a FROM t", 1.0)
+        stats.add("SELECT b FROM t", 2.0)
+        self.assertEqual([e["sql"] for e in stats.top()], ["SELECT a FROM t"])
+
+    def test_api_is_staff_only(self):
+        slow_queries.stats.reset()
+        self.addCleanup(slow_queries.stats.reset)
+        slow_queries.stats.add("SELECT a FROM t", 0.5, "customers/api.py:x")
+        slow_queries.stats.add("SELECT b FROM t WHERE id = 1", 0.1)
+        slow_queries.stats.add("SELECT b FROM t WHERE id = 2", 0.1)
+        url = reverse("api-1.0.0:slow_queries")
+        user = User.objects.create_user(username="user", email="u@a.py")
+        resp = self.client.get(
+            url, HTTP_AUTHORIZATION=f"Bearer {generate_user_token(user)}"
+        )
+        self.assertEqual(resp.status_code, 401)
+
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {generate_user_token(admin)}"}
+        resp = self.client.get(url, {"order_by": "count"}, **auth)
+        self.assertEqual(
+            [(e["sql"], e["count"]) for e in resp.json()],
+            [("SELECT b FROM t WHERE id = ?", 2), ("SELECT a FROM t", 1)],
+        )
+        self.assertEqual(
+            resp.json()[1]["call_sites"], {"customers/api.py:x": 1}
+        )
+
+
+class SlowQueriesCommandTestCase(SimpleTestCase):
+    def test_summarizes_log_file(self):
+        records = [
+            {"logger": "django.request", "message": "Not Found"},
+            *(
+                {
+                    "logger": "db.slow_queries",
+                    "sql": f"SELECT * FROM t WHERE id = {i}",
+                    "duration": 0.2,
+                    "call_site": "vendors/api.py:vendor_list",
+                }
+                for i in range(3)
+            ),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "app.log")
+            with open(path, "w") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+                f.write("not json\n")
+            out = io.StringIO()
+            call_command("slow_queries", path, stdout=out)
+        output = out.getvalue()
+        self.assertIn("count: 3", output)
+        self.assertIn("SELECT * FROM t WHERE id = ?", output)
+        self.assertIn("3 x vendors/api.py:vendor_list", output)
+
+    def test_needs_a_log_file(self):
+        with self.assertRaises(CommandError):
+            call_command("slow_queries", stdout=io.StringIO())
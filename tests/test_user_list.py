@@ -0,0 +1,46 @@
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tests.factories import UserFactory
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+
+
+class UserListTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        UserFactory.create_batch(14)
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {generate_user_token(self.admin)}"
+        }
+
+    def test_user_list_is_paginated(self):
+        resp = self.client.get(reverse("api-1.0.0:user_list"), **self.auth)
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        data = resp.json()
+        self.assertEqual(data["count"], 15)
+        self.assertEqual(len(data["items"]), 10)
+
+    @override_settings(USER_STREAM_CHUNK_SIZE=4)
+    def test_user_stream_returns_all_users(self):
+        resp = self.client.get(reverse("api-1.0.0:user_stream"), **self.auth)
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertTrue(resp.streaming)
+        users = json.loads(b"".join(resp.streaming_content))
+        self.assertEqual(
+            [user["id"] for user in users],
+            list(User.objects.order_by("id").values_list("id", flat=True)),
+        )
+        self.assertNotIn("password", users[0])
+        self.assertEqual(users[0]["username"], "admin")
+
+    def test_user_stream_is_staff_only(self):
+        resp = self.client.get(reverse("api-1.0.0:user_stream"))
+        self.assertEqual(resp.status_code, HTTPStatus.UNAUTHORIZED)
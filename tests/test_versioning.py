@@ -0,0 +1,117 @@
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from customers.models import Customer
+from db.models import StaleObjectError
+from tests.factories import VendorFactory
+from vendors.models import Vendor
+from x_auth.authentication import generate_user_token
+
+User = get_user_model()
+
+
+class VersionedModelTestCase(TestCase):
+    def setUp(self):
+        self.vendor = VendorFactory.create(name="Vendor")
+
+    def test_save_increments_version(self):
+        self.assertEqual(self.vendor.version, 1)
+        self.vendor.description = "new"
+        self.vendor.save()
+        self.assertEqual(self.vendor.version, 2)
+        self.assertEqual(Vendor.objects.get().version, 2)
+
+    def test_stale_save_is_rejected(self):
+        first, second = Vendor.objects.get(), Vendor.objects.get()
+        first.description = "first"
+        first.save()
+        second.description = "second"
+        with self.assertRaises(StaleObjectError), transaction.atomic():
+            second.save()
+        self.assertEqual(Vendor.objects.get().description, "first")
+
+    def test_bulk_update_increments_version(self):
+        Vendor.objects.filter(id=self.vendor.id).update(description="bulk")
+        self.assertEqual(Vendor.objects.get().version, 2)
+
+    def test_stale_delete_is_rejected(self):
+        Vendor.objects.filter(id=self.vendor.id).update(description="bulk")
+        with self.assertRaises(StaleObjectError), transaction.atomic():
+            self.vendor.delete()
+        self.assertTrue(Vendor.objects.exists())
+
+
+class ConditionalRequestsTestCase(TestCase):
+    def setUp(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@hello.py", password="hello"
+        )
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {generate_user_token(admin)}"
+        }
+        self.vendor = VendorFactory.create(name="Vendor")
+        self.detail_url = f"/api/vendors/{self.vendor.slug}/"
+        self.update_url = f"/api/vendors/{self.vendor.slug}/update"
+
+    def put(self, url: str, payload: dict, **headers):
+        return self.client.put(
+            url,
+            data=json.dumps(payload),
+            content_type="application/json",
+            **self.auth,
+            **headers,
+        )
+
+    def test_detail_etag_and_if_none_match(self):
+        resp = self.client.get(self.detail_url)
+        self.assertEqual(resp["ETag"], '"1"')
+        resp = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH='"1"')
+        self.assertEqual(resp.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_update_with_if_match(self):
+        resp = self.put(
+            self.update_url, {"description": "a"}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertEqual(resp["ETag"], '"2"')
+        # a second client still holding version 1
+        resp = self.put(
+            self.update_url, {"description": "b"}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.PRECONDITION_FAILED)
+        self.assertEqual(Vendor.objects.get().description, "a")
+
+    def test_weak_etag_of_compressed_response_is_accepted(self):
+        resp = self.put(
+            self.update_url, {"description": "a"}, HTTP_IF_MATCH='W/"1"'
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+
+    def test_delete_with_if_match(self):
+        url = reverse("api-1.0.0:vendor_delete", args=(self.vendor.slug,))
+        resp = self.client.delete(url, HTTP_IF_MATCH='"2"', **self.auth)
+        self.assertEqual(resp.status_code, HTTPStatus.PRECONDITION_FAILED)
+        resp = self.client.delete(url, HTTP_IF_MATCH='"1"', **self.auth)
+        self.assertEqual(resp.status_code, HTTPStatus.OK)
+        self.assertFalse(Vendor.objects.exists())
+
+    def test_customer_etag_covers_user(self):
+        user = User.objects.create_user(
+            username="user", email="user@hello.py", create_customer=True
+        )
+        url = reverse("api-1.0.0:customer_detail", args=(user.customer.id,))
+        etag = self.client.get(url, **self.auth)["ETag"]
+        User.objects.filter(id=user.id).update(first_name="New")
+        self.assertNotEqual(self.client.get(url, **self.auth)["ETag"], etag)
+        resp = self.put(
+            reverse("api-1.0.0:customer_update", args=(user.customer.id,)),
+            {"phone_number": "1234567890"},
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(resp.status_code, HTTPStatus.PRECONDITION_FAILED)
+        self.assertIsNone(Customer.objects.get().phone_number)
@@ -1,3 +1,5 @@
+from typing import Callable, List
+
 from django.db import IntegrityError
 from ninja import Schema
 from pydantic import constr
@@ -22,5 +24,19 @@ def trim_attr_name_from_integrity_error(error: IntegrityError) -> str:
     return ""
 
 
+def split_csv(value: str, cast: Callable = str) -> List:
+    """Split comma separated query param, e.g. `ids=1,2,3`.
+    Blank items and duplicates are dropped, order is kept.
+    Raise `ValueError` if an item can't be cast."""
+    items = []
+    for item in value.split(","):
+        if item := item.strip():
+            try:
+                items.append(cast(item))
+            except ValueError:
+                raise ValueError(f"invalid value: {item}")
+    return list(dict.fromkeys(items))
+
+
 class SlugSchema(Schema):
     slug: constr(regex=SLUG_REGEX)
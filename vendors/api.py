@@ -2,16 +2,19 @@ import logging
 from typing import List
 
 from django.db import IntegrityError
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from ninja import Router
-from ninja.pagination import PageNumberPagination, RouterPaginated, paginate
+from ninja import Query, Router
+from ninja.pagination import RouterPaginated
 
 from db.schemas import ErrorMessage
+from db.utils import get_many
+from eshop_api.conditional import check_if_match, conditional_get, make_etag
 from utils import SlugSchema, trim_attr_name_from_integrity_error
 from x_auth.authentication import StaffOnlyAuthBearer
 
 from .models import Vendor
-from .schemas import VendorIn, VendorOut, VendorUpdate
+from .schemas import VendorIn, VendorManyOut, VendorOut, VendorUpdate
 
 # router = Router()
 logger = logging.getLogger(__name__)
@@ -23,11 +26,26 @@ def vendor_list(request):
     return Vendor.objects.all()
 
 
+@router.get(
+    "/many",
+    auth=None,
+    response={200: VendorManyOut, 400: ErrorMessage},
+    url_name="vendor_many",
+)
+def vendor_many(request, slugs: str = Query(..., example="slug-1,slug-2")):
+    try:
+        items, missing = get_many(Vendor.objects.all(), slugs, field="slug")
+    except ValueError as e:
+        return 400, {"error_message": str(e)}
+    return {"items": items, "missing": missing}
+
+
 @router.get(
     "/{slug}/", auth=None, response=VendorOut, url_name="vendor_detail"
 )
-def vendor_detail(request, slug: SlugSchema):
-    return get_object_or_404(Vendor, **slug.dict())
+def vendor_detail(request, slug: SlugSchema, response: HttpResponse):
+    vendor = get_object_or_404(Vendor, **slug.dict())
+    return conditional_get(request, response, make_etag(vendor)) or vendor
 
 
 @router.post(
@@ -50,32 +68,38 @@ def vendor_create(request, payload: VendorIn):
     response={200: VendorOut, 400: ErrorMessage},
     url_name="vendor_create",
 )
-def vendor_update(request, slug: SlugSchema, payload: VendorUpdate):
+def vendor_update(
+    request, slug: SlugSchema, payload: VendorUpdate, response: HttpResponse
+):
     valid_data = payload.dict(exclude_unset=True)
     if not valid_data:
         return 400, {"error_message": "Empty request body not allowed"}
 
     vendor = get_object_or_404(Vendor, **slug.dict())
+    check_if_match(request, make_etag(vendor))
     for attr, value in valid_data.items():
-        if attr == "name":
-            vendor.slug = None
         setattr(vendor, attr, value)
+    if "name" in vendor.get_dirty_fields():
+        vendor.slug = None  # regenerated from the new name on save
     try:
+        # writes changed fields only, if any
         vendor.save()
     except IntegrityError as e:
         occupied_attr = trim_attr_name_from_integrity_error(e)
         logger.info(
-            f"Update attempt with attribute {occupied_attr} already in use"
+            "Update attempt with attribute %s already in use", occupied_attr
         )
 
         return 400, {
             "error_message": f"Update error! Attribute {occupied_attr} already in use."
         }
+    response["ETag"] = make_etag(vendor)
     return vendor
 
 
 @router.delete("/{slug}/delete", url_name="vendor_delete")
 def vendor_delete(request, slug: SlugSchema):
     vendor = get_object_or_404(Vendor, **slug.dict())
+    check_if_match(request, make_etag(vendor))
     vendor.delete()
     return {"success": f"Vendor {slug} was deleted"}
@@ -4,3 +4,23 @@ from django.apps import AppConfig
 class VendorsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "vendors"
+
+    def ready(self):
+        from db import scheduler
+        from db.pagination import count_queryset
+        from db.utils import cache_is_shared
+
+        from .models import Vendor
+
+        def warm_vendor_counts():
+            # `vendor_list` is public, keep its count cached
+            count_queryset(Vendor.objects.all(), refresh=True)
+
+        # the scheduler's process only warms caches shared with web workers
+        if cache_is_shared():
+            scheduler.register(
+                "warm_vendor_counts",
+                "* * * * *",
+                warm_vendor_counts,
+                jitter=0,
+            )
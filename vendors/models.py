@@ -1,10 +1,18 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from db.models import AutoGeneratedSlugModel
+from db.models import (
+    AutoGeneratedSlugModel,
+    ChangeLogManager,
+    ChangeLogModel,
+    DirtyFieldsMixin,
+    VersionedModel,
+)
 
 
-class Vendor(AutoGeneratedSlugModel):
+class Vendor(
+    DirtyFieldsMixin, VersionedModel, ChangeLogModel, AutoGeneratedSlugModel
+):
     name = models.CharField(
         _("manufacturer name"),
         max_length=150,
@@ -18,3 +26,5 @@ class Vendor(AutoGeneratedSlugModel):
         null=True,
         help_text=_("optional, max_len: 2000"),
     )
+
+    objects = ChangeLogManager()
@@ -1,3 +1,5 @@
+from typing import List
+
 from ninja import ModelSchema, Schema
 from pydantic import Field
 
@@ -18,3 +20,8 @@ class VendorIn(Schema):
 class VendorUpdate(Schema):
     name: str = Field(None, min_length=3, max_length=150)
     description: str = None
+
+
+class VendorManyOut(Schema):
+    items: List[VendorOut]
+    missing: List[str]
@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
@@ -7,6 +8,8 @@ from ninja import Path, Router
 from ninja.errors import HttpError
 
 from utils import trim_attr_name_from_integrity_error
+from x_users import activity
+from x_users.availability import is_taken
 from x_users.schemas import UserIn
 
 from .authentication import (
@@ -15,7 +18,7 @@ from .authentication import (
     validate_token_exp_time,
 )
 from .email import send_activation_email
-from .schemas import CredentialsIn, PathToken, TokenOut
+from .schemas import AvailabilityOut, CredentialsIn, PathToken, TokenOut
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -27,10 +30,29 @@ def token_create(request, credentials: CredentialsIn):
     username, password = credentials.dict().values()
     user = get_object_or_404(User, username=username)
     if user.check_password(password):
+        activity.touch(user, login=True)
         return {"access_token": generate_user_token(user)}
     raise HttpError(401, "wrong password")
 
 
+@router.get(
+    "/availability", response=AvailabilityOut, url_name="user_availability"
+)
+def availability(
+    request, username: Optional[str] = None, email: Optional[str] = None
+):
+    """Check a username and/or email before signing up,
+    without hashing a password or touching the users table
+    for names nobody has."""
+    if not username and not email:
+        raise HttpError(400, "Provide username or email")
+    free = {"username": None, "email": None}
+    for field, value in (("username", username), ("email", email)):
+        if value:
+            free[field] = not is_taken(field, value)
+    return free
+
+
 @router.post("/signup", url_name="user_signup")
 def signup(request, credentials: UserIn):
     # need to create customer simultaneously: create_customer=True
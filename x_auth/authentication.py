@@ -11,6 +11,8 @@ from jwt.exceptions import DecodeError
 from ninja.errors import HttpError
 from ninja.security import HttpBearer
 
+from x_users import activity
+
 User = get_user_model()
 
 
@@ -67,6 +69,20 @@ class BasicAuthBearer(HttpBearer):
     def authenticate(self, request: HttpRequest, token: str):
         pass
 
+    def get_request_user(
+        self, request: HttpRequest, token: str
+    ) -> Union["User", "AnonymousUser"]:
+        """Get user from jwt token once per request.
+        The user is kept on `request`, batch sub-requests reuse it."""
+        # not getattr: ninja's TestClient passes Mock requests
+        cached = vars(request).get("_token_user")
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        user = self.get_user(token)
+        activity.touch(user)
+        request._token_user = (token, user)
+        return user
+
     def get_user(self, token: str) -> Union["User", "AnonymousUser"]:
         """Get user from jwt token. Return `AnonymousUser` if no user found."""
         validated = check_jwtoken(token)
@@ -81,10 +97,10 @@ class BasicAuthBearer(HttpBearer):
 
 class StaffOnlyAuthBearer(BasicAuthBearer):
     def authenticate(self, request: HttpRequest, token: str):
-        user = self.get_user(token)
+        user = self.get_request_user(request, token)
         return user.is_staff
 
 
 class AuthenticatedOnlyAuthBearer(BasicAuthBearer):
     def authenticate(self, request: HttpRequest, token: str):
-        return bool(self.get_user(token))
+        return bool(self.get_request_user(request, token))
@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Literal, Optional
 
 from ninja import Schema
 from pydantic import Field, constr
@@ -15,6 +15,13 @@ class TokenOut(Schema):
     access_token: str = Field(..., min_length=90)
 
 
+class AvailabilityOut(Schema):
+    """`true` if free, `null` if not asked for."""
+
+    username: Optional[bool]
+    email: Optional[bool]
+
+
 class PathToken(Schema):
     token: constr(regex=r"[0-9A-Za-z.]+")
 
@@ -0,0 +1,169 @@
+import atexit
+import datetime as dt
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connections, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from eshop_api.metrics import metrics
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+# user pk -> time, written by the next flush
+_seen: Dict[int, dt.datetime] = {}
+_logins: Dict[int, dt.datetime] = {}
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = time.monotonic()
+# background flushes, see `start_flusher`
+_flusher: Optional[threading.Thread] = None
+_flusher_pid: Optional[int] = None
+_flusher_lock = threading.Lock()
+_stop = threading.Event()
+MIN_FLUSH_WAIT = 0.1  # secs
+
+
+def touch(user: models.Model, login: bool = False) -> None:
+    """Record that `user` made a request now (and logged in with
+    `login`). Users seen less than `LAST_SEEN_RESOLUTION` secs ago,
+    as loaded from the database, are not recorded again."""
+    if not getattr(user, "pk", None):
+        return
+    now = timezone.now()
+    resolution = dt.timedelta(seconds=settings.LAST_SEEN_RESOLUTION)
+    if not login and user.last_seen and now - user.last_seen < resolution:
+        return
+    with _lock:
+        _seen[user.pk] = now
+        if login:
+            _logins[user.pk] = now
+    if _flusher_pid != os.getpid() and settings.LAST_SEEN_FLUSH_THREAD:
+        start_flusher()
+
+
+def _newer(field: str, values: Dict[int, dt.datetime]) -> Case:
+    """`field` set to `values[pk]`, unless another process wrote
+    a newer time already."""
+    return Case(
+        *(
+            When(
+                Q(pk=pk) & (Q(**{field: None}) | Q(**{f"{field}__lt": when})),
+                then=Value(when),
+            )
+            for pk, when in values.items()
+        ),
+        default=F(field),
+        output_field=models.DateTimeField(),
+    )
+
+
+def write(
+    seen: Dict[int, dt.datetime], logins: Dict[int, dt.datetime]
+) -> None:
+    """One `UPDATE` per `LAST_SEEN_FLUSH_BATCH` users, through the base
+    manager: no change log entries, `version` and `updated_at` stay."""
+    pks: List[int] = sorted(seen)
+    size = settings.LAST_SEEN_FLUSH_BATCH
+    for start in range(0, len(pks), size):
+        chunk = pks[start : start + size]
+        values = {
+            "last_seen": _newer("last_seen", {pk: seen[pk] for pk in chunk})
+        }
+        chunk_logins = {pk: logins[pk] for pk in chunk if pk in logins}
+        if chunk_logins:
+            values["last_login"] = _newer("last_login", chunk_logins)
+        User._base_manager.filter(pk__in=chunk).update(**values)
+
+
+def flush() -> int:
+    """Write buffered times. On failure they go back to the buffer,
+    for the next flush. Return the number of users written."""
+    global _last_flush
+    if not _flush_lock.acquire(blocking=False):
+        return 0  # being flushed by another thread
+    try:
+        _last_flush = time.monotonic()
+        with _lock:
+            seen, logins = dict(_seen), dict(_logins)
+            _seen.clear()
+            _logins.clear()
+        if not seen:
+            return 0
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                write(seen, logins)
+        except DatabaseError:
+            logger.exception(
+                "Flushing last seen times of %s users failed", len(seen)
+            )
+            metrics.incr("activity.flush_failed")
+            with _lock:
+                for buffer, values in ((_seen, seen), (_logins, logins)):
+                    for pk, when in values.items():
+                        buffer[pk] = max(when, buffer.get(pk, when))
+            return 0
+        metrics.observe("activity.flush", time.perf_counter() - started)
+        metrics.incr("activity.flushed", len(seen))
+        return len(seen)
+    finally:
+        _flush_lock.release()
+
+
+def flush_if_due(**kwargs) -> None:
+    """`request_finished` receiver: flush every `LAST_SEEN_FLUSH_INTERVAL`
+    secs, or sooner once `LAST_SEEN_MAX_BUFFER` users are buffered.
+    Runs after the response is sent, outside request transactions.
+    Also run by the flusher thread, a crash loses at most one interval
+    of times."""
+    if not _seen:
+        return
+    due = time.monotonic() - _last_flush >= settings.LAST_SEEN_FLUSH_INTERVAL
+    if due or len(_seen) >= settings.LAST_SEEN_MAX_BUFFER:
+        flush()
+
+
+def _flush_periodically() -> None:
+    while True:
+        wait = _last_flush + settings.LAST_SEEN_FLUSH_INTERVAL
+        if _stop.wait(max(wait - time.monotonic(), MIN_FLUSH_WAIT)):
+            return
+        flush_if_due()
+        connections.close_all()  # of this thread, don't keep them idle
+
+
+def start_flusher() -> None:
+    """Flush from a daemon thread too, so that idle processes don't
+    keep times buffered, and at exit. Per pid: threads don't survive
+    a fork, e.g. gunicorn `--preload`."""
+    global _flusher, _flusher_pid
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        _stop.clear()
+        _flusher = threading.Thread(
+            target=_flush_periodically, name="last-seen-flush", daemon=True
+        )
+        _flusher.start()
+        atexit.register(stop_flusher)
+
+
+def stop_flusher() -> None:
+    """Stop the thread and write what is left, at exit or when
+    called directly (which cancels the exit flush)."""
+    global _flusher_pid
+    atexit.unregister(stop_flusher)
+    _stop.set()
+    if _flusher is not None and _flusher_pid == os.getpid():
+        _flusher.join()
+    _flusher_pid = None
+    flush()
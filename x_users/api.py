@@ -1,19 +1,29 @@
+import datetime as dt
 import logging
-from typing import List
+from typing import List, Optional
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
-from django.db.models import Q
-from django.http import HttpRequest, HttpResponse
+from django.db import IntegrityError, transaction
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
-from ninja import Router
-
-from db.schemas import ErrorMessage
+from ninja import Query, Router
+from ninja.errors import HttpError
+from ninja.pagination import paginate
+
+from db.models import PurgeJob
+from db.pagination import CachedCountPagination
+from db.purge import submit_purge_job
+from db.schemas import ErrorMessage, PurgeIn, PurgeJobOut
+from db.utils import get_many
+from eshop_api.conditional import check_if_match, conditional_get, make_etag
+from eshop_api.renderers import JSON_MEDIA_TYPE, stream_json_array
 from utils import trim_attr_name_from_integrity_error
 from x_auth.authentication import StaffOnlyAuthBearer
 
-from .schemas import UserIn, UserOut, UserUpdate
+from .availability import is_taken
+from .schemas import UserIn, UserManyOut, UserOut, UserUpdate
 
 logger = logging.getLogger(__name__)
 
@@ -22,13 +32,73 @@ User = get_user_model()
 
 
 @router.get("/", response=List[UserOut], url_name="user_list")
-def user_list(request):
-    return User.objects.all()
+@paginate(CachedCountPagination)
+def user_list(
+    request,
+    seen_before: Optional[dt.datetime] = None,
+    never_seen: bool = False,
+):
+    """`seen_before`/`never_seen` select users by `last_seen`,
+    e.g. for cleanups. It lags up to `LAST_SEEN_FLUSH_INTERVAL` secs."""
+    users = User.objects.order_by("id")
+    if seen_before is not None:
+        users = users.filter(last_seen__lt=seen_before)
+    if never_seen:
+        users = users.filter(last_seen=None)
+    return users
+
+
+@router.get("/stream", url_name="user_stream")
+def user_stream(request):
+    """All users as one JSON array. Rows are read with a server-side
+    cursor and serialized as they go, memory use doesn't grow with
+    the number of users."""
+    chunk_size = settings.USER_STREAM_CHUNK_SIZE
+    users = (
+        User.objects.order_by("id")
+        .values(*UserOut.__fields__)
+        .iterator(chunk_size=chunk_size)
+    )
+    return StreamingHttpResponse(
+        stream_json_array(users, chunk_size), content_type=JSON_MEDIA_TYPE
+    )
+
+
+@router.get(
+    "/many",
+    response={200: UserManyOut, 400: ErrorMessage},
+    url_name="user_many",
+)
+def user_many(request, ids: str = Query(..., example="1,2,3")):
+    try:
+        items, missing = get_many(User.objects.all(), ids, cast=int)
+    except ValueError as e:
+        return 400, {"error_message": str(e)}
+    return {"items": items, "missing": missing}
+
+
+@router.post("/purge", response={202: PurgeJobOut}, url_name="user_purge")
+def user_purge(request, payload: PurgeIn):
+    """Erase users and everything cascading from them in the background.
+    Poll the returned job for progress."""
+    if len(payload.ids) > settings.PURGE_MAX_IDS:
+        raise HttpError(
+            400, {"purge too large": f"max {settings.PURGE_MAX_IDS} ids"}
+        )
+    return 202, submit_purge_job(User, sorted(set(payload.ids)))
+
+
+@router.get(
+    "/purge/{job_id}/", response=PurgeJobOut, url_name="user_purge_detail"
+)
+def user_purge_detail(request, job_id: int):
+    return get_object_or_404(PurgeJob, id=job_id, model=User._meta.label_lower)
 
 
 @router.get("/{id}/", response=UserOut, url_name="user_detail")
-def user_detail(request, id: int):
-    return get_object_or_404(User, id=id)
+def user_detail(request, id: int, response: HttpResponse):
+    user = get_object_or_404(User, id=id)
+    return conditional_get(request, response, make_etag(user)) or user
 
 
 @router.post(
@@ -40,12 +110,23 @@ def user_create(request, payload: UserIn):
     data = payload.dict()
     username = data.get("username")
     email = data.get("email")
-    if User.objects.filter(Q(username=username) | Q(email=email)).exists():
+    if is_taken("username", username, include_archived=False) or is_taken(
+        "email", email, include_archived=False
+    ):
+        logger.info("Instance duplication attempt")
+        return 400, {
+            "error_message": "Instance with such attributes already exists"
+        }
+    try:
+        with transaction.atomic():
+            return User.objects.create_user(**data)
+    except IntegrityError:
+        # taken by another process or a bulk insert the filter of this
+        # process hasn't seen
         logger.info("Instance duplication attempt")
         return 400, {
             "error_message": "Instance with such attributes already exists"
         }
-    return User.objects.create_user(**data)
 
 
 @router.put(
@@ -53,27 +134,31 @@ def user_create(request, payload: UserIn):
     response={200: UserOut, 400: ErrorMessage},
     url_name="user_update",
 )
-def user_update(request, id: int, payload: UserUpdate):
+def user_update(request, id: int, payload: UserUpdate, response: HttpResponse):
     user = get_object_or_404(User, id=id)
+    check_if_match(request, make_etag(user))
 
-    for attr, value in payload.dict().items():
+    for attr, value in payload.dict(exclude_unset=True).items():
         setattr(user, attr, value)
     try:
-        user.save(update_fields=payload.dict().keys())
+        # writes changed fields only, if any
+        user.save()
     except IntegrityError as e:
         occupied_attr = trim_attr_name_from_integrity_error(e)
         logger.info(
-            f"Update attempt with attribute {occupied_attr} already in use"
+            "Update attempt with attribute %s already in use", occupied_attr
         )
 
         return 400, {
             "error_message": f"Update error! Attribute {occupied_attr} already in use."
         }
+    response["ETag"] = make_etag(user)
     return user
 
 
 @router.delete("/{id}/delete")
 def user_delete(request, id: int):
     user = get_object_or_404(User, id=id)
+    check_if_match(request, make_etag(user))
     user.delete()
     return {"success": f"User with id {id} was deleted"}
@@ -4,3 +4,27 @@ from django.apps import AppConfig
 class XUsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "x_users"
+
+    def ready(self):
+        from django.core.signals import request_finished
+        from django.db.models.signals import post_save
+
+        from customers.signups import prune_inactive_signups
+        from db import invalidation, scheduler
+
+        from . import activity, availability
+        from .models import User
+
+        post_save.connect(
+            availability.user_saved,
+            sender=User,
+            dispatch_uid="availability_user_saved",
+        )
+        invalidation.subscribe("x_users.user", availability.user_changed)
+        request_finished.connect(
+            activity.flush_if_due, dispatch_uid="activity_flush_if_due"
+        )
+
+        scheduler.register(
+            "prune_signups", "15 3 * * *", prune_inactive_signups
+        )
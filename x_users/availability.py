@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connections
+
+from eshop_api.metrics import metrics
+
+from .models import ArchivedUser
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+_filter: Optional["BloomFilter"] = None
+# users saved in this process / pks of users saved in any process,
+# added to the filter on the next check
+_pending_users: List[Tuple[str, str]] = []
+_pending_pks: Set[str] = set()
+_lock = threading.Lock()
+
+
+class BloomFilter:
+    """Set membership with false positives (at most `error_rate` up to
+    `capacity` items) and no false negatives. Items can't be removed."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.size = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str) -> List[int]:
+        # double hashing, see Kirsch & Mitzenmacher
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        positions = self._positions(item)
+        with self._lock:  # `|=` on a shared byte is not atomic
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+def username_key(username: str) -> str:
+    return f"username:{username.lower()}"
+
+
+def email_key(email: str) -> str:
+    return f"email:{email.lower()}"
+
+
+def add_users(bloom: BloomFilter, rows: Iterable) -> None:
+    for username, email in rows:
+        bloom.add(username_key(username))
+        if email:
+            bloom.add(email_key(email))
+
+
+def build_filter() -> BloomFilter:
+    """Stream usernames and emails of users, archived ones included,
+    into a filter with room for `AVAILABILITY_FILTER_GROWTH` times as
+    many users."""
+    started = time.perf_counter()
+    users = User._base_manager.count() + ArchivedUser.objects.count()
+    bloom = BloomFilter(
+        max(
+            settings.AVAILABILITY_FILTER_MIN_CAPACITY,
+            2 * users * settings.AVAILABILITY_FILTER_GROWTH,
+        ),
+        settings.AVAILABILITY_FILTER_ERROR_RATE,
+    )
+    for model in (User, ArchivedUser):
+        add_users(
+            bloom,
+            model._base_manager.values_list("username", "email").iterator(
+                chunk_size=settings.AVAILABILITY_FILTER_CHUNK_SIZE
+            ),
+        )
+    duration = time.perf_counter() - started
+    metrics.observe("availability.filter.build", duration)
+    logger.info(
+        "Built availability filter of %s users (%s KiB) in %.3fs",
+        users,
+        len(bloom.bits) // 1024,
+        duration,
+    )
+    return bloom
+
+
+def _reset() -> None:
+    global _filter
+    _filter = None
+    _pending_users.clear()
+    _pending_pks.clear()
+
+
+def user_saved(sender, instance, **kwargs) -> None:
+    """`post_save` receiver, doesn't wait for the transaction to commit
+    so that a check on another connection can't miss the user."""
+    with _lock:
+        if len(_pending_users) >= settings.AVAILABILITY_FILTER_MAX_PENDING:
+            _reset()
+        else:
+            _pending_users.append((instance.username, instance.email))
+
+
+def user_changed(pk: Optional[str]) -> None:
+    """`db.invalidation` subscriber for users saved by other processes,
+    `None` (lost messages) rebuilds the filter."""
+    with _lock:
+        if (
+            pk is None
+            or len(_pending_pks) >= settings.AVAILABILITY_FILTER_MAX_PENDING
+        ):
+            _reset()
+        else:
+            _pending_pks.add(pk)
+
+
+def get_filter() -> BloomFilter:
+    """Filter of this process, built on first use and rebuilt once
+    it holds more than `capacity` items."""
+    global _filter
+    with _lock:
+        if _filter is None or _filter.count > _filter.capacity:
+            _filter = build_filter()
+        if _pending_users:
+            add_users(_filter, _pending_users)
+            _pending_users.clear()
+        if _pending_pks:
+            # published after commit, so the rows are visible
+            add_users(
+                _filter,
+                User._base_manager.filter(pk__in=_pending_pks).values_list(
+                    "username", "email"
+                ),
+            )
+            _pending_pks.clear()
+        return _filter
+
+
+def warm() -> None:
+    """Build the filter ahead of the first request, from the WSGI/ASGI
+    entry points (not `AppConfig.ready`, which every management
+    command runs, `migrate` included). Left to the first request if the
+    tables don't exist yet. Connections are closed for servers that
+    fork workers after loading the application."""
+    if not settings.AVAILABILITY_FILTER_WARM:
+        return
+    try:
+        get_filter()
+    except DatabaseError as e:
+        logger.warning("Availability filter not built: %s", e)
+    finally:
+        connections.close_all()
+
+
+def is_taken(field: str, value: str, include_archived: bool = True) -> bool:
+    """Whether a user (or with `include_archived` an archived user) has
+    `value` as `field`, "username" or "email". A miss in the filter
+    is a definite no, a hit is confirmed with an indexed query."""
+    key = username_key(value) if field == "username" else email_key(value)
+    if key not in get_filter():
+        metrics.incr("availability.filter.miss")
+        return False
+    lookup = {field: value}
+    taken = User._base_manager.filter(**lookup).exists() or (
+        include_archived and ArchivedUser.objects.filter(**lookup).exists()
+    )
+    metrics.incr(
+        "availability.filter.hit" if taken else "availability.filter.false_hit"
+    )
+    return taken
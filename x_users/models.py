@@ -8,10 +8,17 @@ from django.db import models
 from django.db.models.query import QuerySet
 from django.utils.translation import gettext_lazy as _
 
+from db.models import (
+    ChangeLogModel,
+    ChangeLogQuerySet,
+    DirtyFieldsMixin,
+    VersionedModel,
+)
+
 logger = logging.getLogger(__name__)
 
 
-class CustomUserManager(UserManager):
+class CustomUserManager(UserManager.from_queryset(ChangeLogQuerySet)):
     def create_user(self, *args, **kwargs) -> "User":
         from customers.models import Customer
 
@@ -19,11 +26,11 @@ class CustomUserManager(UserManager):
         user = super().create_user(*args, **kwargs)
         if create_customer:
             customer = Customer.objects.create(user=user)
-            logger.info(f"Created a Customer object with id {customer.id}")
+            logger.info("Created a Customer object with id %s", customer.id)
         return user
 
 
-class User(AbstractUser):
+class User(DirtyFieldsMixin, VersionedModel, ChangeLogModel, AbstractUser):
     email = models.EmailField(_("email adress"), unique=True)
     is_active = models.BooleanField(
         _("active"),
@@ -33,5 +40,45 @@ class User(AbstractUser):
             "Unselect this instead of deleting accounts."
         ),
     )
+    last_seen = models.DateTimeField(
+        _("last seen"),
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text=_("last authenticated request, see `x_users.activity`"),
+    )
 
     objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # inactive signups by age, see `customers.signups`
+            models.Index(
+                fields=("is_active", "date_joined"),
+                name="user_active_joined_idx",
+            )
+        ]
+
+
+class ArchivedUser(models.Model):
+    """Inactive user moved out of the hot users table together with
+    its archived customer, see `customers.archive`.
+    Same columns as `User`, `id` is kept for restore."""
+
+    id = models.BigIntegerField(primary_key=True)
+    password = models.CharField(_("password"), max_length=128)
+    last_login = models.DateTimeField(_("last login"), blank=True, null=True)
+    last_seen = models.DateTimeField(_("last seen"), blank=True, null=True)
+    is_superuser = models.BooleanField(_("superuser status"), default=False)
+    username = models.CharField(_("username"), max_length=150, unique=True)
+    first_name = models.CharField(_("first name"), max_length=150, blank=True)
+    last_name = models.CharField(_("last name"), max_length=150, blank=True)
+    email = models.EmailField(_("email adress"), unique=True)
+    is_staff = models.BooleanField(_("staff status"), default=False)
+    is_active = models.BooleanField(_("active"), default=False)
+    date_joined = models.DateTimeField(_("date joined"))
+    version = models.PositiveIntegerField(_("row version"), default=1)
+    archived_at = models.DateTimeField(_("archiving time"), auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.username
@@ -1,3 +1,5 @@
+from typing import List
+
 from django.contrib.auth import get_user_model
 from ninja import ModelSchema, Schema
 from pydantic import constr
@@ -53,3 +55,8 @@ class UserUpdate(Schema):
 
 class ErrorMessage(Schema):
     error_message: str
+
+
+class UserManyOut(Schema):
+    items: List[UserOut]
+    missing: List[int]
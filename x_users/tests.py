@@ -63,7 +63,7 @@ class UserModelTestCase(TestCase):
         url = reverse_lazy(self.api_url_prefix + "user_list")
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, HTTPStatus.OK)
-        self.assertEqual(len(resp.json()), len(self.users))
+        self.assertEqual(resp.json()["count"], len(self.users))
 
 
 class UserApiTestCase(CreateUsersMixin, TestCase):
@@ -83,18 +83,18 @@ class UserApiTestCase(CreateUsersMixin, TestCase):
         user_num = User.objects.count()
         resp = self.client.get(self.urls["user_list"])
         self.assertEqual(resp.status_code, HTTPStatus.OK)
-        self.assertEqual(len(resp.json()), user_num)
+        self.assertEqual(resp.json()["count"], user_num)
 
     def test_user_list_contains_only_specific_schema_items(self):
         resp = self.client.get(self.urls["user_list"])
         self.assertEqual(resp.status_code, HTTPStatus.OK)
-        self.assertTrue(all(UserOut(**item) for item in resp.json()))
+        self.assertTrue(all(UserOut(**item) for item in resp.json()["items"]))
 
     def test_user_list_returns_empty_list_when_no_users_exist(self):
         User.objects.all().delete()
         resp = self.client.get(self.urls["user_list"])
         self.assertEqual(resp.status_code, HTTPStatus.OK)
-        self.assertEqual(resp.json(), [])
+        self.assertEqual(resp.json()["items"], [])
 
     def test_user_detail_with_valid_id_returns_expected_output(self):
         user = User.objects.first()